@@ -25,8 +25,10 @@
 
 import argparse as _argparse
 
+from repobuddy.git_wrapper import GitWrapper
 from repobuddy.globals import HelpStrings
-from repobuddy.utils import Logger, RepoBuddyBaseException
+from repobuddy.utils import ConnectionLimiter, Logger, \
+    RepoBuddyBaseException, RetryPolicy, ThreadPool
 from repobuddy.version import __version__
 
 
@@ -138,6 +140,76 @@ class ArgParser(object):
         self._master_parser.exit(status=0)
         return
 
+    def _display_help_bundle_create(self):
+        """Display help on the ``bundle-create`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._bundle_create_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
+    def _display_help_snapshot(self):
+        """Display help on the ``snapshot`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._snapshot_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
+    def _display_help_optimize(self):
+        """Display help on the ``optimize`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._optimize_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
+    def _display_help_maintenance(self):
+        """Display help on the ``maintenance`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._maintenance_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
+    def _display_help_stats(self):
+        """Display help on the ``stats`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._stats_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
+    def _display_help_serve(self):
+        """Display help on the ``serve`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._serve_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
+    def _display_help_manifest(self):
+        """Display help on the ``manifest`` command.
+
+        :returns: None
+
+        """
+        Logger.msg(self._manifest_command_parser.format_help())
+        self._master_parser.exit(status=0)
+        return
+
     def _help_command_handler(self, args):
         """Handler for the ``help`` command.
 
@@ -149,7 +221,14 @@ class ArgParser(object):
 
         """
         help_commands = {'init': self._display_help_init,
-                         'status': self._display_help_status}
+                         'status': self._display_help_status,
+                         'bundle-create': self._display_help_bundle_create,
+                         'snapshot': self._display_help_snapshot,
+                         'optimize': self._display_help_optimize,
+                         'maintenance': self._display_help_maintenance,
+                         'stats': self._display_help_stats,
+                         'serve': self._display_help_serve,
+                         'manifest': self._display_help_manifest}
         try:
             help_commands[args.command]()
         except KeyError:
@@ -158,6 +237,37 @@ class ArgParser(object):
                 self._help_command_parser.format_help())
         return
 
+    def _add_remote_arguments(self, parser):
+        """Add the arguments of the commands cloning repos in parallel.
+
+        :param parser: Parser of the command.
+        :type parser: :class:`argparse.ArgumentParser`
+        :returns: None
+
+        """
+        parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=ThreadPool.DEFAULT_JOBS,
+            help=HelpStrings.JOBS_ARG)
+        parser.add_argument(
+            '--retries',
+            type=int,
+            default=RetryPolicy.DEFAULT_RETRIES,
+            help=HelpStrings.RETRIES_ARG)
+        parser.add_argument(
+            '--max-connections-per-host',
+            type=int,
+            default=ConnectionLimiter.DEFAULT_MAX_PER_HOST,
+            help=HelpStrings.MAX_CONNECTIONS_PER_HOST_ARG)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=0,
+            help=HelpStrings.TIMEOUT_ARG)
+        return
+
     def _setup_parsers(self, handlers):
         """Configure the argument parsers.
 
@@ -188,6 +298,25 @@ class ArgParser(object):
         self._init_command_parser = self._sub_parsers.add_parser(
             'init',
             help=HelpStrings.INIT_COMMAND_HELP)
+        self._init_command_parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=HelpStrings.INIT_RESUME_ARG)
+        self._init_command_parser.add_argument(
+            '--bundle-dir',
+            help=HelpStrings.INIT_BUNDLE_DIR_ARG)
+        self._init_command_parser.add_argument(
+            '--from-client',
+            help=HelpStrings.INIT_FROM_CLIENT_ARG)
+        self._init_command_parser.add_argument(
+            '--no-fsync',
+            action='store_true',
+            help=HelpStrings.INIT_NO_FSYNC_ARG)
+        self._init_command_parser.add_argument(
+            '--optimize',
+            action='store_true',
+            help=HelpStrings.INIT_OPTIMIZE_ARG)
+        self._add_remote_arguments(self._init_command_parser)
         self._init_command_parser.add_argument(
             'manifest',
             help=HelpStrings.INIT_MANIFEST_ARG)
@@ -210,7 +339,162 @@ class ArgParser(object):
         self._status_command_parser = self._sub_parsers.add_parser(
             'status',
             help=HelpStrings.STATUS_COMMAND)
+        self._status_command_parser.add_argument(
+            '-s',
+            '--short',
+            action='store_true',
+            help=HelpStrings.STATUS_SHORT_ARG)
+        self._status_command_parser.add_argument(
+            '--format',
+            choices=['text', 'json', 'ndjson'],
+            default='text',
+            help=HelpStrings.STATUS_FORMAT_ARG)
         self._status_command_parser.set_defaults(func=handlers['status'])
+
+        # bundle-create command sub-parser
+        self._bundle_create_command_parser = self._sub_parsers.add_parser(
+            'bundle-create',
+            help=HelpStrings.BUNDLE_CREATE_COMMAND_HELP)
+        self._bundle_create_command_parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=ThreadPool.DEFAULT_JOBS,
+            help=HelpStrings.JOBS_ARG)
+        self._bundle_create_command_parser.add_argument(
+            'bundle_dir',
+            help=HelpStrings.BUNDLE_CREATE_BUNDLE_DIR_ARG)
+        self._bundle_create_command_parser.set_defaults(
+            func=handlers['bundle-create'])
+
+        # snapshot command sub-parser
+        self._snapshot_command_parser = self._sub_parsers.add_parser(
+            'snapshot',
+            help=HelpStrings.SNAPSHOT_COMMAND_HELP)
+        self._snapshot_command_parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=ThreadPool.DEFAULT_JOBS,
+            help=HelpStrings.JOBS_ARG)
+        self._snapshot_command_parser.add_argument(
+            'output',
+            help=HelpStrings.SNAPSHOT_OUTPUT_ARG)
+        self._snapshot_command_parser.set_defaults(func=handlers['snapshot'])
+
+        # optimize command sub-parser
+        self._optimize_command_parser = self._sub_parsers.add_parser(
+            'optimize',
+            help=HelpStrings.OPTIMIZE_COMMAND_HELP)
+        self._optimize_command_parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=ThreadPool.DEFAULT_JOBS,
+            help=HelpStrings.JOBS_ARG)
+        self._optimize_command_parser.add_argument(
+            '--no-fsmonitor',
+            action='store_true',
+            help=HelpStrings.OPTIMIZE_NO_FSMONITOR_ARG)
+        self._optimize_command_parser.set_defaults(func=handlers['optimize'])
+
+        # maintenance command sub-parser
+        self._maintenance_command_parser = self._sub_parsers.add_parser(
+            'maintenance',
+            help=HelpStrings.MAINTENANCE_COMMAND_HELP)
+        self._maintenance_command_parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=ThreadPool.DEFAULT_JOBS,
+            help=HelpStrings.JOBS_ARG)
+        self._maintenance_command_parser.add_argument(
+            '--task',
+            action='append',
+            dest='tasks',
+            choices=GitWrapper.MAINTENANCE_TASKS,
+            help=HelpStrings.MAINTENANCE_TASK_ARG)
+        self._maintenance_command_parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help=HelpStrings.MAINTENANCE_SCHEDULE_ARG)
+        self._maintenance_command_parser.set_defaults(
+            func=handlers['maintenance'])
+
+        # stats command sub-parser
+        self._stats_command_parser = self._sub_parsers.add_parser(
+            'stats',
+            help=HelpStrings.STATS_COMMAND_HELP)
+        self._stats_command_parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=ThreadPool.DEFAULT_JOBS,
+            help=HelpStrings.JOBS_ARG)
+        self._stats_command_parser.add_argument(
+            '--sort',
+            choices=['total-size', 'object-store-size', 'work-tree-size',
+                     'index-entries', 'loose-objects', 'packs', 'dest'],
+            default='total-size',
+            help=HelpStrings.STATS_SORT_ARG)
+        self._stats_command_parser.add_argument(
+            '--format',
+            choices=['text', 'json'],
+            default='text',
+            help=HelpStrings.STATS_FORMAT_ARG)
+        self._stats_command_parser.set_defaults(func=handlers['stats'])
+
+        # serve command sub-parser
+        self._serve_command_parser = self._sub_parsers.add_parser(
+            'serve',
+            help=HelpStrings.SERVE_COMMAND_HELP)
+        self._serve_command_parser.set_defaults(func=handlers['serve'])
+
+        # manifest command sub-parser
+        self._manifest_command_parser = self._sub_parsers.add_parser(
+            'manifest',
+            help=HelpStrings.MANIFEST_COMMAND_HELP)
+        manifest_sub_parsers = self._manifest_command_parser.add_subparsers(
+            dest='manifest_command',
+            help=HelpStrings.MASTER_PARSER_ARG_HELP,
+            title=HelpStrings.MASTER_PARSER_ARG_TITLE)
+        manifest_refresh_parser = manifest_sub_parsers.add_parser(
+            'refresh',
+            help=HelpStrings.MANIFEST_REFRESH_COMMAND_HELP)
+        manifest_refresh_parser.set_defaults(
+            func=handlers['manifest refresh'])
+        manifest_update_parser = manifest_sub_parsers.add_parser(
+            'update',
+            help=HelpStrings.MANIFEST_UPDATE_COMMAND_HELP)
+        self._add_remote_arguments(manifest_update_parser)
+        manifest_update_parser.add_argument(
+            'manifest',
+            nargs='?',
+            help=HelpStrings.MANIFEST_UPDATE_MANIFEST_ARG)
+        manifest_update_parser.set_defaults(
+            func=handlers['manifest update'])
+        manifest_validate_parser = manifest_sub_parsers.add_parser(
+            'validate',
+            help=HelpStrings.MANIFEST_VALIDATE_COMMAND_HELP)
+        manifest_validate_parser.add_argument(
+            'manifest',
+            nargs='?',
+            help=HelpStrings.MANIFEST_VALIDATE_MANIFEST_ARG)
+        manifest_validate_parser.set_defaults(
+            func=handlers['manifest validate'])
+        manifest_compile_parser = manifest_sub_parsers.add_parser(
+            'compile',
+            help=HelpStrings.MANIFEST_COMPILE_COMMAND_HELP)
+        manifest_compile_parser.add_argument(
+            '-o',
+            '--output',
+            help=HelpStrings.MANIFEST_COMPILE_OUTPUT_ARG)
+        manifest_compile_parser.add_argument(
+            'manifest',
+            nargs='?',
+            help=HelpStrings.MANIFEST_COMPILE_MANIFEST_ARG)
+        manifest_compile_parser.set_defaults(
+            func=handlers['manifest compile'])
         return
 
     def __init__(self, handlers):
@@ -226,6 +510,13 @@ class ArgParser(object):
         self._sub_parsers = None
         self._init_command_parser = None
         self._status_command_parser = None
+        self._bundle_create_command_parser = None
+        self._snapshot_command_parser = None
+        self._optimize_command_parser = None
+        self._maintenance_command_parser = None
+        self._stats_command_parser = None
+        self._serve_command_parser = None
+        self._manifest_command_parser = None
         self._help_command_parser = None
         self._args = None
         self._setup_parsers(handlers)
@@ -241,5 +532,8 @@ class ArgParser(object):
 
         """
         self._args = self._master_parser.parse_args(args)
+        if getattr(self._args, 'manifest_command', '') is None:
+            # Python 3 does not require a sub-command to be specified
+            self._manifest_command_parser.error('too few arguments')
         self._args.func(self._args)
         return
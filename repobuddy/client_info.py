@@ -30,7 +30,8 @@ if _sys.version_info >= (3, 0):
 else:
     import ConfigParser as _configparser    # pylint: disable=F0401
 
-from repobuddy.utils import RepoBuddyBaseException
+from repobuddy.utils import AtomicFile, AtomicFileError, \
+    RepoBuddyBaseException
 
 
 class ClientInfoError(RepoBuddyBaseException):
@@ -169,6 +170,22 @@ class ClientInfo(object):
         self._set_config('RepoBuddyClientInfo', 'manifest', manifest_xml)
         return
 
+    def set_manifest_source(self, manifest_source):
+        """Set the ``manifest_source`` in the config.
+
+        :param manifest_source: The location the manifest was retrieved
+            from, either a remote location or the absolute path of a file.
+        :type manifest_source: str
+        :returns: None
+        :raises: :exc:`ClientInfoError` if the config does not have the
+            ``RepoBuddyClientInfo`` section.
+
+        """
+        self._set_config('RepoBuddyClientInfo',
+                         'manifest_source',
+                         manifest_source)
+        return
+
     def get_client_spec(self):
         """Get the value of ``client_spec`` in the config.
 
@@ -191,7 +208,24 @@ class ClientInfo(object):
         """
         return self._get_config('RepoBuddyClientInfo', 'manifest')
 
-    def write(self, file_name=None):
+    def get_manifest_source(self):
+        """Get the value of ``manifest_source`` in the config.
+
+        ``manifest_source`` is optional, since it is not recorded by the
+        clients initialized with older versions of ``repobuddy``.
+
+        :returns: The value of ``manifest_source`` in the config, ``None``
+            if the config does not have the option.
+        :rtype: str
+
+        """
+        try:
+            return self._get_config('RepoBuddyClientInfo', 'manifest_source')
+        except ClientInfoError:
+            return None
+        return
+
+    def write(self, file_name=None, sync=True):
         """Write the config to a file.
 
         If ``file_name`` is set to ``None``, the filename passed during the
@@ -200,8 +234,13 @@ class ClientInfo(object):
         ``file_name``, this method's parameter takes precedece, and the file
         name specififed during initialization remains unmodified.
 
+        The file is replaced atomically, using
+        :class:`repobuddy.utils.AtomicFile`.
+
         :param file_name: The name of the file to write the config into.
         :type file_name: str
+        :param sync: If ``True``, the file is flushed to the disk.
+        :type sync: Boolean
         :returns: None
         :raises: :exc:`ClientInfoError` when any of the following conditions
             are met:
@@ -229,8 +268,10 @@ class ClientInfo(object):
                 'Error: Missing options. ' + str(err).split('Error: ')[1])
 
         try:
-            with open(file_name, 'w') as config_file:
+            with AtomicFile(file_name, sync) as config_file:
                 self._config.write(config_file)
+        except AtomicFileError as err:
+            raise ClientInfoError(str(err))
         except IOError as err:
             raise ClientInfoError('Error: ' + str(err))
         return
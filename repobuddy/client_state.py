@@ -0,0 +1,242 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+.. module: repobuddy.client_state
+   :platform: Unix, Windows
+   :synopsis: Stores the resolved state of the client.
+.. moduleauthor: Ash <tuxdude.github@gmail.com>
+
+"""
+
+import json as _json
+import os as _os
+
+from repobuddy.manifest_parser import ClientSpec, Repo
+from repobuddy.utils import AtomicFile, AtomicFileError, \
+    RepoBuddyBaseException
+
+
+class ClientStateError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`ClientState`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(ClientStateError, self).__init__(error_str)
+        return
+
+
+class ClientState(object):
+
+    """Stores the resolved state of the client in a JSON file.
+
+    The state holds the client spec resolved from the manifest, along with
+    the ``HEAD`` commit, the checked out branch and the time of the last
+    sync of every repo, as recorded by the commands modifying the client.
+    It also records the state of the manifest file it was resolved from,
+    and the state of the ``HEAD`` reflog of every repo, so that it can be
+    detected when they are out of date.
+
+    The file is versioned, and is always replaced atomically.
+
+    """
+
+    VERSION = 1
+    """Version of the file format."""
+
+    _REPO_KEYS = ['url', 'branch', 'dest', 'bundle', 'revision',
+                  'sparse_paths']
+
+    def __init__(self, file_name):
+        """Initializer.
+
+        :param file_name: The name of the state file. If the file exists,
+            it is opened and parsed, otherwise an empty state is created
+            in-memory until :meth:`write()` is invoked.
+        :type file_name: str
+        :raises: :exc:`ClientStateError` on failures in reading or parsing
+            an existing state file, or if it was written in an unsupported
+            version.
+
+        """
+        self._file_name = file_name
+        self._state = {'version': type(self).VERSION,
+                       'client_spec': None,
+                       'manifest_file_state': None,
+                       'repos': []}
+        if not _os.path.isfile(file_name):
+            return
+
+        try:
+            with open(file_name, 'r') as file_handle:
+                state = _json.load(file_handle)
+        except IOError as err:
+            raise ClientStateError('Error: ' + str(err))
+        except ValueError as err:
+            raise ClientStateError(
+                'Error: Parsing client state failed => ' + str(err))
+
+        if not isinstance(state, dict) or \
+                state.get('version') != type(self).VERSION:
+            raise ClientStateError(
+                'Error: Unsupported client state version in ' + file_name)
+        self._state = state
+        return
+
+    def exists(self):
+        """Determine if the state file exists.
+
+        :returns: ``True`` if the state file exists, ``False`` otherwise.
+        :rtype: Boolean
+
+        """
+        return _os.path.isfile(self._file_name)
+
+    def set_client_spec(self, client_spec, manifest_file_state):
+        """Set the resolved client spec.
+
+        The repo states recorded earlier are retained for the repos which
+        are still part of the client spec.
+
+        :param client_spec: The client spec resolved from the manifest.
+        :type client_spec: :class:`repobuddy.manifest_parser.ClientSpec`
+        :param manifest_file_state: State of the manifest file the client
+            spec was resolved from, which changes when the file is modified.
+        :type manifest_file_state: list
+        :returns: None
+
+        """
+        old_repos = dict((repo['dest'], repo)
+                         for repo in self._state['repos'])
+        repos = []
+        for repo in client_spec.repo_list:
+            repo_state = old_repos.get(repo.dest, {})
+            for key in type(self)._REPO_KEYS:
+                repo_state[key] = getattr(repo, key)
+            repos.append(repo_state)
+        self._state['client_spec'] = client_spec.name
+        self._state['manifest_file_state'] = list(manifest_file_state)
+        self._state['repos'] = repos
+        return
+
+    def get_client_spec(self, manifest_file_state):
+        """Get the resolved client spec.
+
+        :param manifest_file_state: Current state of the manifest file.
+        :type manifest_file_state: list
+        :returns: The client spec, or ``None`` if the state has no client
+            spec or was resolved from a different manifest file state.
+        :rtype: :class:`repobuddy.manifest_parser.ClientSpec`
+
+        """
+        if self._state['client_spec'] is None or \
+                self._state['manifest_file_state'] != \
+                list(manifest_file_state):
+            return None
+        repo_list = []
+        for repo_state in self._state['repos']:
+            repo_list.append(Repo(**dict(
+                (key, repo_state.get(key))
+                for key in type(self)._REPO_KEYS)))
+        return ClientSpec(self._state['client_spec'], repo_list)
+
+    def set_repo_state(self, dest, head, current_branch, synced_at,
+                       head_log_state):
+        """Record the state of a repo after it has been synced.
+
+        :param dest: Destination directory of the repo.
+        :type dest: str
+        :param head: The commit SHA of ``HEAD``.
+        :type head: str
+        :param current_branch: The checked out branch, ``None`` for a
+            detached ``HEAD``.
+        :type current_branch: str
+        :param synced_at: Time of the sync in seconds since the epoch.
+        :type synced_at: float
+        :param head_log_state: State of the ``HEAD`` reflog of the repo,
+            which changes whenever ``HEAD`` moves, or ``None`` if the repo
+            has no reflog.
+        :type head_log_state: list
+        :returns: None
+        :raises: :exc:`ClientStateError` if the repo is not part of the
+            client spec.
+
+        """
+        for repo_state in self._state['repos']:
+            if repo_state['dest'] == dest:
+                repo_state['head'] = head
+                repo_state['current_branch'] = current_branch
+                repo_state['synced_at'] = synced_at
+                repo_state['head_log_state'] = None
+                if not head_log_state is None:
+                    repo_state['head_log_state'] = list(head_log_state)
+                return
+        raise ClientStateError('Error: Unknown repo \'' + dest + '\'')
+
+    def get_repo_state(self, dest, head_log_state):
+        """Get the recorded state of a repo.
+
+        :param dest: Destination directory of the repo.
+        :type dest: str
+        :param head_log_state: Current state of the ``HEAD`` reflog of the
+            repo.
+        :type head_log_state: list
+        :returns: Dictionary with the keys ``head``, ``current_branch`` and
+            ``synced_at``, or ``None`` if the repo has not been synced, has
+            no reflog, or its ``HEAD`` has moved since the sync.
+        :rtype: dict
+
+        """
+        if head_log_state is None:
+            return None
+        for repo_state in self._state['repos']:
+            if repo_state['dest'] == dest and \
+                    repo_state.get('head_log_state') == \
+                    list(head_log_state):
+                return {'head': repo_state['head'],
+                        'current_branch': repo_state['current_branch'],
+                        'synced_at': repo_state['synced_at']}
+        return None
+
+    def write(self, sync=True):
+        """Write the state to disk.
+
+        The state file is replaced atomically, using
+        :class:`repobuddy.utils.AtomicFile`, so that it is never left
+        partially written.
+
+        :param sync: If ``True``, the file is flushed to the disk.
+        :type sync: Boolean
+        :returns: None
+        :raises: :exc:`ClientStateError` on errors in writing the state.
+
+        """
+        try:
+            with AtomicFile(self._file_name, sync) as file_handle:
+                _json.dump(self._state, file_handle, indent=2,
+                           sort_keys=True)
+        except AtomicFileError as err:
+            raise ClientStateError(str(err))
+        except IOError as err:
+            raise ClientStateError('Error: ' + str(err))
+        return
@@ -23,14 +23,54 @@
 
 """
 
+import copy as _copy
+import json as _json
 import os as _os
 import shutil as _shutil
+import signal as _signal
+import time as _time
 
 from repobuddy.git_wrapper import GitWrapper, GitWrapperError
-from repobuddy.utils import FileLock, FileLockError, Logger, \
-    RepoBuddyBaseException
-from repobuddy.manifest_parser import ManifestParser, ManifestParserError
+from repobuddy.journal import InitJournal, InitJournalError
+from repobuddy.utils import AtomicFile, AtomicFileError, \
+    ConnectionLimiter, ConnectionLimiterError, FileLock, FileLockError, \
+    FileLockSet, FlockFileLock, Logger, RepoBuddyBaseException, \
+    RetryPolicy, RetryPolicyError, ThreadPool, ThreadPoolError
+from repobuddy.manifest_fetcher import ManifestFetcher, \
+    ManifestFetcherError
+from repobuddy.manifest_parser import ClientSpec, Manifest, \
+    ManifestParser, ManifestParserError, ManifestWriter
 from repobuddy.client_info import ClientInfo, ClientInfoError
+from repobuddy.client_state import ClientState, ClientStateError
+from repobuddy.compiled_manifest import CompiledManifest, \
+    CompiledManifestError
+from repobuddy.server import Server, ServerError
+
+
+def _format_size(size):
+    """Format a size in bytes for displaying.
+
+    :param size: The size in bytes, which can be negative.
+    :type size: int
+    :returns: The size in the largest binary unit in which it is at least
+        ``1``, e.g. ``'1.5 MiB'``.
+    :rtype: str
+
+    """
+    value = float(abs(size))
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if value < 1024:
+            break
+        value /= 1024
+    else:
+        unit = 'TiB'
+    if unit == 'B':
+        formatted = '%d B' % value
+    else:
+        formatted = '%.1f %s' % (value, unit)
+    if size < 0:
+        return '-' + formatted
+    return formatted
 
 
 class CommandHandlerError(RepoBuddyBaseException):
@@ -49,49 +89,100 @@ class CommandHandler(object):
     def _get_manifest(self, manifest):
         """Retrieve the ``manifest`` into ``.repobuddy`` directory.
 
-        If ``manifest`` is a file, it is copied into the ``.repobuddy``
-        directory.
-
-        As of now, the ``manifest`` argument needs to be a filename. Other
-        protocols for fetching the manifest might be supported in the future.
+        If ``manifest`` is a remote location supported by
+        :class:`repobuddy.manifest_fetcher.ManifestFetcher`, it is fetched
+        through the manifest cache first. The manifest is then parsed, and
+        stored into the ``.repobuddy`` directory with the included files
+        inlined.
 
         :param manifest: Manifest to retrieve.
         :type manifest: str
-        :returns: None
-        :raises: :exc:`CommandHandlerError` if unable to open the manifest.
+        :returns: The source of the manifest, which is either the remote
+            location or the absolute path of the file.
+        :rtype: str
+        :raises: :exc:`CommandHandlerError` if unable to fetch or open the
+            manifest.
 
         """
-        # FIXME: Support various protcols for fetching the manifest XML file
-        input_manifest = None
-        if not _os.path.isabs(manifest):
-            input_manifest = _os.path.join(self._current_dir,
-                                           manifest)
-        else:
-            input_manifest = manifest
+        source = self._resolve_manifest_source(manifest)
+        self._parse_manifest(self._fetch_manifest(source))
+        self._store_manifest()
+        return source
+
+    def _resolve_manifest_source(self, manifest):
+        """Resolve the location of the ``manifest``.
+
+        :param manifest: Manifest location as specified by the user.
+        :type manifest: str
+        :returns: The remote location as is, otherwise the absolute path
+            of the file.
+        :rtype: str
+
+        """
+        if ManifestFetcher.is_remote(manifest):
+            return manifest
+        return _os.path.normpath(_os.path.join(self._current_dir, manifest))
+
+    def _fetch_manifest(self, source):
+        """Fetch the manifest from ``source`` if it is a remote location.
 
-        # Copy the manifest xml file to .repobuddy dir
+        :param source: Resolved location of the manifest.
+        :type source: str
+        :returns: Name of the local file containing the manifest.
+        :rtype: str
+        :raises: :exc:`CommandHandlerError` on errors in fetching the
+            manifest.
+
+        """
+        if not ManifestFetcher.is_remote(source):
+            return source
         try:
-            _shutil.copyfile(input_manifest, self._manifest_file)
-        except IOError as err:
-            raise CommandHandlerError('Error: ' + str(err))
+            return ManifestFetcher(sync=self._sync).fetch(source)
+        except ManifestFetcherError as err:
+            raise CommandHandlerError(str(err))
         return
 
-    def _parse_manifest(self):
+    def _parse_manifest(self, manifest_file=None):
         """Parse the ``manifest``.
 
+        :param manifest_file: Name of the manifest file to parse. If
+            ``None``, ``.repobuddy/manifest.xml`` is parsed.
+        :type manifest_file: str
         :returns: None
         :raises: :exc:`CommandHandlerError` on parsing errors.
 
         """
+        if manifest_file is None:
+            manifest_file = self._manifest_file
         manifest_parser = ManifestParser()
         try:
-            manifest_parser.parse(open(self._manifest_file, 'r'))
+            manifest_parser.parse(open(manifest_file, 'r'))
         except ManifestParserError as err:
             raise CommandHandlerError(str(err))
 
         self._manifest = manifest_parser.get_manifest()
         return
 
+    def _store_manifest(self):
+        """Store the parsed manifest into ``.repobuddy/manifest.xml``.
+
+        The manifest is written out using
+        :class:`repobuddy.manifest_parser.ManifestWriter`, so that the
+        stored manifest does not depend on the files it included.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors in writing the file.
+
+        """
+        try:
+            with AtomicFile(self._manifest_file, self._sync) as file_handle:
+                ManifestWriter().write(self._manifest, file_handle)
+        except AtomicFileError as err:
+            raise CommandHandlerError(str(err))
+        except IOError as err:
+            raise CommandHandlerError('Error: ' + str(err))
+        return
+
     def _get_client_spec(self, client_spec_name):
         """Retrieve the ``client_spec``.
 
@@ -113,11 +204,13 @@ class CommandHandler(object):
                 client_spec_name + '\'')
         return client_spec
 
-    def _store_client_info(self, client_spec_name):
+    def _store_client_info(self, client_spec_name, manifest_source):
         """Write the client config to ``.repobuddy/client.config``.
 
         :param client_spec_name: Name of the client_spec.
         :type client_spec: str
+        :param manifest_source: Location the manifest was retrieved from.
+        :type manifest_source: str
         :returns: None
         :raises: :exc:`CommandHandlerError` on any failures in creating
             or storing the config.
@@ -127,7 +220,8 @@ class CommandHandler(object):
             client_info = ClientInfo()
             client_info.set_client_spec(client_spec_name)
             client_info.set_manifest('manifest.xml')
-            client_info.write(self._client_info_file)
+            client_info.set_manifest_source(manifest_source)
+            client_info.write(self._client_info_file, self._sync)
         except ClientInfoError as err:
             raise CommandHandlerError(str(err))
         return
@@ -147,6 +241,221 @@ class CommandHandler(object):
             raise CommandHandlerError(str(err))
         return
 
+    def _get_manifest_source_from_config(self):
+        """Retrieve the location of the manifest from the client config.
+
+        :returns: Value of manifest_source in the config.
+        :rtype: str
+        :raises: :exc:`CommandHandlerError` on any failures, or if the
+            client config does not record the location.
+
+        """
+        try:
+            source = ClientInfo(self._client_info_file).get_manifest_source()
+        except ClientInfoError as err:
+            raise CommandHandlerError(str(err))
+        if source is None:
+            raise CommandHandlerError(
+                'Error: Client does not record the location of the ' +
+                'manifest, please specify the manifest')
+        return source
+
+    def _load_client_spec(self):
+        """Load the client spec of the already initialized client.
+
+        :returns: Client Spec
+        :rtype: :class:`repobuddy.manifest_parser.ClientSpec`
+        :raises: :exc:`CommandHandlerError` if the client is not initialized
+            or on errors in parsing the manifest.
+
+        """
+        if not self._is_client_initialized():
+            raise CommandHandlerError(
+                'Error: Uninitialized client, ' +
+                'please run init to initialize the client first')
+
+        # Reuse the client spec loaded earlier, if the files are unchanged
+        cache_key = (self._get_file_state(self._manifest_file),
+                     self._get_file_state(self._client_info_file))
+        if not self._client_spec_cache is None and \
+                self._client_spec_cache[0] == cache_key:
+            return self._client_spec_cache[1]
+
+        # Use the client spec resolved earlier by a command which modified
+        # the client, if the manifest is unchanged since then
+        client_spec = None
+        if not cache_key[0] is None:
+            try:
+                client_spec = ClientState(
+                    self._client_state_file).get_client_spec(cache_key[0])
+            except ClientStateError as err:
+                Logger.debug('Ignoring the client state: ' + str(err))
+
+        if client_spec is None:
+            client_spec = self._load_client_spec_from_manifest(
+                self._get_client_spec_name_from_config())
+
+        self._client_spec_cache = (cache_key, client_spec)
+        return client_spec
+
+    def _load_client_spec_from_manifest(self, client_spec_name):
+        """Load the client spec from ``.repobuddy/manifest.xml``.
+
+        If the manifest was compiled into ``.repobuddy/manifest.bin`` using
+        the ``manifest compile`` command, only the client spec is read from
+        the compiled manifest, which is compiled again if it is stale.
+        Otherwise the manifest XML is parsed.
+
+        :param client_spec_name: The name of the client spec.
+        :type client_spec_name: str
+        :returns: The client spec.
+        :rtype: :class:`repobuddy.manifest_parser.ClientSpec`
+        :raises: :exc:`CommandHandlerError` on errors in loading the
+            manifest, or if the client spec is not found.
+
+        """
+        if not _os.path.isfile(self._compiled_manifest_file):
+            self._parse_manifest()
+            return self._get_client_spec(client_spec_name)
+
+        try:
+            with CompiledManifest.load(self._manifest_file,
+                                       self._compiled_manifest_file,
+                                       self._sync) as compiled_manifest:
+                return compiled_manifest.get_client_spec(client_spec_name)
+        except CompiledManifestError as err:
+            raise CommandHandlerError(str(err))
+        return
+
+    def _store_client_state(self, client_spec, repo_states):
+        """Write the state of the client to ``.repobuddy/client.state``.
+
+        Records the resolved ``client_spec``, along with the state of the
+        manifest file it was resolved from, and the states of the repos
+        synced by the command.
+
+        :param client_spec: The client spec of the client.
+        :type client_spec: :class:`repobuddy.manifest_parser.ClientSpec`
+        :param repo_states: The states of the synced repos, as returned by
+            :meth:`_get_repo_sync_state`.
+        :type repo_states: list of Tuple
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors in writing the state.
+
+        """
+        try:
+            client_state = ClientState(self._client_state_file)
+        except ClientStateError as err:
+            # Replace a state file which cannot be read
+            Logger.debug('Replacing the client state: ' + str(err))
+            try:
+                _os.unlink(self._client_state_file)
+            except OSError as err:
+                raise CommandHandlerError('Error: ' + str(err))
+            client_state = ClientState(self._client_state_file)
+
+        try:
+            client_state.set_client_spec(
+                client_spec,
+                self._get_file_state(self._manifest_file))
+            for repo_state in repo_states:
+                client_state.set_repo_state(*repo_state)
+            client_state.write(self._sync)
+        except ClientStateError as err:
+            raise CommandHandlerError(str(err))
+        return
+
+    def _get_repo_sync_state(self, repo):
+        """Get the state of a repo to record after syncing it.
+
+        Called by the parallel jobs syncing the repos, so that recording
+        the states does not add any serial ``git`` commands.
+
+        :param repo: The synced repo.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :returns: The destination, the commit SHA of ``HEAD``, the checked
+            out branch, the time of the sync and the state of the ``HEAD``
+            reflog of the repo.
+        :rtype: Tuple
+        :raises: :exc:`repobuddy.git_wrapper.GitWrapperError` on errors.
+
+        """
+        repo_dir = _os.path.join(self._current_dir, repo.dest)
+        # Read the reflog state first, so that HEAD moving meanwhile makes
+        # the recorded state out of date
+        head_log_state = self._get_head_log_state(repo_dir)
+        git = GitWrapper(repo_dir)
+        return (repo.dest, git.get_head_revision(), git.get_current_branch(),
+                _time.time(), head_log_state)
+
+    def _get_head_log_state(self, repo_dir):
+        """Get the state of the ``HEAD`` reflog of a repo.
+
+        ``git`` appends to the reflog whenever ``HEAD`` moves, like on a
+        commit, a checkout or a reset, so that the state changes along.
+
+        :param repo_dir: Absolute path of the repo.
+        :type repo_dir: str
+        :returns: The state of the reflog as returned by
+            :meth:`_get_file_state`.
+        :rtype: Tuple
+
+        """
+        return self._get_file_state(_os.path.join(repo_dir, '.git', 'logs',
+                                                  'HEAD'))
+
+    def _load_client_state(self):
+        """Load the client state to look up the recorded repo states.
+
+        :returns: The client state, or ``None`` if it cannot be read.
+        :rtype: :class:`repobuddy.client_state.ClientState`
+
+        """
+        try:
+            return ClientState(self._client_state_file)
+        except ClientStateError as err:
+            Logger.debug('Ignoring the client state: ' + str(err))
+        return None
+
+    def _get_recorded_repo_state(self, client_state, repo):
+        """Get the state of ``repo`` recorded by the last sync.
+
+        This method needs to be called after acquiring the lock of the repo.
+
+        :param client_state: The client state returned by
+            :meth:`_load_client_state`.
+        :type client_state: :class:`repobuddy.client_state.ClientState`
+        :param repo: The repo.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :returns: The recorded state as returned by
+            :meth:`repobuddy.client_state.ClientState.get_repo_state`, or
+            ``None`` if it is not available or ``HEAD`` has moved since.
+        :rtype: dict
+
+        """
+        if client_state is None:
+            return None
+        return client_state.get_repo_state(
+            repo.dest,
+            self._get_head_log_state(_os.path.join(self._current_dir,
+                                                   repo.dest)))
+
+    def _get_file_state(self, file_name):
+        """Get the state of a file, which changes when the file is modified.
+
+        :param file_name: The name of the file.
+        :type file_name: str
+        :returns: The inode, size and modification time of the file, or
+            ``None`` if the file does not exist.
+        :rtype: Tuple
+
+        """
+        try:
+            file_stat = _os.stat(file_name)
+        except OSError:
+            return None
+        return (file_stat.st_ino, file_stat.st_size, file_stat.st_mtime)
+
     def _is_client_initialized(self):
         """Determine if the client is initialized.
 
@@ -157,9 +466,13 @@ class CommandHandler(object):
         return _os.path.isfile(
             _os.path.join(self._repo_buddy_dir, 'client.config'))
 
-    def _exec_with_lock(self, exec_method, *method_args):
+    def _exec_with_lock_mode(self, shared, exec_method, method_args):
         """Call ``exec_method`` while holding the ``.repobuddy/lock``.
 
+        :param shared: If ``True``, the lock is held in shared mode, allowing
+            other read-only commands to run at the same time. Falls back to
+            exclusive mode on platforms without ``flock`` support.
+        :type shared: Boolean
         :param exec_method: The method to execute.
         :type exec_method: Reference to a method
         :param method_args: Arguments to the method.
@@ -180,16 +493,28 @@ class CommandHandler(object):
         else:
             Logger.debug('Found an existing .repobuddy directory...')
 
+        if FlockFileLock.is_supported():
+            # Wait for any conflicting instance of repobuddy to finish
+            lock = FlockFileLock(lock_file, shared=shared)
+        else:
+            lock = FileLock(lock_file)
+
         try:
             # Acquire the lock before doing anything else
-            with FileLock(lock_file):
+            with lock:
                 Logger.debug('Lock \'' + lock_file + '\' acquired')
-                exec_method(*method_args)
+                try:
+                    exec_method(*method_args)
+                except KeyboardInterrupt:
+                    # Stop the git commands of the parallel jobs, before
+                    # releasing the lock
+                    GitWrapper.cancel_all()
+                    raise
         except FileLockError as err:
             # If it is a timeout error, it could be one of the following:
             # *** another instance of repobuddy is running
             # *** repobuddy was killed earlier without releasing the lock file
-            if err.isTimeOut:
+            if err.is_time_out:
                 raise CommandHandlerError(
                     'Error: Lock file ' + lock_file + ' already exists\n' +
                     'Is another instance of repobuddy running ?')
@@ -200,6 +525,256 @@ class CommandHandler(object):
 
         return
 
+    def _exec_with_lock(self, exec_method, *method_args):
+        """Call ``exec_method`` while holding the lock in exclusive mode.
+
+        Used by the commands which modify the client.
+
+        :param exec_method: The method to execute.
+        :type exec_method: Reference to a method
+        :param method_args: Arguments to the method.
+        :type method_args: list
+        :returns: None
+        :raises: :exc:`CommandHandlerError` if failing to create the lock
+            file or any errors in executing the method.
+
+        """
+        self._exec_with_lock_mode(False, exec_method, method_args)
+        return
+
+    def _exec_with_shared_lock(self, exec_method, *method_args):
+        """Call ``exec_method`` while holding the lock in shared mode.
+
+        Used by the read-only commands, which can run concurrently with each
+        other.
+
+        :param exec_method: The method to execute.
+        :type exec_method: Reference to a method
+        :param method_args: Arguments to the method.
+        :type method_args: list
+        :returns: None
+        :raises: :exc:`CommandHandlerError` if failing to create the lock
+            file or any errors in executing the method.
+
+        """
+        self._exec_with_lock_mode(True, exec_method, method_args)
+        return
+
+    def _get_repo_locks(self, repos, shared):
+        """Get the per-repo locks for ``repos``.
+
+        The per-repo locks are stored under ``.repobuddy/locks`` and are held
+        beneath the ``.repobuddy/lock``, so that commands working on
+        disjoint sets of repos can run at the same time. The lock files are
+        named after the normalized destination of the repos, with the
+        ``%``, ``/`` and ``:`` characters escaped. On platforms
+        without ``flock`` support, the ``.repobuddy/lock`` is always held in
+        exclusive mode, and no per-repo locks are used.
+
+        :param repos: The repos to lock.
+        :type repos: list of :class:`repobuddy.manifest_parser.Repo`
+        :param shared: If ``True``, the locks are held in shared mode,
+            otherwise in exclusive mode.
+        :type shared: Boolean
+        :returns: The locks, which need to be acquired by the caller.
+        :rtype: :class:`repobuddy.utils.FileLockSet`
+        :raises: :exc:`CommandHandlerError` on errors in creating the
+            directory for the lock files.
+
+        """
+        if not FlockFileLock.is_supported():
+            return FileLockSet([])
+
+        try:
+            if not _os.path.isdir(self._repo_locks_dir):
+                _os.makedirs(self._repo_locks_dir)
+        except OSError as err:
+            # Another instance might have created the same directory
+            if not _os.path.isdir(self._repo_locks_dir):
+                raise CommandHandlerError('Error: ' + str(err))
+
+        lock_files = []
+        for repo in repos:
+            # Flatten the normalized dest into a single file name, so that
+            # the lock file stays within the locks directory even for an
+            # absolute dest or one with '..'
+            lock_name = _os.path.normpath(repo.dest).replace('\\', '/')
+            for (char, escaped) in [('%', '%25'), ('/', '%2F'), (':', '%3A')]:
+                lock_name = lock_name.replace(char, escaped)
+            lock_files.append(_os.path.join(self._repo_locks_dir,
+                                            lock_name + '.lock'))
+        return FileLockSet(lock_files, shared=shared)
+
+    def _get_bundle_file(self, repo, bundle_dir):
+        """Get the bundle file to seed the clone of ``repo`` from.
+
+        The bundle file is the ``Bundle`` specified for the repo in the
+        manifest, or ``<bundle_dir>/<dest>.bundle`` otherwise. Relative
+        paths are looked up in ``bundle_dir`` if specified, or the current
+        directory otherwise.
+
+        :param repo: The repo to be cloned.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :param bundle_dir: The bundle directory passed to ``init``.
+        :type bundle_dir: str
+        :returns: Absolute path of the bundle file if it exists, ``None``
+            otherwise.
+        :rtype: str
+
+        """
+        if repo.bundle is None and bundle_dir is None:
+            return None
+
+        base_dir = self._current_dir
+        if not bundle_dir is None:
+            base_dir = _os.path.join(self._current_dir, bundle_dir)
+
+        if repo.bundle is None:
+            bundle_file = _os.path.join(base_dir, repo.dest + '.bundle')
+        else:
+            bundle_file = _os.path.join(base_dir, repo.bundle)
+
+        if not _os.path.isfile(bundle_file):
+            Logger.debug('Bundle \'' + bundle_file + '\' not found, ' +
+                         'cloning ' + repo.dest + ' from the remote')
+            return None
+        return bundle_file
+
+    def _get_source_repo(self, repo, source_client):
+        """Get the clone of ``repo`` in another client to seed from.
+
+        :param repo: The repo to be cloned.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :param source_client: Absolute path of the client passed to ``init``
+            using ``--from-client``.
+        :type source_client: str
+        :returns: Absolute path of the repo in ``source_client`` if it
+            exists, ``None`` otherwise.
+        :rtype: str
+
+        """
+        if source_client is None:
+            return None
+
+        source_repo = _os.path.join(source_client, repo.dest)
+        if not _os.path.isdir(_os.path.join(source_repo, '.git')):
+            Logger.debug('Repo \'' + source_repo + '\' not found, ' +
+                         'cloning ' + repo.dest + ' from the remote')
+            return None
+        return source_repo
+
+    def _set_remote_options(self, args):
+        """Set up the retries, connection limits and timeouts for the clones.
+
+        :param args: Arguments to the command, with the ``retries``,
+            ``max_connections_per_host`` and ``timeout`` options.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on invalid options.
+
+        """
+        if args.timeout < 0:
+            raise CommandHandlerError('Error: timeout cannot be negative')
+        self._git_timeout = args.timeout or None
+        try:
+            self._retry_policy = RetryPolicy(retries=args.retries)
+            self._connection_limiter = ConnectionLimiter(
+                args.max_connections_per_host)
+        except (RetryPolicyError, ConnectionLimiterError) as err:
+            raise CommandHandlerError(str(err))
+        return
+
+    def _get_remote_git(self, base_dir):
+        """Get a :class:`repobuddy.git_wrapper.GitWrapper` for the clones.
+
+        :param base_dir: Absolute path of the work-tree.
+        :type base_dir: str
+        :returns: The git wrapper, which retries, limits and times out the
+            ``git`` commands as set up by :meth:`_set_remote_options`.
+        :rtype: :class:`repobuddy.git_wrapper.GitWrapper`
+
+        """
+        return GitWrapper(base_dir, self._retry_policy,
+                          self._connection_limiter, self._git_timeout)
+
+    def _clone_with_journal(self, journal, repo, bundle_dir=None,
+                            source_client=None):
+        """Clone ``repo`` while recording its progress in ``journal``.
+
+        Repos which have already been cloned are skipped. The clone is only
+        recorded as started when its destination did not exist, so that a
+        directory which ``init`` did not create is never removed. Repos
+        whose clone was interrupted are verified, and removed for cloning
+        again if the clone never completed. Local changes in the work-tree
+        never make a clone incomplete.
+
+        :param journal: Journal tracking the progress of ``init``.
+        :type journal: :class:`repobuddy.journal.InitJournal`
+        :param repo: The repo to clone.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :param bundle_dir: Directory to look up the bundles in, to seed the
+            clone from.
+        :type bundle_dir: str
+        :param source_client: Absolute path of an existing client to seed
+            the clone from.
+        :type source_client: str
+        :returns: The state of the repo, as returned by
+            :meth:`_get_repo_sync_state`.
+        :rtype: Tuple
+        :raises: :exc:`CommandHandlerError` if the destination is not within
+            the client, already exists, or is an interrupted clone which
+            cannot be removed safely, or on errors in removing an incomplete
+            clone, :exc:`repobuddy.git_wrapper.GitWrapperError` if the clone
+            fails.
+
+        """
+        repo_dir = self._get_repo_dir(repo)
+        state = journal.get_repo_state(repo.dest)
+
+        if state == InitJournal.STATE_CLONED and _os.path.isdir(repo_dir):
+            Logger.debug('Skipping the already cloned repo: ' + repo.dest)
+            return self._get_repo_sync_state(repo)
+
+        dest_exists = _os.path.lexists(repo_dir)
+        if dest_exists and state == InitJournal.STATE_CLONING:
+            git = GitWrapper(repo_dir)
+            if git.is_clone_complete(repo.branch):
+                Logger.debug('Skipping the already cloned repo: ' +
+                             repo.dest)
+                journal.set_repo_state(repo.dest, InitJournal.STATE_CLONED)
+                return self._get_repo_sync_state(repo)
+            # The checkout completes by writing the index, after which the
+            # work-tree may have local changes
+            if _os.path.exists(_os.path.join(repo_dir, '.git', 'index')):
+                raise CommandHandlerError(
+                    'Error: Unable to resume the clone of \'%s\', ' %
+                    repo.dest + 'the branch \'%s\' is not checked out, ' %
+                    repo.branch + 'please remove it to clone it again')
+            Logger.msg('Removing the incomplete clone: ' + repo.dest)
+            try:
+                _shutil.rmtree(repo_dir)
+            except OSError as err:
+                raise CommandHandlerError('Error: ' + str(err))
+            dest_exists = False
+        elif dest_exists and not (_os.path.isdir(repo_dir) and
+                                  len(_os.listdir(repo_dir)) == 0):
+            raise CommandHandlerError(
+                'Error: Destination \'%s\' already exists' % repo.dest)
+
+        if not dest_exists:
+            journal.set_repo_state(repo.dest, InitJournal.STATE_CLONING)
+        git = self._get_remote_git(self._current_dir)
+        with self._get_repo_locks([repo], shared=False):
+            git.clone(repo.url, repo.branch, repo.dest,
+                      bundle=self._get_bundle_file(repo, bundle_dir),
+                      revision=repo.revision,
+                      source_repo=self._get_source_repo(repo, source_client),
+                      sparse_paths=repo.sparse_paths)
+            repo_state = self._get_repo_sync_state(repo)
+        journal.set_repo_state(repo.dest, InitJournal.STATE_CLONED)
+        Logger.msg('Cloned: ' + repo.dest)
+        return repo_state
+
     # Init command which runs after acquiring the Lock
     def _exec_init(self, args):
         """Execute ``init`` command.
@@ -215,102 +790,1041 @@ class CommandHandler(object):
         if self._is_client_initialized():
             raise CommandHandlerError('Error: Client is already initialized')
 
-        # Download the manifest XML
-        self._get_manifest(args.manifest)
+        source_client = None
+        if not args.from_client is None:
+            source_client = _os.path.normpath(
+                _os.path.join(self._current_dir, args.from_client))
+            if not _os.path.isfile(_os.path.join(source_client,
+                                                 '.repobuddy',
+                                                 'client.config')):
+                raise CommandHandlerError(
+                    'Error: \'' + source_client +
+                    '\' is not an initialized repobuddy client')
+
+        # Skip flushing the files to the disk for throwaway clients
+        self._sync = not args.no_fsync
+        self._set_remote_options(args)
 
-        # Parse the manifest XML
-        self._parse_manifest()
+        try:
+            journal = InitJournal(self._init_journal_file, self._sync)
+            if journal.exists():
+                if not args.resume:
+                    raise CommandHandlerError(
+                        'Error: Found an interrupted init, ' +
+                        'please run init with --resume to continue')
+                if journal.get_client_spec() != args.client_spec:
+                    raise CommandHandlerError(
+                        'Error: Interrupted init was for the Client Spec: ' +
+                        '\'' + journal.get_client_spec() + '\'')
+                Logger.msg('Resuming the interrupted init...')
+
+            # Download the manifest XML
+            manifest_source = self._get_manifest(args.manifest)
+
+            # Get the Client Spec corresponding to the Command line argument
+            client_spec = self._get_client_spec(args.client_spec)
+
+            if not journal.exists():
+                journal.set_client_spec(args.client_spec)
+                journal.set_manifest(args.manifest)
+                journal.write()
+
+            # Process the repos in the Client Spec in parallel
+            try:
+                repo_states = ThreadPool(args.jobs).map(
+                    lambda repo: self._clone_with_journal(journal,
+                                                          repo,
+                                                          args.bundle_dir,
+                                                          source_client),
+                    client_spec.repo_list)
+            except ThreadPoolError as err:
+                raise CommandHandlerError(str(err))
+
+            if args.optimize:
+                self._optimize_repos(client_spec.repo_list, args.jobs, True)
+
+            # Record the state of the client for the other commands
+            self._store_client_state(client_spec, repo_states)
+
+            # Create the client file, writing the following
+            # The manifest file name
+            # The client spec chosen
+            self._store_client_info(args.client_spec, manifest_source)
+
+            # All done, the journal is not needed anymore
+            journal.remove()
+        except InitJournalError as err:
+            raise CommandHandlerError(str(err))
+
+        return
+
+    def _get_repo_status(self, repo, short=False, client_state=None):
+        """Get the status of a single repo.
+
+        This method needs to be called after acquiring the lock of the repo.
+
+        :param repo: The repo to get the status of.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :param short: If ``True``, only determines whether the repo is dirty,
+            stopping at the first change found, without listing the files.
+            The current branch recorded by the last sync is used if ``HEAD``
+            has not moved since.
+        :type short: Boolean
+        :param client_state: The client state returned by
+            :meth:`_load_client_state`, to look up the recorded current
+            branch in.
+        :type client_state: :class:`repobuddy.client_state.ClientState`
+        :returns: The status of the repo with the keys ``dest``, ``url``,
+            ``branch``, ``current_branch`` (``None`` for a detached
+            ``HEAD``), ``dirty`` and ``elapsed_secs``. Unless ``short`` is
+            ``True``, it also has the keys ``untracked_files``,
+            ``unstaged_files`` and ``staged_files``.
+        :rtype: dict
+        :raises: :exc:`repobuddy.git_wrapper.GitWrapperError` on errors.
+
+        """
+        begin = _time.time()
+        # The index is not refreshed beforehand, which would take
+        # index.lock, as the queries compare the stat-dirty files by content
+        git = GitWrapper(_os.path.join(self._current_dir, repo.dest))
+
+        status = {}
+        status['dest'] = repo.dest
+        status['url'] = repo.url
+        status['branch'] = repo.branch
+        repo_state = None
+        if short:
+            repo_state = self._get_recorded_repo_state(client_state, repo)
+        if repo_state is None:
+            status['current_branch'] = git.get_current_branch()
+        else:
+            status['current_branch'] = repo_state['current_branch']
+        if short:
+            # Check from the cheapest to the most expensive
+            status['dirty'] = git.has_uncommitted_staged_changes() or \
+                git.has_unstaged_changes() or \
+                git.has_untracked_files()
+        else:
+            (status['untracked_files'],
+             status['unstaged_files'],
+             status['staged_files']) = git.get_status()
+            status['dirty'] = len(status['untracked_files']) != 0 or \
+                len(status['unstaged_files']) != 0 or \
+                len(status['staged_files']) != 0
+        status['elapsed_secs'] = round(_time.time() - begin, 3)
+        return status
+
+    def _print_repo_short_status(self, status):
+        """Print a single line summary of the status of a repo.
+
+        :param status: The status of the repo.
+        :type status: dict returned by :meth:`_get_repo_status()`
+        :returns: None
+
+        """
+        summary = 'clean'
+        if status['dirty']:
+            summary = 'dirty'
+
+        if status['current_branch'] is None:
+            summary += ', detached HEAD'
+        elif status['current_branch'] != status['branch']:
+            summary += ', on branch ' + status['current_branch'] + \
+                ' instead of ' + status['branch']
+
+        Logger.msg(status['dest'] + ': ' + summary)
+        return
+
+    def _print_repo_status(self, status):
+        """Print the status of a single repo in the text format.
+
+        :param status: The status of the repo.
+        :type status: dict returned by :meth:`_get_repo_status()`
+        :returns: None
+
+        """
+        Logger.msg('####################################################')
+        Logger.msg('Repo: ' + status['dest'])
+        Logger.msg('Remote URL: ' + status['url'])
+
+        current_branch = status['current_branch']
+        if current_branch is None:
+            current_branch = 'Detached HEAD'
 
-        # Get the Client Spec corresponding to the Command line argument
-        client_spec = self._get_client_spec(args.client_spec)
+        if current_branch != status['branch']:
+            Logger.msg('Original Branch: ' + status['branch'])
+            Logger.msg('Current Branch: ' + current_branch + '\n')
+        else:
+            Logger.msg('Branch: ' + status['branch'] + '\n')
+
+        if len(status['untracked_files']) != 0:
+            Logger.msg('Untracked Files: \n' +
+                       '\n'.join(status['untracked_files']) + '\n')
 
-        # Process each repo in the Client Spec
-        for repo in client_spec.repo_list:
-            git = GitWrapper(self._current_dir)
-            git.clone(repo.url, repo.branch, repo.dest)
+        if len(status['unstaged_files']) != 0:
+            Logger.msg('Unstaged Files: \n' +
+                       '\n'.join(status['unstaged_files']) + '\n')
 
-        # Create the client file, writing the following
-        # The manifest file name
-        # The client spec chosen
-        self._store_client_info(args.client_spec)
+        if len(status['staged_files']) != 0:
+            Logger.msg('Uncommitted Changes: \n' +
+                       '\n'.join(status['staged_files']) + '\n')
 
+        if not status['dirty']:
+            Logger.msg('No uncommitted changes')
         return
 
-    def _exec_status(self):
+    def _exec_status(self, args):
         """Execute the ``status`` command.
 
+        The repos are locked one at a time, and the status of each repo is
+        written out as soon as it is available. With ``--short``, only a
+        summary of each repo is written, without listing the files. With
+        the ``json`` format, the records of the repos are written as the
+        elements of a single JSON array, and with the ``ndjson`` format, as
+        one JSON object per line.
+
+        With the ``json`` and ``ndjson`` formats, a repo whose status cannot
+        be determined is written as a record with the keys ``dest``,
+        ``url``, ``branch`` and ``error``, and the remaining repos are
+        still processed, so that the output stays valid JSON. The JSON
+        array is closed even if the command is stopped midway.
+
         This method needs to be called after acquiring the lock.
 
+        :param args: Arguments to the status command.
+        :type args: Namespace containing the arguments.
         :returns: None
         :raises: :exc:`CommandHandlerError` on errors.
 
+        """
+        client = self._load_client_spec()
+        client_state = None
+        if args.short:
+            client_state = self._load_client_state()
+
+        if args.format == 'json':
+            Logger.msg('[')
+
+        try:
+            # Process each repo in the Client Spec
+            for index, repo in enumerate(client.repo_list):
+                try:
+                    with self._get_repo_locks([repo], shared=True):
+                        status = self._get_repo_status(repo, args.short,
+                                                       client_state)
+                except GitWrapperError as err:
+                    if args.format == 'text':
+                        raise
+                    status = {'dest': repo.dest,
+                              'url': repo.url,
+                              'branch': repo.branch,
+                              'error': str(err)}
+
+                # Write out the status of each repo at once
+                Logger.begin_buffer()
+                try:
+                    if args.format == 'text' and args.short:
+                        self._print_repo_short_status(status)
+                    elif args.format == 'text':
+                        self._print_repo_status(status)
+                    elif args.format == 'json':
+                        # Lead with the separator, so that the array can be
+                        # closed after any of the records
+                        separator = ''
+                        if index != 0:
+                            separator = ','
+                        Logger.msg(separator +
+                                   _json.dumps(status, sort_keys=True))
+                    else:
+                        Logger.msg(_json.dumps(status, sort_keys=True))
+                finally:
+                    Logger.end_buffer()
+        finally:
+            if args.format == 'json':
+                Logger.msg(']')
+
+        if args.format == 'text' and not args.short:
+            Logger.msg(
+                '####################################################')
+        return
+
+    def _create_bundle(self, bundle_dir, repo):
+        """Create the bundle for a single repo.
+
+        :param bundle_dir: Absolute path of the directory to store the
+            bundle in.
+        :type bundle_dir: str
+        :param repo: The repo to create the bundle for.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors in creating the
+            directory, :exc:`repobuddy.git_wrapper.GitWrapperError` if
+            creating the bundle fails.
+
+        """
+        bundle_file = _os.path.join(bundle_dir, repo.dest + '.bundle')
+        try:
+            if not _os.path.isdir(_os.path.dirname(bundle_file)):
+                _os.makedirs(_os.path.dirname(bundle_file))
+        except OSError as err:
+            # Another worker might have created the same directory
+            if not _os.path.isdir(_os.path.dirname(bundle_file)):
+                raise CommandHandlerError('Error: ' + str(err))
+
+        git = GitWrapper(_os.path.join(self._current_dir, repo.dest))
+        with self._get_repo_locks([repo], shared=True):
+            git.create_bundle(bundle_file)
+        Logger.msg('Created bundle: ' + bundle_file)
+        return
+
+    def _exec_bundle_create(self, args):
+        """Execute the ``bundle-create`` command.
+
+        This method needs to be called after acquiring the lock.
+
+        :param args: Arguments to the bundle-create command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        client = self._load_client_spec()
+        bundle_dir = _os.path.normpath(
+            _os.path.join(self._current_dir, args.bundle_dir))
+
+        try:
+            ThreadPool(args.jobs).map(
+                lambda repo: self._create_bundle(bundle_dir, repo),
+                client.repo_list)
+        except ThreadPoolError as err:
+            raise CommandHandlerError(str(err))
+        return
+
+    def _optimize_repo(self, repo, fsmonitor):
+        """Optimize a single repo for the status queries.
+
+        :param repo: The repo to optimize.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :param fsmonitor: If ``True``, the file system monitor is enabled.
+        :type fsmonitor: Boolean
+        :returns: None
+        :raises: :exc:`repobuddy.git_wrapper.GitWrapperError` on errors.
+
+        """
+        begin = _time.time()
+        git = GitWrapper(_os.path.join(self._current_dir, repo.dest))
+        with self._get_repo_locks([repo], shared=False):
+            git.optimize(fsmonitor)
+        Logger.msg('Optimized: %s (%.1f seconds)' %
+                   (repo.dest, _time.time() - begin))
+        return
+
+    def _optimize_repos(self, repos, jobs, fsmonitor):
+        """Optimize ``repos`` in parallel.
+
+        :param repos: The repos to optimize.
+        :type repos: list of :class:`repobuddy.manifest_parser.Repo`
+        :param jobs: Number of repos to optimize in parallel.
+        :type jobs: int
+        :param fsmonitor: If ``True``, the file system monitor is enabled
+            where ``git`` supports it.
+        :type fsmonitor: Boolean
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors,
+            :exc:`repobuddy.git_wrapper.GitWrapperError` if optimizing any
+            of the repos fails.
+
+        """
+        if fsmonitor and \
+                not GitWrapper(self._current_dir).is_fsmonitor_supported():
+            Logger.msg('The file system monitor is not supported by git ' +
+                       'on this platform, skipping it')
+            fsmonitor = False
+
+        try:
+            ThreadPool(jobs).map(
+                lambda repo: self._optimize_repo(repo, fsmonitor),
+                repos)
+        except ThreadPoolError as err:
+            raise CommandHandlerError(str(err))
+        return
+
+    def _exec_optimize(self, args):
+        """Execute the ``optimize`` command.
+
+        Enables the untracked cache, the file system monitor and
+        ``feature.manyFiles``, and writes the commit-graph for every repo in
+        the client, see :meth:`repobuddy.git_wrapper.GitWrapper.optimize`.
+
+        This method needs to be called after acquiring the lock.
+
+        :param args: Arguments to the optimize command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        client = self._load_client_spec()
+        self._optimize_repos(client.repo_list, args.jobs,
+                             not args.no_fsmonitor)
+        return
+
+    def _maintain_repo(self, repo, tasks):
+        """Run the ``git maintenance`` tasks on a single repo.
+
+        The refreshed index is stored afterwards along with the untracked
+        cache and the file system monitor token, which the ``status``
+        command uses without writing them back.
+
+        :param repo: The repo to maintain.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :param tasks: The tasks to run.
+        :type tasks: list of str
+        :returns: The disk space reclaimed from the object store in bytes.
+        :rtype: int
+        :raises: :exc:`repobuddy.git_wrapper.GitWrapperError` on errors.
+
+        """
+        begin = _time.time()
+        git = GitWrapper(_os.path.join(self._current_dir, repo.dest))
+        with self._get_repo_locks([repo], shared=False):
+            size = git.get_object_store_size()
+            git.run_maintenance(tasks)
+            reclaimed = size - git.get_object_store_size()
+            git.refresh_status_cache()
+        Logger.msg('Maintained: %s (%.1f seconds, %s reclaimed)' %
+                   (repo.dest, _time.time() - begin, _format_size(reclaimed)))
+        return reclaimed
+
+    def _exec_maintenance(self, args):
+        """Execute the ``maintenance`` command.
+
+        Runs the ``git maintenance`` tasks on the repos in parallel, starting
+        with the repos having the largest object stores so that the longest
+        runs do not end up last, and refreshes the status caches of the
+        repos. Optionally registers the repos for the
+        periodic maintenance, and starts its schedule.
+
+        This method needs to be called after acquiring the lock.
+
+        :param args: Arguments to the maintenance command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        client = self._load_client_spec()
+        tasks = GitWrapper.MAINTENANCE_TASKS
+        if args.tasks:
+            tasks = [task for task in tasks if task in args.tasks]
+
+        begin = _time.time()
+        try:
+            thread_pool = ThreadPool(args.jobs)
+            sizes = thread_pool.map(
+                lambda repo: GitWrapper(
+                    _os.path.join(self._current_dir,
+                                  repo.dest)).get_object_store_size(),
+                client.repo_list)
+            repos = [repo for (_, repo) in sorted(
+                zip(sizes, client.repo_list),
+                key=lambda size_repo: -size_repo[0])]
+            reclaimed = thread_pool.map(
+                lambda repo: self._maintain_repo(repo, tasks),
+                repos)
+        except ThreadPoolError as err:
+            raise CommandHandlerError(str(err))
+        Logger.msg('Total: %s reclaimed (%.1f seconds)' %
+                   (_format_size(sum(reclaimed)), _time.time() - begin))
+
+        if args.schedule and len(client.repo_list) != 0:
+            # Registering updates the global config, one repo at a time
+            gits = [GitWrapper(_os.path.join(self._current_dir, repo.dest))
+                    for repo in client.repo_list]
+            for git in gits:
+                git.register_maintenance()
+            gits[0].start_maintenance()
+            Logger.msg('Scheduled the periodic maintenance of %d repos' %
+                       len(gits))
+        return
+
+    def _get_repo_stats(self, repo):
+        """Get the disk usage and the object store statistics of a repo.
+
+        :param repo: The repo to get the statistics of.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :returns: The statistics of the repo with the keys ``dest``,
+            ``loose_objects``, ``loose_size``, ``packs``, ``pack_size``,
+            ``garbage_size``, ``object_store_size``, ``work_tree_size``,
+            ``index_entries`` and ``total_size``, where the sizes are in
+            bytes.
+        :rtype: dict
+        :raises: :exc:`repobuddy.git_wrapper.GitWrapperError` on errors.
+
+        """
+        git = GitWrapper(_os.path.join(self._current_dir, repo.dest))
+        with self._get_repo_locks([repo], shared=True):
+            counts = git.get_object_counts()
+            work_tree_size = git.get_work_tree_size()
+            index_entries = git.get_index_entry_count()
+
+        stats = {}
+        stats['dest'] = repo.dest
+        stats['loose_objects'] = counts['count']
+        stats['loose_size'] = counts['size'] * 1024
+        stats['packs'] = counts['packs']
+        stats['pack_size'] = counts['size-pack'] * 1024
+        stats['garbage_size'] = counts['size-garbage'] * 1024
+        stats['object_store_size'] = stats['loose_size'] + \
+            stats['pack_size'] + stats['garbage_size']
+        stats['work_tree_size'] = work_tree_size
+        stats['index_entries'] = index_entries
+        stats['total_size'] = stats['object_store_size'] + work_tree_size
+        return stats
+
+    def _print_stats(self, stats_list):
+        """Print the statistics of the repos as a table in text format.
+
+        :param stats_list: The statistics of the repos, in the order to
+            print them.
+        :type stats_list: list of dict returned by :meth:`_get_repo_stats()`
+        :returns: None
+
+        """
+        totals = {'dest': 'Total'}
+        for key in ['loose_objects', 'packs', 'object_store_size',
+                    'work_tree_size', 'index_entries', 'total_size']:
+            totals[key] = sum([stats[key] for stats in stats_list])
+
+        rows = [['Repo', 'Loose', 'Packs', 'Objects', 'Work-tree',
+                 'Entries', 'Total']]
+        for stats in stats_list + [totals]:
+            rows.append([stats['dest'],
+                         str(stats['loose_objects']),
+                         str(stats['packs']),
+                         _format_size(stats['object_store_size']),
+                         _format_size(stats['work_tree_size']),
+                         str(stats['index_entries']),
+                         _format_size(stats['total_size'])])
+
+        widths = [max([len(row[column]) for row in rows])
+                  for column in range(len(rows[0]))]
+        Logger.begin_buffer()
+        try:
+            for row in rows:
+                Logger.msg(row[0].ljust(widths[0]) + '  ' + '  '.join(
+                    [value.rjust(width)
+                     for (value, width) in zip(row[1:], widths[1:])]))
+        finally:
+            Logger.end_buffer()
+        return
+
+    def _exec_stats(self, args):
+        """Execute the ``stats`` command.
+
+        Gathers the statistics of the repos in parallel, and writes them out
+        sorted by ``args.sort``, with the largest values first. With the
+        ``json`` format, the records of the repos are written as a single
+        JSON array.
+
+        This method needs to be called after acquiring the lock.
+
+        :param args: Arguments to the stats command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        client = self._load_client_spec()
+        try:
+            stats_list = ThreadPool(args.jobs).map(self._get_repo_stats,
+                                                   client.repo_list)
+        except ThreadPoolError as err:
+            raise CommandHandlerError(str(err))
+
+        if args.sort == 'dest':
+            stats_list.sort(key=lambda stats: stats['dest'])
+        else:
+            sort_key = args.sort.replace('-', '_')
+            stats_list.sort(key=lambda stats: (-stats[sort_key],
+                                               stats['dest']))
+
+        if args.format == 'json':
+            Logger.msg(_json.dumps(stats_list, sort_keys=True))
+        else:
+            self._print_stats(stats_list)
+        return
+
+    def _get_pinned_repo(self, client_state, repo):
+        """Get a copy of ``repo`` pinned to its currently checked out commit.
+
+        The commit recorded by the last sync is used if ``HEAD`` has not
+        moved since, without running ``git``.
+
+        This method needs to be called after acquiring the lock of the repo.
+
+        :param client_state: The client state returned by
+            :meth:`_load_client_state`.
+        :type client_state: :class:`repobuddy.client_state.ClientState`
+        :param repo: The repo to pin.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :returns: The pinned repo.
+        :rtype: :class:`repobuddy.manifest_parser.Repo`
+        :raises: :exc:`repobuddy.git_wrapper.GitWrapperError` on errors in
+            getting the commit SHA.
+
+        """
+        pinned_repo = _copy.copy(repo)
+        repo_state = self._get_recorded_repo_state(client_state, repo)
+        if not repo_state is None:
+            pinned_repo.revision = repo_state['head']
+            return pinned_repo
+        git = GitWrapper(_os.path.join(self._current_dir, repo.dest))
+        pinned_repo.revision = git.get_head_revision()
+        return pinned_repo
+
+    def _exec_snapshot(self, args):
+        """Execute the ``snapshot`` command.
+
+        Writes a manifest with a single client spec, in which every repo is
+        pinned to the commit currently checked out in the client.
+
+        This method needs to be called after acquiring the lock.
+
+        :param args: Arguments to the snapshot command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        client = self._load_client_spec()
+        client_state = self._load_client_state()
+
+        try:
+            # Hold the locks of all the repos together, so that the snapshot
+            # is consistent across the repos
+            with self._get_repo_locks(client.repo_list, shared=True):
+                pinned_repos = ThreadPool(args.jobs).map(
+                    lambda repo: self._get_pinned_repo(client_state, repo),
+                    client.repo_list)
+        except ThreadPoolError as err:
+            raise CommandHandlerError(str(err))
+
+        manifest = Manifest(client.name,
+                            [ClientSpec(client.name, pinned_repos)])
+        output_file = _os.path.normpath(
+            _os.path.join(self._current_dir, args.output))
+        try:
+            with AtomicFile(output_file) as file_handle:
+                ManifestWriter().write(manifest, file_handle)
+        except AtomicFileError as err:
+            raise CommandHandlerError(str(err))
+        except IOError as err:
+            raise CommandHandlerError('Error: ' + str(err))
+        Logger.msg('Snapshot written to: ' + output_file)
+        return
+
+    def _exec_manifest_refresh(self, _args):
+        """Execute the ``manifest refresh`` command.
+
+        Retrieves the manifest again from the location the client was
+        initialized with, and replaces ``.repobuddy/manifest.xml`` only if
+        the manifest has changed. Remote manifests are revalidated through
+        the manifest cache, so that an unchanged manifest is not downloaded
+        again. The repos in the client are not modified.
+
+        This method needs to be called after acquiring the lock.
+
+        :param _args: Arguments to the ``manifest refresh`` command.
+        :type _args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on any errors.
+
         """
         if not self._is_client_initialized():
             raise CommandHandlerError(
                 'Error: Uninitialized client, ' +
                 'please run init to initialize the client first')
 
-        # Parse the manifest XML
+        source = self._get_manifest_source_from_config()
         self._parse_manifest()
+        old_manifest = self._manifest
+        self._parse_manifest(self._fetch_manifest(source))
+
+        if self._manifest == old_manifest:
+            Logger.msg('Manifest is up to date')
+            return
+
+        # Verify that the client can still be resolved from the new manifest
+        self._get_client_spec(self._get_client_spec_name_from_config())
+
+        self._store_manifest()
+        Logger.msg('Manifest updated from ' + source)
+        return
+
+    def _diff_client_specs(self, old_client_spec, new_client_spec):
+        """Find the repos which differ between two client specs.
+
+        The repos are matched by their destination directory. Changes to
+        the ``Revision`` or the ``SparseCheckout`` of an existing repo are
+        not applied by ``manifest update``, and are only reported.
+
+        :param old_client_spec: The client spec the client is synced to.
+        :type old_client_spec: :class:`repobuddy.manifest_parser.ClientSpec`
+        :param new_client_spec: The client spec to update the client to.
+        :type new_client_spec: :class:`repobuddy.manifest_parser.ClientSpec`
+        :returns: Tuples of the old and the new repo, with the old repo set
+            to ``None`` for the added repos, the new repo set to ``None``
+            for the removed repos, and both set for the repos whose URL or
+            branch has changed.
+        :rtype: list of Tuple
+
+        """
+        old_repos = dict((repo.dest, repo)
+                         for repo in old_client_spec.repo_list)
+        new_repos = dict((repo.dest, repo)
+                         for repo in new_client_spec.repo_list)
+        updates = []
+        for repo in new_client_spec.repo_list:
+            old_repo = old_repos.get(repo.dest)
+            if old_repo is None or old_repo.url != repo.url or \
+                    old_repo.branch != repo.branch:
+                updates.append((old_repo, repo))
+            if not old_repo is None and \
+                    (old_repo.revision != repo.revision or
+                     old_repo.sparse_paths != repo.sparse_paths):
+                Logger.error('Warning: Not applying the changes to the ' +
+                             'revision or sparse paths of ' + repo.dest +
+                             ', clone it again to apply them')
+        for repo in old_client_spec.repo_list:
+            if not repo.dest in new_repos:
+                updates.append((repo, None))
+        return updates
+
+    def _get_repo_dir(self, repo):
+        """Get the directory of a repo within the client.
+
+        :param repo: The repo.
+        :type repo: :class:`repobuddy.manifest_parser.Repo`
+        :returns: Absolute and normalized path of the repo directory.
+        :rtype: str
+        :raises: :exc:`CommandHandlerError` if the directory is not within
+            the client directory, like for an absolute destination or one
+            with ``..``.
+
+        """
+        repo_dir = _os.path.normpath(_os.path.join(self._current_dir,
+                                                   repo.dest))
+        try:
+            rel_path = _os.path.relpath(repo_dir, self._current_dir)
+        except ValueError:
+            # On a different drive
+            rel_path = _os.pardir
+        if rel_path == _os.curdir or rel_path == _os.pardir or \
+                rel_path.startswith(_os.pardir + _os.sep):
+            raise CommandHandlerError(
+                'Error: Destination \'%s\' is not within the client' %
+                repo.dest)
+        return repo_dir
+
+    def _remove_empty_parent_dirs(self, repo_dir):
+        """Remove the parent directories of a repo left empty.
 
-        # Get the client spec name from client info
-        client = self._get_client_spec(
-            self._get_client_spec_name_from_config())
-
-        # Process each repo in the Client Spec
-        for repo in client.repo_list:
-            git = GitWrapper(
-                _os.path.join(self._current_dir,
-                              repo.dest))
-            Logger.msg('####################################################')
-            Logger.msg('Repo: ' + repo.dest)
-            Logger.msg('Remote URL: ' + repo.url)
-            git.update_index()
-            current_branch = git.get_current_branch()
-            dirty = False
-
-            if current_branch is None:
-                current_branch = 'Detached HEAD'
-
-            if current_branch != repo.branch:
-                Logger.msg('Original Branch: ' + repo.branch)
-                Logger.msg('Current Branch: ' + current_branch + '\n')
+        The directories are removed up to, but not including, the client
+        directory.
+
+        :param repo_dir: Absolute and normalized path of the repo directory,
+            as returned by :meth:`_get_repo_dir`.
+        :type repo_dir: str
+        :returns: None
+
+        """
+        parent_dir = _os.path.dirname(repo_dir)
+        while parent_dir != self._current_dir:
+            try:
+                _os.rmdir(parent_dir)
+            except OSError:
+                # Not empty, or removed by another worker
+                break
+            parent_dir = _os.path.dirname(parent_dir)
+        return
+
+    def _verify_repo_updates(self, updates):
+        """Verify that no local work is lost by applying ``updates``.
+
+        The repos to be removed need to have no local changes or unpushed
+        commits, and the repos switching to a different branch need to
+        have no local changes. The repos also need to be within the client
+        directory.
+
+        :param updates: The updates returned by :meth:`_diff_client_specs`.
+        :type updates: list of Tuple
+        :returns: None
+        :raises: :exc:`CommandHandlerError` listing the repos with local
+            work, or for a repo outside the client directory,
+            :exc:`repobuddy.git_wrapper.GitWrapperError` on errors in
+            getting the status of the repos.
+
+        """
+        dirty_repos = []
+        for (old_repo, new_repo) in updates:
+            for repo in [old_repo, new_repo]:
+                if not repo is None:
+                    self._get_repo_dir(repo)
+            if old_repo is None:
+                continue
+            if not new_repo is None and old_repo.branch == new_repo.branch:
+                continue
+            repo_dir = self._get_repo_dir(old_repo)
+            if not _os.path.isdir(repo_dir):
+                continue
+            git = GitWrapper(repo_dir)
+            git.update_index(optional=True)
+            if git.has_uncommitted_staged_changes() or \
+                    git.has_unstaged_changes() or \
+                    git.has_untracked_files() or \
+                    (new_repo is None and git.has_unpushed_commits()):
+                dirty_repos.append(old_repo.dest)
+        if len(dirty_repos) != 0:
+            raise CommandHandlerError(
+                'Error: Local changes or unpushed commits in the repos: ' +
+                ', '.join(dirty_repos))
+        return
+
+    def _apply_repo_update(self, update):
+        """Apply the update of a single repo.
+
+        Updates which have already been applied, by an earlier
+        ``manifest update`` which failed midway, are skipped.
+
+        :param update: Tuple of the old and the new repo, as returned by
+            :meth:`_diff_client_specs`.
+        :type update: Tuple
+        :returns: The state of the updated repo, as returned by
+            :meth:`_get_repo_sync_state`, or ``None`` for a removed repo.
+        :rtype: Tuple
+        :raises: :exc:`CommandHandlerError` on errors in removing a repo,
+            or for a repo outside the client directory,
+            :exc:`repobuddy.git_wrapper.GitWrapperError` if any of the
+            ``git`` commands fail.
+
+        """
+        (old_repo, new_repo) = update
+        repo = old_repo if new_repo is None else new_repo
+        repo_dir = self._get_repo_dir(repo)
+
+        with self._get_repo_locks([repo], shared=False):
+            if new_repo is None:
+                if _os.path.isdir(repo_dir):
+                    try:
+                        _shutil.rmtree(repo_dir)
+                    except OSError as err:
+                        raise CommandHandlerError('Error: ' + str(err))
+                    self._remove_empty_parent_dirs(repo_dir)
+                Logger.msg('Removed: ' + repo.dest)
+            elif old_repo is None:
+                if _os.path.isdir(repo_dir) and \
+                        GitWrapper(repo_dir).is_clone_complete(repo.branch):
+                    Logger.debug('Skipping the already cloned repo: ' +
+                                 repo.dest)
+                else:
+                    self._get_remote_git(self._current_dir).clone(
+                        repo.url, repo.branch, repo.dest,
+                        bundle=self._get_bundle_file(repo, None),
+                        revision=repo.revision,
+                        sparse_paths=repo.sparse_paths)
+                Logger.msg('Added: ' + repo.dest)
             else:
-                Logger.msg('Branch: ' + repo.branch + '\n')
-
-            untracked_files = git.get_untracked_files()
-            if len(untracked_files) != 0:
-                Logger.msg(
-                    'Untracked Files: \n' + '\n'.join(untracked_files) + '\n')
-                dirty = True
-
-            unstaged_files = git.get_unstaged_files()
-            if len(unstaged_files) != 0:
-                Logger.msg(
-                    'Unstaged Files: \n' + '\n'.join(unstaged_files) + '\n')
-                dirty = True
-
-            uncommitted_staged_files = git.get_uncommitted_staged_files()
-            if len(uncommitted_staged_files) != 0:
-                Logger.msg('Uncommitted Changes: \n' +
-                           '\n'.join(uncommitted_staged_files) + '\n')
-                dirty = True
-
-            if not dirty:
-                Logger.msg('No uncommitted changes')
-        Logger.msg('####################################################')
+                git = self._get_remote_git(repo_dir)
+                if old_repo.url != repo.url:
+                    git.set_remote_url(repo.url)
+                    Logger.msg('Changed the URL: ' + repo.dest)
+                if old_repo.branch != repo.branch:
+                    git.switch_branch(repo.branch)
+                    Logger.msg('Switched to the branch ' + repo.branch +
+                               ': ' + repo.dest)
+            if new_repo is None:
+                return None
+            return self._get_repo_sync_state(repo)
+
+    def _exec_manifest_update(self, args):
+        """Execute the ``manifest update`` command.
+
+        Diffs the client spec in the new manifest against the one the
+        client is synced to, and applies only the differences to the
+        repos in parallel. The removals are applied first, so that a new
+        repo can take the place of a removed one. Once all the repos are
+        updated, the client is switched over to the new manifest.
+
+        This method needs to be called after acquiring the lock.
+
+        :param args: Arguments to the ``manifest update`` command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on any errors.
+
+        """
+        old_client_spec = self._load_client_spec()
+        self._set_remote_options(args)
+
+        if args.manifest is None:
+            source = self._get_manifest_source_from_config()
+        else:
+            source = self._resolve_manifest_source(args.manifest)
+        self._parse_manifest(self._fetch_manifest(source))
+        client_spec_name = self._get_client_spec_name_from_config()
+        new_client_spec = self._get_client_spec(client_spec_name)
+
+        updates = self._diff_client_specs(old_client_spec, new_client_spec)
+        self._verify_repo_updates(updates)
+
+        try:
+            thread_pool = ThreadPool(args.jobs)
+            thread_pool.map(self._apply_repo_update,
+                            [update for update in updates
+                             if update[1] is None])
+            repo_states = thread_pool.map(self._apply_repo_update,
+                                          [update for update in updates
+                                           if not update[1] is None])
+        except ThreadPoolError as err:
+            raise CommandHandlerError(str(err))
+
+        # Switch the client over to the new manifest, the states of the
+        # repos which were not updated are retained
+        self._store_manifest()
+        self._store_client_state(new_client_spec, repo_states)
+        self._store_client_info(client_spec_name, source)
+
+        if len(updates) == 0:
+            Logger.msg('Client is up to date')
+        return
+
+    def _exec_manifest_validate(self, args):
+        """Execute the ``manifest validate`` command.
+
+        Parses the manifest, reporting all the errors found in it together.
+        The client, if any, is not modified, and hence no lock is held.
+
+        :param args: Arguments to the ``manifest validate`` command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on any errors.
+
+        """
+        if not args.manifest is None:
+            source = self._resolve_manifest_source(args.manifest)
+        elif self._is_client_initialized():
+            source = self._get_manifest_source_from_config()
+        else:
+            raise CommandHandlerError(
+                'Error: Uninitialized client, ' +
+                'please specify the manifest to validate')
+
+        self._parse_manifest(self._fetch_manifest(source))
+
+        repos = set()
+        for client_spec in self._manifest.client_spec_list:
+            repos.update(id(repo) for repo in client_spec.repo_list)
+        Logger.msg('Manifest is valid: %d Client Specs, %d Repos' %
+                   (len(self._manifest.client_spec_list), len(repos)))
+        return
+
+    def _exec_manifest_compile(self, args):
+        """Execute the ``manifest compile`` command.
+
+        Compiles the manifest file into the binary format of
+        :class:`repobuddy.compiled_manifest.CompiledManifest`. Compiling the
+        manifest of the client makes the other commands load the client
+        spec from ``.repobuddy/manifest.bin``, which is kept up to date with
+        the manifest from then on. The compiled manifest is replaced
+        atomically, and hence no lock is held.
+
+        :param args: Arguments to the ``manifest compile`` command.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on any errors.
+
+        """
+        if not args.manifest is None:
+            manifest_file = _os.path.normpath(
+                _os.path.join(self._current_dir, args.manifest))
+            compiled_file = _os.path.splitext(manifest_file)[0] + '.bin'
+        elif self._is_client_initialized():
+            manifest_file = self._manifest_file
+            compiled_file = self._compiled_manifest_file
+        else:
+            raise CommandHandlerError(
+                'Error: Uninitialized client, ' +
+                'please specify the manifest to compile')
+        if not args.output is None:
+            compiled_file = _os.path.normpath(
+                _os.path.join(self._current_dir, args.output))
+
+        try:
+            CompiledManifest.compile(manifest_file, compiled_file, self._sync)
+        except CompiledManifestError as err:
+            raise CommandHandlerError(str(err))
+        Logger.msg('Compiled manifest written to: ' + compiled_file)
+        return
+
+    def _exec_serve(self):
+        """Execute the ``serve`` command.
+
+        Serves the commands on the socket ``.repobuddy/server.sock`` until
+        interrupted or terminated. Each served command acquires the lock on
+        its own.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        if not self._is_client_initialized():
+            raise CommandHandlerError(
+                'Error: Uninitialized client, ' +
+                'please run init to initialize the client first')
+
+        try:
+            server = Server(Server.get_socket_file(self._current_dir),
+                            self.get_handlers())
+            server.start()
+        except ServerError as err:
+            raise CommandHandlerError(str(err))
+
+        # Stop cleanly when terminated, removing the socket file
+        _signal.signal(_signal.SIGTERM,
+                       lambda _signum, _frame: server.stop())
+
+        Logger.msg('Serving on ' + Server.get_socket_file(self._current_dir))
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            pass
+        Logger.msg('Server stopped')
         return
 
     def __init__(self):
         """Initializer."""
         self._manifest = None
+        self._client_spec_cache = None
+        self._retry_policy = None
+        self._connection_limiter = None
+        self._git_timeout = None
+        self._sync = True
         self._current_dir = _os.getcwd()
         self._repo_buddy_dir = _os.path.join(self._current_dir, '.repobuddy')
         self._manifest_file = _os.path.join(self._repo_buddy_dir,
                                             'manifest.xml')
+        self._compiled_manifest_file = _os.path.join(self._repo_buddy_dir,
+                                                     'manifest.bin')
         self._client_info_file = _os.path.join(
             self._repo_buddy_dir,
             'client.config')
+        self._init_journal_file = _os.path.join(
+            self._repo_buddy_dir,
+            'init.journal')
+        self._client_state_file = _os.path.join(self._repo_buddy_dir,
+                                                'client.state')
+        self._repo_locks_dir = _os.path.join(self._repo_buddy_dir, 'locks')
         return
 
     def get_handlers(self):
@@ -324,6 +1838,17 @@ class CommandHandler(object):
         handlers = {}
         handlers['init'] = self.init_command_handler
         handlers['status'] = self.status_command_handler
+        handlers['bundle-create'] = self.bundle_create_command_handler
+        handlers['snapshot'] = self.snapshot_command_handler
+        handlers['optimize'] = self.optimize_command_handler
+        handlers['maintenance'] = self.maintenance_command_handler
+        handlers['stats'] = self.stats_command_handler
+        handlers['serve'] = self.serve_command_handler
+        handlers['manifest refresh'] = self.manifest_refresh_command_handler
+        handlers['manifest update'] = self.manifest_update_command_handler
+        handlers['manifest validate'] = \
+            self.manifest_validate_command_handler
+        handlers['manifest compile'] = self.manifest_compile_command_handler
         return handlers
 
     def init_command_handler(self, args):
@@ -336,12 +1861,112 @@ class CommandHandler(object):
         self._exec_with_lock(self._exec_init, args)
         return
 
-    def status_command_handler(self, _args):
+    def status_command_handler(self, args):
         """Handler for the ``status`` command.
 
         :returns: None
         :raises: :exc:`CommandHandlerError` on errors.
 
         """
-        self._exec_with_lock(self._exec_status)
+        self._exec_with_shared_lock(self._exec_status, args)
+        return
+
+    def bundle_create_command_handler(self, args):
+        """Handler for the ``bundle-create`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_shared_lock(self._exec_bundle_create, args)
+        return
+
+    def snapshot_command_handler(self, args):
+        """Handler for the ``snapshot`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_shared_lock(self._exec_snapshot, args)
+        return
+
+    def optimize_command_handler(self, args):
+        """Handler for the ``optimize`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_shared_lock(self._exec_optimize, args)
+        return
+
+    def maintenance_command_handler(self, args):
+        """Handler for the ``maintenance`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_shared_lock(self._exec_maintenance, args)
+        return
+
+    def stats_command_handler(self, args):
+        """Handler for the ``stats`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_shared_lock(self._exec_stats, args)
+        return
+
+    def serve_command_handler(self, _args):
+        """Handler for the ``serve`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_serve()
+        return
+
+    def manifest_refresh_command_handler(self, args):
+        """Handler for the ``manifest refresh`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_lock(self._exec_manifest_refresh, args)
+        return
+
+    def manifest_update_command_handler(self, args):
+        """Handler for the ``manifest update`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_with_lock(self._exec_manifest_update, args)
+        return
+
+    def manifest_validate_command_handler(self, args):
+        """Handler for the ``manifest validate`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_manifest_validate(args)
+        return
+
+    def manifest_compile_command_handler(self, args):
+        """Handler for the ``manifest compile`` command.
+
+        :returns: None
+        :raises: :exc:`CommandHandlerError` on errors.
+
+        """
+        self._exec_manifest_compile(args)
         return
@@ -0,0 +1,533 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+.. module: repobuddy.compiled_manifest
+   :platform: Unix, Windows
+   :synopsis: Compiles the manifest into a binary format read lazily.
+.. moduleauthor: Ash <tuxdude.github@gmail.com>
+
+"""
+
+import hashlib as _hashlib
+import io as _io
+import mmap as _mmap
+import os as _os
+import struct as _struct
+
+from repobuddy.manifest_parser import ClientSpec, Manifest, ManifestParser, \
+    ManifestParserError, Repo
+from repobuddy.utils import AtomicFile, AtomicFileError, \
+    RepoBuddyBaseException
+
+
+class CompiledManifestError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`CompiledManifest`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(CompiledManifestError, self).__init__(error_str)
+        return
+
+
+class CompiledManifest(object):
+
+    """Reads a manifest compiled into a binary format.
+
+    The compiled manifest is a cache of the manifest XML, which can be
+    memory-mapped and read lazily, so that looking up a single client spec
+    in a manifest with tens of thousands of repos does not need to parse or
+    decode the whole manifest. It consists of the following sections, with
+    all the integers stored as little-endian unsigned 32-bit values:
+
+    -   A header with the SHA-1 digest of the manifest XML and the files it
+        included, which is used to detect a stale compiled manifest.
+    -   A string table, with the offset and the length of each UTF-8 encoded
+        string. The strings are de-duplicated, so that the URLs and branches
+        shared by many repos are stored just once.
+    -   Fixed size repo records, with the string indexes of the fields. The
+        repos shared between the client specs are stored just once.
+    -   Fixed size client spec records, referring to ranges of the
+        reference array for their repos and the client specs they extend.
+    -   The reference array, followed by the string data.
+
+    Used as a context manager, which closes the compiled manifest on exit.
+
+    """
+
+    _MAGIC = b'RBMF'
+    _VERSION = 1
+    _NONE = 0xffffffff
+
+    # magic, version, reserved, digest, default client spec, string count,
+    # repo count, client spec count, reference count, start and count of the
+    # included files in the references
+    _HEADER = _struct.Struct('<4sHH20s7I')
+    # offset, length
+    _STRING = _struct.Struct('<2I')
+    # url, branch, dest, bundle, revision, sparse paths start and count
+    _REPO = _struct.Struct('<7I')
+    # name, extends start and count, repos start and count
+    _CLIENT_SPEC = _struct.Struct('<5I')
+    _REFERENCE_SIZE = 4
+
+    @classmethod
+    def _get_digest(cls, manifest_file, included_files, contents=None):
+        """Compute the digest of the manifest and the files it included.
+
+        :param manifest_file: Name of the manifest XML file.
+        :type manifest_file: str
+        :param included_files: Names of the files included by the manifest.
+        :type included_files: list of str
+        :param contents: Contents of ``manifest_file`` if already read.
+        :type contents: bytes
+        :returns: The SHA-1 digest, ``None`` if any of the included files
+            cannot be read.
+        :rtype: bytes
+        :raises: :exc:`CompiledManifestError` if unable to read
+            ``manifest_file``.
+
+        """
+        digest = _hashlib.sha1()
+        if contents is None:
+            try:
+                with open(manifest_file, 'rb') as file_handle:
+                    contents = file_handle.read()
+            except IOError as err:
+                raise CompiledManifestError('Error: ' + str(err))
+        digest.update(contents)
+        for file_name in included_files:
+            try:
+                with open(file_name, 'rb') as file_handle:
+                    digest.update(file_handle.read())
+            except IOError:
+                return None
+        return digest.digest()
+
+    @classmethod
+    def _serialize(cls, manifest, digest, included_files):
+        """Serialize the manifest into the compiled format.
+
+        :param manifest: The parsed manifest.
+        :type manifest: :class:`repobuddy.manifest_parser.Manifest`
+        :param digest: Digest of the manifest XML and the included files.
+        :type digest: bytes
+        :param included_files: Names of the files included by the manifest.
+        :type included_files: list of str
+        :returns: The compiled manifest.
+        :rtype: bytes
+
+        """
+        strings = []
+        string_indexes = {}
+        repo_indexes = {}
+        repo_records = []
+        client_spec_records = []
+        references = []
+
+        def _add_string(value):
+            if value is None:
+                return cls._NONE
+            data = value.encode('utf-8')
+            if not data in string_indexes:
+                string_indexes[data] = len(strings)
+                strings.append(data)
+            return string_indexes[data]
+
+        def _add_references(values):
+            if values is None:
+                return (cls._NONE, cls._NONE)
+            start = len(references)
+            references.extend(values)
+            return (start, len(values))
+
+        for client_spec in manifest.client_spec_list:
+            repo_refs = []
+            for repo in client_spec.repo_list:
+                # The inherited repos are shared, and stored only once
+                if not id(repo) in repo_indexes:
+                    repo_indexes[id(repo)] = len(repo_records)
+                    sparse_paths = None
+                    if not repo.sparse_paths is None:
+                        sparse_paths = [_add_string(path)
+                                        for path in repo.sparse_paths]
+                    repo_records.append(
+                        (_add_string(repo.url),
+                         _add_string(repo.branch),
+                         _add_string(repo.dest),
+                         _add_string(repo.bundle),
+                         _add_string(repo.revision)) +
+                        _add_references(sparse_paths))
+                repo_refs.append(repo_indexes[id(repo)])
+            extends = None
+            if not client_spec.extends is None:
+                extends = [_add_string(name) for name in client_spec.extends]
+            client_spec_records.append(
+                (_add_string(client_spec.name),) +
+                _add_references(extends) +
+                _add_references(repo_refs))
+        included = _add_references(
+            [_add_string(file_name) for file_name in included_files])
+        default_client_spec = _add_string(manifest.default_client_spec)
+
+        data = _io.BytesIO()
+        data.write(cls._HEADER.pack(cls._MAGIC, cls._VERSION, 0, digest,
+                                    default_client_spec,
+                                    len(strings),
+                                    len(repo_records),
+                                    len(client_spec_records),
+                                    len(references),
+                                    included[0],
+                                    included[1]))
+        offset = 0
+        for string in strings:
+            data.write(cls._STRING.pack(offset, len(string)))
+            offset += len(string)
+        for record in repo_records:
+            data.write(cls._REPO.pack(*record))
+        for record in client_spec_records:
+            data.write(cls._CLIENT_SPEC.pack(*record))
+        data.write(_struct.pack('<%dI' % len(references), *references))
+        for string in strings:
+            data.write(string)
+        return data.getvalue()
+
+    @classmethod
+    def compile(cls, manifest_file, compiled_file, sync=True):
+        """Compile the manifest XML.
+
+        :param manifest_file: Name of the manifest XML file.
+        :type manifest_file: str
+        :param compiled_file: Name of the file to write the compiled
+            manifest into. The file is replaced atomically.
+        :type compiled_file: str
+        :param sync: If ``True``, the compiled manifest is flushed to the
+            disk.
+        :type sync: Boolean
+        :returns: None
+        :raises: :exc:`CompiledManifestError` on errors in reading or
+            parsing the manifest, or in writing the compiled manifest.
+
+        """
+        manifest_file = _os.path.abspath(manifest_file)
+        try:
+            with open(manifest_file, 'rb') as file_handle:
+                contents = file_handle.read()
+        except IOError as err:
+            raise CompiledManifestError('Error: ' + str(err))
+
+        manifest_parser = ManifestParser()
+        try:
+            manifest_parser.parse(_io.BytesIO(contents),
+                                  _os.path.dirname(manifest_file))
+        except ManifestParserError as err:
+            raise CompiledManifestError(str(err))
+
+        included_files = manifest_parser.get_included_files()
+        digest = cls._get_digest(manifest_file, included_files, contents)
+        if digest is None:
+            raise CompiledManifestError(
+                'Error: Included files changed while compiling ' +
+                manifest_file)
+        data = cls._serialize(manifest_parser.get_manifest(), digest,
+                              included_files)
+        try:
+            with AtomicFile(compiled_file, sync, 'wb') as file_handle:
+                file_handle.write(data)
+        except AtomicFileError as err:
+            raise CompiledManifestError(str(err))
+        except IOError as err:
+            raise CompiledManifestError('Error: ' + str(err))
+        return
+
+    @classmethod
+    def load(cls, manifest_file, compiled_file, sync=True):
+        """Open the compiled manifest, compiling the manifest if needed.
+
+        The manifest is compiled again if the compiled manifest is missing,
+        cannot be read, or is stale.
+
+        :param manifest_file: Name of the manifest XML file.
+        :type manifest_file: str
+        :param compiled_file: Name of the compiled manifest file.
+        :type compiled_file: str
+        :param sync: If ``True``, a newly compiled manifest is flushed to
+            the disk.
+        :type sync: Boolean
+        :returns: The compiled manifest.
+        :rtype: :class:`CompiledManifest`
+        :raises: :exc:`CompiledManifestError` on errors.
+
+        """
+        try:
+            compiled_manifest = cls(compiled_file)
+        except CompiledManifestError:
+            compiled_manifest = None
+
+        if not compiled_manifest is None:
+            try:
+                digest = cls._get_digest(
+                    manifest_file,
+                    compiled_manifest.get_included_files())
+            except CompiledManifestError:
+                compiled_manifest.close()
+                raise
+            if digest == compiled_manifest.get_source_digest():
+                return compiled_manifest
+            compiled_manifest.close()
+
+        cls.compile(manifest_file, compiled_file, sync)
+        return cls(compiled_file)
+
+    def _get_string(self, index):
+        """Read a string from the string table.
+
+        :param index: Index of the string.
+        :type index: int
+        :returns: The string, ``None`` for a missing value.
+        :rtype: str
+
+        """
+        if index == type(self)._NONE:
+            return None
+        (offset, length) = type(self)._STRING.unpack_from(
+            self._map,
+            self._strings_offset + index * type(self)._STRING.size)
+        offset += self._string_data_offset
+        return self._map[offset:offset + length].decode('utf-8')
+
+    def _get_references(self, start, count):
+        """Read a range of the reference array.
+
+        :param start: Index of the first reference.
+        :type start: int
+        :param count: Number of references.
+        :type count: int
+        :returns: The references, ``None`` for a missing range.
+        :rtype: tuple of int
+
+        """
+        if count == type(self)._NONE:
+            return None
+        return _struct.unpack_from(
+            '<%dI' % count,
+            self._map,
+            self._references_offset + start * type(self)._REFERENCE_SIZE)
+
+    def _get_repo(self, index):
+        """Read a repo, reusing the repo if it was read before.
+
+        :param index: Index of the repo.
+        :type index: int
+        :returns: The repo.
+        :rtype: :class:`repobuddy.manifest_parser.Repo`
+
+        """
+        if index in self._repos:
+            return self._repos[index]
+        (url, branch, dest, bundle, revision, sparse_start, sparse_count) = \
+            type(self)._REPO.unpack_from(
+                self._map,
+                self._repos_offset + index * type(self)._REPO.size)
+        sparse_paths = self._get_references(sparse_start, sparse_count)
+        if not sparse_paths is None:
+            sparse_paths = [self._get_string(path) for path in sparse_paths]
+        repo = Repo(self._get_string(url),
+                    self._get_string(branch),
+                    self._get_string(dest),
+                    self._get_string(bundle),
+                    self._get_string(revision),
+                    sparse_paths)
+        self._repos[index] = repo
+        return repo
+
+    def _get_client_spec_record(self, index):
+        """Read the record of a client spec.
+
+        :param index: Index of the client spec.
+        :type index: int
+        :returns: The name, the start and count of the extends references,
+            and the start and count of the repo references.
+        :rtype: tuple of int
+
+        """
+        return type(self)._CLIENT_SPEC.unpack_from(
+            self._map,
+            self._client_specs_offset + index * type(self)._CLIENT_SPEC.size)
+
+    def __init__(self, compiled_file):
+        """Initializer.
+
+        :param compiled_file: Name of the compiled manifest file.
+        :type compiled_file: str
+        :raises: :exc:`CompiledManifestError` if the file cannot be read,
+            or is not a compiled manifest.
+
+        """
+        self._file_handle = None
+        self._map = None
+        try:
+            self._file_handle = open(compiled_file, 'rb')
+            self._map = _mmap.mmap(self._file_handle.fileno(), 0,
+                                   access=_mmap.ACCESS_READ)
+        except (EnvironmentError, ValueError) as err:
+            self.close()
+            raise CompiledManifestError('Error: ' + str(err))
+
+        cls = type(self)
+        try:
+            (magic, version, _reserved, self._digest, default_client_spec,
+             string_count, repo_count, client_spec_count, reference_count,
+             included_start, included_count) = \
+                cls._HEADER.unpack_from(self._map, 0)
+        except _struct.error:
+            magic = None
+        if magic != cls._MAGIC or version != cls._VERSION:
+            self.close()
+            raise CompiledManifestError(
+                'Error: ' + compiled_file + ' is not a compiled manifest')
+
+        self._strings_offset = cls._HEADER.size
+        self._repos_offset = self._strings_offset + \
+            string_count * cls._STRING.size
+        self._client_specs_offset = self._repos_offset + \
+            repo_count * cls._REPO.size
+        self._references_offset = self._client_specs_offset + \
+            client_spec_count * cls._CLIENT_SPEC.size
+        self._string_data_offset = self._references_offset + \
+            reference_count * cls._REFERENCE_SIZE
+        if len(self._map) < self._string_data_offset:
+            self.close()
+            raise CompiledManifestError(
+                'Error: ' + compiled_file + ' is truncated')
+
+        self._default_client_spec = default_client_spec
+        self._client_spec_count = client_spec_count
+        self._included = (included_start, included_count)
+        self._client_spec_indexes = None
+        self._repos = {}
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+        return
+
+    def close(self):
+        """Close the compiled manifest.
+
+        :returns: None
+
+        """
+        if not self._map is None:
+            self._map.close()
+            self._map = None
+        if not self._file_handle is None:
+            self._file_handle.close()
+            self._file_handle = None
+        return
+
+    def get_source_digest(self):
+        """Get the digest of the manifest the compiled manifest is from.
+
+        :returns: The SHA-1 digest of the manifest XML and the files it
+            included.
+        :rtype: bytes
+
+        """
+        return self._digest
+
+    def get_included_files(self):
+        """Get the files included by the manifest.
+
+        :returns: Absolute paths of the included files.
+        :rtype: list of str
+
+        """
+        return [self._get_string(index)
+                for index in self._get_references(*self._included)]
+
+    def get_default_client_spec(self):
+        """Get the name of the default client spec.
+
+        :returns: Name of the default client spec.
+        :rtype: str
+
+        """
+        return self._get_string(self._default_client_spec)
+
+    def get_client_spec_names(self):
+        """Get the names of all the client specs.
+
+        :returns: The names of the client specs, in the manifest order.
+        :rtype: list of str
+
+        """
+        return [self._get_string(self._get_client_spec_record(index)[0])
+                for index in range(self._client_spec_count)]
+
+    def get_client_spec(self, client_spec_name):
+        """Get a client spec, reading only its repos.
+
+        :param client_spec_name: Name of the client spec.
+        :type client_spec_name: str
+        :returns: The client spec, with the repos shared with the other
+            client specs read from this compiled manifest.
+        :rtype: :class:`repobuddy.manifest_parser.ClientSpec`
+        :raises: :exc:`CompiledManifestError` if the client spec is not
+            found.
+
+        """
+        if self._client_spec_indexes is None:
+            # Index the client specs by name on the first lookup
+            self._client_spec_indexes = dict(
+                (name, index)
+                for (index, name) in enumerate(self.get_client_spec_names()))
+        if not client_spec_name in self._client_spec_indexes:
+            raise CompiledManifestError(
+                'Error: Unable to find the Client Spec: \'' +
+                client_spec_name + '\'')
+
+        (_name, extends_start, extends_count, repos_start, repos_count) = \
+            self._get_client_spec_record(
+                self._client_spec_indexes[client_spec_name])
+        extends = self._get_references(extends_start, extends_count)
+        if not extends is None:
+            extends = [self._get_string(index) for index in extends]
+        repo_list = [self._get_repo(index)
+                     for index in self._get_references(repos_start,
+                                                       repos_count)]
+        return ClientSpec(client_spec_name, repo_list, extends)
+
+    def get_manifest(self):
+        """Read the whole manifest.
+
+        :returns: The manifest.
+        :rtype: :class:`repobuddy.manifest_parser.Manifest`
+
+        """
+        return Manifest(self.get_default_client_spec(),
+                        [self.get_client_spec(name)
+                         for name in self.get_client_spec_names()])
@@ -23,12 +23,23 @@
 
 """
 
+import errno as _errno
 import os as _os
 import re as _re
 import shlex as _shlex
+import signal as _signal
+import struct as _struct
 import subprocess as _subprocess
+import sys as _sys
+import threading as _threading
 
-from repobuddy.utils import Logger, RepoBuddyBaseException
+try:
+    from shutil import which as _which
+except ImportError:
+    from distutils.spawn import find_executable as _which
+
+from repobuddy.utils import ConnectionLimiter, Logger, \
+    RepoBuddyBaseException, RetryPolicy
 
 
 class GitWrapperError(RepoBuddyBaseException):
@@ -38,10 +49,13 @@ class GitWrapperError(RepoBuddyBaseException):
     :ivar is_git_error: Set to ``True`` if :class:`GitWrapper` got back a
         non-zero status after executing of any of the git commands, otherwise
         ``False``.
+    :ivar timed_out: Set to ``True`` if the git command was killed on
+        running past its timeout, otherwise ``False``.
 
     """
 
-    def __init__(self, error_str, is_git_error, git_error_msg=''):
+    def __init__(self, error_str, is_git_error, git_error_msg='',
+                 timed_out=False):
         """Initializer.
 
         :param error_str: The error string to store in the exception.
@@ -51,6 +65,269 @@ class GitWrapperError(RepoBuddyBaseException):
         super(GitWrapperError, self).__init__(error_str)
         self.is_git_error = is_git_error
         self.git_error_msg = git_error_msg
+        self.timed_out = timed_out
+        return
+
+
+class _GitProcess(object):
+
+    """Runs a ``git`` process which can be timed out and cancelled.
+
+    The process is started in its own process group, so that killing it
+    also kills the helpers spawned by ``git`` (``ssh``,
+    ``git-remote-https``, ...) which would otherwise keep the pipes open.
+    Its environment disables the credential prompts, since a prompt would
+    block forever when ``git`` runs in parallel or without a terminal.
+
+    Used as::
+
+        with _GitProcess(command, args, cwd, timeout) as git_proc:
+            git_proc.proc.communicate()
+
+    The process is killed if it is still running when the ``with`` block
+    exits, also on exceptions such as :exc:`KeyboardInterrupt`.
+
+    """
+
+    # Seconds to wait for the processes to terminate before killing them
+    KILL_GRACE_PERIOD = 5
+
+    # Niceness of the low priority processes
+    LOW_PRIORITY_NICENESS = 19
+
+    # Processes of all the instances which are running
+    _running = set()
+    _lock = _threading.Lock()
+    _cancelled = False
+
+    # Command line prefix running a process with a low priority, looked up
+    # on first use
+    _low_priority_prefix = None
+
+    @classmethod
+    def _get_env(cls, extra_env):
+        """Get the environment of a ``git`` process.
+
+        :param extra_env: Environment variables to add to the environment.
+        :type extra_env: dict
+        :returns: The environment of the caller with ``extra_env``, and with
+            the prompts disabled.
+        :rtype: dict
+
+        """
+        env = dict(_os.environ)
+        env.update(extra_env)
+        env['GIT_TERMINAL_PROMPT'] = '0'
+        env['GCM_INTERACTIVE'] = 'never'
+        return env
+
+    @classmethod
+    def _get_low_priority_prefix(cls):
+        """Get the command line prefix to run a low priority process.
+
+        The process is run with ``nice``, and with the lowest priority of
+        the best-effort I/O scheduling class using ``ionice`` where it is
+        available, so that it yields the CPU and the disk to the other
+        processes.
+
+        :returns: The command line prefix, empty if neither of the commands
+            are available.
+        :rtype: list of str
+
+        """
+        with cls._lock:
+            if cls._low_priority_prefix is None:
+                prefix = []
+                if not _which('nice') is None:
+                    prefix += ['nice', '-n', str(cls.LOW_PRIORITY_NICENESS)]
+                if not _which('ionice') is None:
+                    prefix += ['ionice', '-c', '2', '-n', '7']
+                cls._low_priority_prefix = prefix
+        return cls._low_priority_prefix
+
+    @classmethod
+    def cancel_all(cls):
+        """Kill the running processes, and fail the ones started later.
+
+        :returns: None
+
+        """
+        with cls._lock:
+            cls._cancelled = True
+            running = list(cls._running)
+        for git_proc in running:
+            git_proc.cancelled = True
+            git_proc.kill()
+        return
+
+    @classmethod
+    def reset_cancel(cls):
+        """Allow starting processes again after :meth:`cancel_all`.
+
+        :returns: None
+
+        """
+        with cls._lock:
+            cls._cancelled = False
+        return
+
+    def __init__(self, command, args, cwd, timeout=None, env=None,
+                 stdout=None, stderr=None, low_priority=False):
+        """Initializer.
+
+        :param command: The git command string, for the error messages.
+        :type command: str
+        :param args: The full command line.
+        :type args: list of str
+        :param cwd: Directory to run the process in.
+        :type cwd: str
+        :param timeout: Seconds after which the process is killed, ``None``
+            for no timeout.
+        :type timeout: float
+        :param env: Environment variables to set for the process, in
+            addition to the environment of the caller.
+        :type env: dict
+        :param stdout: ``stdout`` of the process, as in
+            :class:`subprocess.Popen`.
+        :param stderr: ``stderr`` of the process, as in
+            :class:`subprocess.Popen`.
+        :param low_priority: If ``True``, the process is run with a low CPU
+            and I/O priority, where supported.
+        :type low_priority: Boolean
+
+        """
+        self._command = command
+        self._args = args
+        self._low_priority = low_priority
+        self._cwd = cwd
+        self._timeout = timeout
+        self._env = env or {}
+        self._kwargs = {'stdout': stdout, 'stderr': stderr}
+        self._timer = None
+        self._kill_timer = None
+        self.proc = None
+        self.timed_out = False
+        self.cancelled = False
+        return
+
+    def _on_timeout(self):
+        """Kill the process once it runs past its timeout."""
+        if self.proc.poll() is None:
+            self.timed_out = True
+            self.kill()
+        return
+
+    def _signal_group(self, signum):
+        """Send ``signum`` to the process group of the process.
+
+        :param signum: The signal to send.
+        :type signum: int
+        :returns: None
+
+        """
+        try:
+            _os.killpg(self.proc.pid, signum)
+        except OSError as err:
+            # The processes exited in the meantime
+            if err.errno != _errno.ESRCH:
+                raise
+        return
+
+    def _force_kill(self):
+        """Kill the process group if it ignored the termination request."""
+        if self.proc.poll() is None:
+            self._signal_group(_signal.SIGKILL)
+        return
+
+    def kill(self):
+        """Kill the process group of the process if it is still running.
+
+        The processes are first asked to terminate, which lets ``git``
+        remove the partial clones, and are killed if they are still running
+        after the grace period.
+
+        :returns: None
+
+        """
+        if self.proc is None or not self.proc.poll() is None:
+            return
+        if not hasattr(_os, 'killpg'):
+            self.proc.kill()
+            return
+        self._signal_group(_signal.SIGTERM)
+        if self._kill_timer is None:
+            self._kill_timer = _threading.Timer(type(self).KILL_GRACE_PERIOD,
+                                                self._force_kill)
+            self._kill_timer.daemon = True
+            self._kill_timer.start()
+        return
+
+    def check_killed(self, err_msg=None):
+        """Raise an error if the process was cancelled or timed out.
+
+        :param err_msg: The ``stderr`` of the process, if captured.
+        :type err_msg: str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if the process was killed.
+
+        """
+        if self.cancelled:
+            raise GitWrapperError(
+                'Command \'git %s\' cancelled' % self._command,
+                is_git_error=False)
+        if self.timed_out:
+            raise GitWrapperError(
+                'Command \'git %s\' timed out after %g seconds' %
+                (self._command, self._timeout),
+                is_git_error=True,
+                git_error_msg=(err_msg or '').rstrip(),
+                timed_out=True)
+        return
+
+    def __enter__(self):
+        if _sys.version_info >= (3, 2):
+            self._kwargs['start_new_session'] = True
+        elif hasattr(_os, 'setsid'):
+            self._kwargs['preexec_fn'] = _os.setsid
+        else:
+            self._kwargs['creationflags'] = getattr(
+                _subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+
+        cls = type(self)
+        if cls._cancelled:
+            self.cancelled = True
+            self.check_killed()
+        args = self._args
+        if self._low_priority:
+            args = cls._get_low_priority_prefix() + args
+        self.proc = _subprocess.Popen(  # pylint: disable=W0142
+            args,
+            cwd=self._cwd,
+            env=cls._get_env(self._env),
+            **self._kwargs)
+        with cls._lock:
+            cls._running.add(self)
+            # Cancelled while starting the process
+            self.cancelled = cls._cancelled
+        if self.cancelled:
+            self.kill()
+
+        if not self._timeout is None:
+            self._timer = _threading.Timer(self._timeout, self._on_timeout)
+            self._timer.daemon = True
+            self._timer.start()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        if not self._timer is None:
+            self._timer.cancel()
+        if not self.proc is None:
+            self.kill()
+            self.proc.wait()
+            if not self._kill_timer is None:
+                self._kill_timer.cancel()
+            with type(self)._lock:
+                type(self)._running.discard(self)
         return
 
 
@@ -62,14 +339,145 @@ class GitWrapper(object):
     Internally, it executes ``git`` commands in the work-tree for various
     operations.
 
+    The ``git`` commands which clone or fetch from a remote repository are
+    retried on transient errors as per the
+    :class:`repobuddy.utils.RetryPolicy`, and hold a slot of the
+    :class:`repobuddy.utils.ConnectionLimiter` for the host of the remote
+    repository while they run.
+
+    The ``git`` commands run without a terminal and with the credential
+    prompts disabled, so that they fail rather than wait for an input. They
+    can be limited with a timeout, and cancelled by :meth:`cancel_all`.
+
+    The read-only queries, such as :meth:`get_unstaged_files`, run without
+    taking the optional locks and with the automatic gc disabled, so that
+    running them does not block the ``git`` commands of the user.
+
     """
 
+    # Errors from the network or the server, which could go away on a retry
+    _TRANSIENT_ERROR_REGEX = _re.compile(
+        '|'.join([r'Could not resolve host',
+                  r'Temporary failure in name resolution',
+                  r'Connection timed out',
+                  r'Operation timed out',
+                  r'Connection refused',
+                  r'Connection reset',
+                  r'Failed to connect',
+                  r'unable to connect',
+                  r'The remote end hung up unexpectedly',
+                  r'unexpected disconnect',
+                  r'early EOF',
+                  r'RPC failed',
+                  r'returned error: (408|429|5[0-9][0-9])',
+                  r'gnutls_handshake\(\) failed',
+                  r'SSL_ERROR_SYSCALL',
+                  r'TLS connection was non-properly terminated',
+                  r'Too many connections',
+                  r'rate limit']),
+        _re.IGNORECASE)
+
+    # Profile of the read-only queries, as the environment variables and
+    # the configuration to run them with. The optional locks are skipped,
+    # so that the queries running in parallel, or along with the git
+    # commands of the user, do not contend for index.lock.
+    _QUERY_PROFILE = ({'GIT_OPTIONAL_LOCKS': '0'},
+                      ['core.preloadIndex=true', 'gc.auto=0'])
+
+    # Profile of the commands which modify the repository. The automatic gc
+    # runs in the foreground, so that it is bounded by the number of
+    # parallel jobs rather than piling up in the background.
+    _MUTATE_PROFILE = ({}, ['core.preloadIndex=true', 'gc.autoDetach=false'])
+
+    # Tasks supported by run_maintenance(), in the order git runs them
+    MAINTENANCE_TASKS = ['loose-objects', 'incremental-repack', 'gc',
+                         'commit-graph']
+
+    @classmethod
+    def is_transient_error(cls, err):
+        """Determine if a failed ``git`` command is worth retrying.
+
+        :param err: The exception raised by the ``git`` command.
+        :type err: :exc:`Exception`
+        :returns: ``True`` if ``err`` is a :exc:`GitWrapperError` whose
+            ``git_error_msg`` indicates a network or a server error, which
+            could go away on a retry, or if the command timed out. ``False``
+            otherwise.
+        :rtype: Boolean
+
+        """
+        if not isinstance(err, GitWrapperError) or not err.is_git_error:
+            return False
+        return err.timed_out or \
+            not cls._TRANSIENT_ERROR_REGEX.search(err.git_error_msg) is None
+
+    @classmethod
+    def cancel_all(cls):
+        """Cancel the ``git`` commands of all the instances.
+
+        Kills the commands which are running, including the processes they
+        spawned, and fails the commands started later with a
+        :exc:`GitWrapperError`. Used to stop the parallel jobs on an
+        interrupt, rather than waiting for them to finish.
+
+        :returns: None
+
+        """
+        _GitProcess.cancel_all()
+        return
+
+    @classmethod
+    def reset_cancel(cls):
+        """Allow running the ``git`` commands again after :meth:`cancel_all`.
+
+        :returns: None
+
+        """
+        _GitProcess.reset_cancel()
+        return
+
+    def _get_git_command(self, command, no_work_tree=False, no_git_dir=False,
+                         profile=_MUTATE_PROFILE):
+        """Get the full command line to execute the git command.
+
+        :param command: The command string.
+        :type command: str
+        :param no_work_tree: If ``False``, ``--work-tree=.`` command line
+            argument is passed to ``git``, otherwise not.
+        :type no_work_tree: Boolean
+        :param no_git_dir: If ``False``, ``--git-dir=.git`` command line
+            argument is passed to ``git``, otherwise not.
+        :type no_git_dir: Boolean
+        :param profile: Profile of the command, whose configuration is
+            passed using ``-c`` command line arguments.
+        :type profile: Tuple of the environment as a dict, and the
+            configuration as a list of ``name=value`` strings
+        :returns: The command line.
+        :rtype: str
+
+        """
+        git_command = 'git '
+
+        for config in profile[1]:
+            git_command += '-c %s ' % config
+
+        if not no_work_tree:
+            git_command += '--work-tree=. '
+
+        if not no_git_dir:
+            git_command += '--git-dir=.git '
+
+        return git_command + command
+
     def _exec_git(self,
                   command,
                   capture_stdout=False,
                   capture_stderr=False,
                   no_work_tree=False,
-                  no_git_dir=False):
+                  no_git_dir=False,
+                  timeout=None,
+                  profile=_MUTATE_PROFILE,
+                  low_priority=False):
         """Execute the git command.
 
         :param command: The command string.
@@ -85,6 +493,16 @@ class GitWrapper(object):
         :param no_git_dir: If ``False``, ``--git-dir=.git`` command line
             argument is passed to ``git``, otherwise not.
         :type no_git_dir: Boolean
+        :param timeout: Seconds after which the command is killed. If
+            ``None``, the timeout of this instance is used.
+        :type timeout: float
+        :param profile: Profile of the command, :attr:`_QUERY_PROFILE` for
+            the read-only queries, :attr:`_MUTATE_PROFILE` otherwise.
+        :type profile: Tuple of the environment as a dict, and the
+            configuration as a list of ``name=value`` strings
+        :param low_priority: If ``True``, the command runs with a low CPU
+            and I/O priority, where supported.
+        :type low_priority: Boolean
         :returns: Depends on the parameters to this method:
 
             - If both ``capture_stdout`` are ``capture_stderr`` are ``True``,
@@ -96,18 +514,13 @@ class GitWrapper(object):
               None.
         :rtype: str or Tuple
         :raises: :exc:`GitWrapperError` if the ``git`` command executed
-            returns a non-zero status.
+            returns a non-zero status, times out or is cancelled.
 
         """
-        git_command = 'git '
-
-        if not no_work_tree:
-            git_command += '--work-tree=. '
-
-        if not no_git_dir:
-            git_command += '--git-dir=.git '
-
-        git_command += command
+        git_command = self._get_git_command(command, no_work_tree, no_git_dir,
+                                            profile)
+        if timeout is None:
+            timeout = self._timeout
 
         Logger.debug('Exec: git %s' % command)
         try:
@@ -117,19 +530,16 @@ class GitWrapper(object):
             if capture_stderr:
                 kwargs['stderr'] = _subprocess.PIPE
 
-            proc = _subprocess.Popen(   # pylint: disable=W0142
-                _shlex.split(git_command),
-                cwd=self._base_dir,
-                **kwargs)
-
-            try:
-                (out_msg, err_msg) = proc.communicate()
-            except:
-                proc.kill()
-                proc.wait()
-                raise
+            with _GitProcess(command,   # pylint: disable=W0142
+                             _shlex.split(git_command),
+                             self._base_dir,
+                             timeout,
+                             profile[0],
+                             low_priority=low_priority,
+                             **kwargs) as git_proc:
+                (out_msg, err_msg) = git_proc.proc.communicate()
 
-            return_code = proc.poll()
+            return_code = git_proc.proc.poll()
 
             if not out_msg is None:
                 out_msg = out_msg.decode('utf-8')
@@ -137,6 +547,7 @@ class GitWrapper(object):
                 err_msg = err_msg.decode('utf-8')
 
             if return_code != 0:
+                git_proc.check_killed(err_msg)
                 if capture_stderr:
                     raise GitWrapperError(
                         'Command \'git %s\' failed' % command,
@@ -157,11 +568,68 @@ class GitWrapper(object):
             raise GitWrapperError(str(err), is_git_error=False)
         return
 
-    def __init__(self, base_dir):
+    def _exec_git_remote(self, command, remote_url, no_work_tree=False,
+                         no_git_dir=False):
+        """Execute a git command which connects to a remote repository.
+
+        The command is retried on transient errors, and holds a connection
+        slot for the host of ``remote_url`` while it runs. The ``stderr`` of
+        the command is captured to classify the errors, and is logged if
+        the command fails.
+
+        :param command: The command string.
+        :type command: str
+        :param remote_url: URL of the remote repository.
+        :type remote_url: str
+        :param no_work_tree: If ``False``, ``--work-tree=.`` command line
+            argument is passed to ``git``, otherwise not.
+        :type no_work_tree: Boolean
+        :param no_git_dir: If ``False``, ``--git-dir=.git`` command line
+            argument is passed to ``git``, otherwise not.
+        :type no_git_dir: Boolean
+        :returns: None
+        :raises: :exc:`GitWrapperError` if the ``git`` command fails.
+
+        """
+        def _exec():
+            with self._connection_limiter.limit(remote_url):
+                err_msg = self._exec_git(command,
+                                         capture_stderr=True,
+                                         no_work_tree=no_work_tree,
+                                         no_git_dir=no_git_dir)
+            if err_msg != '':
+                Logger.debug(err_msg)
+            return
+
+        try:
+            self._retry_policy.call(_exec,
+                                    type(self).is_transient_error,
+                                    'git ' + command)
+        except GitWrapperError as err:
+            if err.git_error_msg != '':
+                Logger.error(err.git_error_msg)
+            raise
+        return
+
+    def __init__(self, base_dir, retry_policy=None, connection_limiter=None,
+                 timeout=None):
         """Initializer.
 
         :param base_dir: Absolute path of the git repository work-tree.
         :type base_dir: str
+        :param retry_policy: Policy for retrying the ``git`` commands which
+            connect to a remote repository. If ``None``, the commands are
+            not retried.
+        :type retry_policy: :class:`repobuddy.utils.RetryPolicy`
+        :param connection_limiter: Limiter for the concurrent connections
+            to the remote hosts, which is shared between the instances
+            running in parallel. If ``None``, the connections are not
+            limited.
+        :type connection_limiter: :class:`repobuddy.utils.ConnectionLimiter`
+        :param timeout: Seconds after which a ``git`` command is killed, for
+            every command of this instance. If ``None``, the commands are
+            not timed out.
+        :type timeout: float
         :returns: None
         :raises: :exc:`GitWrapperError` if ``base_dir`` is not an absolute
             path.
@@ -172,46 +640,673 @@ class GitWrapper(object):
                 'Error: base_dir \'' + base_dir +
                 '\' needs to be an absolute path')
         self._base_dir = base_dir
+        if retry_policy is None:
+            retry_policy = RetryPolicy(retries=0)
+        self._retry_policy = retry_policy
+        if connection_limiter is None:
+            connection_limiter = ConnectionLimiter(max_per_host=None)
+        self._connection_limiter = connection_limiter
+        self._timeout = timeout
+        return
+
+    def _set_base_dir(self, dest_dir):
+        """Change the working directory to ``dest_dir``.
+
+        :param dest_dir: Absolute path, or a path relative to the current
+            working directory.
+        :type dest_dir: str
+        :returns: None
+
+        """
+        if _os.path.isabs(dest_dir):
+            self._base_dir = dest_dir
+        else:
+            self._base_dir = _os.path.join(self._base_dir, dest_dir)
+        return
+
+    def _set_sparse_paths(self, sparse_paths):
+        """Restrict the work-tree to ``sparse_paths`` in cone mode.
+
+        :param sparse_paths: Directories to checkout. If ``None``, the
+            whole work-tree is checked out.
+        :type sparse_paths: list of str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        if not sparse_paths is None:
+            self._exec_git('sparse-checkout init --cone')
+            self._exec_git('sparse-checkout set %s' % ' '.join(sparse_paths))
+        return
+
+    def _checkout_pinned(self, branch, revision):
+        """Checkout ``branch`` at ``revision``, tracking the remote branch.
+
+        :param branch: Branch to create at ``revision``.
+        :type branch: str
+        :param revision: Commit SHA to checkout.
+        :type revision: str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        self._exec_git('checkout -q -B %s %s' % (branch, revision))
+        self._exec_git('config branch.%s.remote origin' % branch)
+        self._exec_git('config branch.%s.merge refs/heads/%s' %
+                       (branch, branch))
+        return
+
+    def _clone_pinned(self, remote_url, branch, dest_dir, revision,
+                      sparse_paths):
+        """Shallow clone a repo at a pinned revision.
+
+        Only the commit ``revision`` is fetched from ``remote_url`` with
+        ``--depth 1``, and checked out as ``branch``.
+
+        :param remote_url: URL of the repository.
+        :type remote_url: str
+        :param branch: Branch to create at ``revision``.
+        :type branch: str
+        :param dest_dir: Destination path to store the cloned repository.
+        :type dest_dir: str
+        :param revision: Commit SHA to fetch and checkout.
+        :type revision: str
+        :param sparse_paths: Directories to checkout, or ``None`` to
+            checkout the whole work-tree.
+        :type sparse_paths: list of str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        self._exec_git('init -q %s' % dest_dir,
+                       no_work_tree=True, no_git_dir=True)
+        self._set_base_dir(dest_dir)
+        self._exec_git('remote add origin %s' % remote_url)
+        if sparse_paths is None:
+            self._exec_git_remote('fetch --depth 1 origin %s' % revision,
+                                  remote_url)
+        else:
+            self._exec_git_remote(
+                'fetch --depth 1 --filter=blob:none origin %s' % revision,
+                remote_url)
+        self._set_sparse_paths(sparse_paths)
+        self._checkout_pinned(branch, revision)
+        return
+
+    def _clone_seeded(self, remote_url, branch, dest_dir, seed, revision,
+                      sparse_paths):
+        """Clone a repo from a local seed, fetching the rest from the remote.
+
+        ``seed`` is cloned without a checkout, the ``origin`` remote is
+        pointed to ``remote_url`` and only the objects missing in the seed
+        are fetched from it. When ``seed`` is a local repository, ``git``
+        hardlinks its objects instead of copying them wherever possible.
+
+        :param remote_url: URL of the repository.
+        :type remote_url: str
+        :param branch: Branch to checkout after the clone.
+        :type branch: str
+        :param dest_dir: Destination path to store the cloned repository.
+        :type dest_dir: str
+        :param seed: Path of a bundle file or a local repository.
+        :type seed: str
+        :param revision: Commit SHA to checkout, or ``None`` to checkout the
+            tip of the remote branch.
+        :type revision: str
+        :param sparse_paths: Directories to checkout, or ``None`` to
+            checkout the whole work-tree.
+        :type sparse_paths: list of str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        self._exec_git('clone --no-checkout %s %s' % (seed, dest_dir),
+                       no_work_tree=True, no_git_dir=True)
+        self._set_base_dir(dest_dir)
+        self._exec_git('remote set-url origin %s' % remote_url)
+        self._exec_git_remote('fetch origin', remote_url)
+        self._set_sparse_paths(sparse_paths)
+        if revision is None:
+            self._exec_git('checkout -q -B %s origin/%s' % (branch, branch))
+        else:
+            self._checkout_pinned(branch, revision)
         return
 
     # It also changes the current Dir to dest_dir
-    def clone(self, remote_url, branch, dest_dir):
+    def clone(self, remote_url, branch, dest_dir, bundle=None,
+              revision=None, source_repo=None, sparse_paths=None):
         """Clone a repo.
 
         Executes ``git clone -b branch remote_url dest_dir``. At the end of
         the ``clone`` operation, the working directory is changed to
         ``dest_dir``.
 
+        If ``source_repo`` or ``bundle`` is specified, the repo is instead
+        seeded from it, after which the ``origin`` remote is pointed to
+        ``remote_url`` and only the objects missing in the seed are fetched
+        from it. ``source_repo`` takes precedence over ``bundle``.
+
+        If ``revision`` is specified, ``branch`` is checked out at
+        ``revision`` instead of the tip of the remote branch. Without a
+        seed, only ``revision`` is fetched using a shallow clone.
+
+        If ``sparse_paths`` is specified, the repo is cloned without a
+        checkout, the sparse-checkout cone is set to ``sparse_paths`` and
+        only then ``branch`` is checked out. When fetching from
+        ``remote_url``, a blobless clone is requested, so that only the
+        blobs within the cone are downloaded.
+
         :param remote_url: URL of the repository.
         :type remote_url: str
         :param branch: Branch to checkout after the clone.
         :type branch: str
         :dest_dir: Destination path to store the cloned repository.
+        :param bundle: Path of a git bundle file to seed the clone from.
+        :type bundle: str
+        :param revision: Commit SHA to checkout after the clone.
+        :type revision: str
+        :param source_repo: Path of an existing local clone of the same
+            repository to seed the clone from.
+        :type source_repo: str
+        :param sparse_paths: Directories to checkout in cone mode.
+        :type sparse_paths: list of str
         :returns: None
-        :raises: :exc:`GitWrapperError` if the ``git clone`` command fails.
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
 
         """
-        self._exec_git('clone -b %s %s %s' % (branch, remote_url, dest_dir),
-                       no_work_tree=True, no_git_dir=True)
-        if _os.path.isabs(dest_dir):
-            self._base_dir = dest_dir
+        if not source_repo is None:
+            self._clone_seeded(remote_url, branch, dest_dir, source_repo,
+                               revision, sparse_paths)
+        elif not bundle is None:
+            self._clone_seeded(remote_url, branch, dest_dir, bundle,
+                               revision, sparse_paths)
+        elif not revision is None:
+            self._clone_pinned(remote_url, branch, dest_dir, revision,
+                               sparse_paths)
+        elif not sparse_paths is None:
+            self._exec_git_remote(
+                'clone --no-checkout --filter=blob:none -b %s %s %s' %
+                (branch, remote_url, dest_dir),
+                remote_url,
+                no_work_tree=True, no_git_dir=True)
+            self._set_base_dir(dest_dir)
+            self._set_sparse_paths(sparse_paths)
+            self._exec_git('checkout -q -B %s origin/%s' % (branch, branch))
         else:
-            self._base_dir = _os.path.join(self._base_dir, dest_dir)
+            self._exec_git_remote(
+                'clone -b %s %s %s' % (branch, remote_url, dest_dir),
+                remote_url,
+                no_work_tree=True, no_git_dir=True)
+            self._set_base_dir(dest_dir)
+        return
+
+    def create_bundle(self, bundle_file):
+        """Create a bundle containing all the refs of the repository.
+
+        Executes ``git bundle create bundle_file --all``. The bundle is
+        first written to a temporary file which is renamed to
+        ``bundle_file`` on success, so that a partially written bundle is
+        never picked up by a concurrent clone.
+
+        :param bundle_file: Absolute path of the bundle file to create.
+        :type bundle_file: str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if the ``git bundle`` command fails
+            or on errors in renaming the bundle file.
+
+        """
+        temp_file = bundle_file + '.tmp'
+        self._exec_git('bundle create %s --all' % temp_file,
+                       capture_stderr=True)
+        try:
+            _os.rename(temp_file, bundle_file)
+        except OSError as err:
+            raise GitWrapperError(str(err), is_git_error=False)
+        return
+
+    def set_remote_url(self, remote_url):
+        """Point the ``origin`` remote to ``remote_url``.
+
+        Executes ``git remote set-url origin remote_url`` followed by
+        ``git fetch origin``, so that the remote branches reflect the new
+        URL.
+
+        :param remote_url: New URL of the repository.
+        :type remote_url: str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        self._exec_git('remote set-url origin %s' % remote_url)
+        self._exec_git_remote('fetch -q origin', remote_url)
+        return
+
+    def switch_branch(self, branch):
+        """Checkout ``branch``, fetching it from ``origin`` first.
+
+        An existing local ``branch`` is checked out as is, otherwise it is
+        created tracking ``origin/branch``.
+
+        :param branch: Branch to checkout.
+        :type branch: str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        remote_url = self._exec_git('config --get remote.origin.url',
+                                    capture_stdout=True,
+                                    profile=type(self)._QUERY_PROFILE)
+        self._exec_git_remote('fetch -q origin', remote_url)
+        self._exec_git('checkout -q %s' % branch)
         return
 
-    def update_index(self):
+    def is_clone_complete(self, branch):
+        """Verify if a previously started clone has completed.
+
+        A clone is considered complete if ``HEAD`` resolves to a valid commit,
+        ``branch`` is checked out and the index has been written by the
+        checkout. Local changes in the work-tree are not considered, so
+        that a clone modified by the user is never treated as incomplete.
+
+        :param branch: Branch which was checked out by the clone.
+        :type branch: str
+        :returns: ``True`` if the clone is complete, ``False`` otherwise.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if unable to execute ``git``.
+
+        """
+        if not _os.path.isdir(_os.path.join(self._base_dir, '.git')):
+            return False
+        try:
+            self._exec_git('rev-parse --quiet --verify HEAD^{commit}',
+                           capture_stdout=True,
+                           capture_stderr=True,
+                           profile=type(self)._QUERY_PROFILE)
+            if self.get_current_branch() != branch:
+                return False
+            return _os.path.isfile(
+                _os.path.join(self._base_dir, '.git', 'index'))
+        except GitWrapperError as err:
+            if not err.is_git_error:
+                raise err
+        return False
+
+    def update_index(self, optional=False):
         """Refresh the index.
 
         Executes ``git update-index -q --ignore-submodules --refresh``.
 
+        :param optional: If ``True``, failing to refresh the index because
+            another process holds ``index.lock`` is not treated as an error,
+            since the refresh is only an optimization for the queries
+            following it.
+        :type optional: Boolean
         :returns: None
         :raises: :exc:`GitWrapperError` if the ``git update-index`` command
             fails.
 
         """
-        self._exec_git('update-index -q --ignore-submodules --refresh')
+        if not optional:
+            self._exec_git('update-index -q --ignore-submodules --refresh')
+            return
+
+        try:
+            self._exec_git('update-index -q --ignore-submodules --refresh')
+        except GitWrapperError as err:
+            # git update-index -q does not report the reason of the failure
+            if not err.is_git_error or not _os.path.exists(
+                    _os.path.join(self._base_dir, '.git', 'index.lock')):
+                raise err
+            Logger.debug('Skipped refreshing the locked index in ' +
+                         self._base_dir)
+        return
+
+    def is_fsmonitor_supported(self):
+        """Determine if ``git`` has the built-in file system monitor daemon.
+
+        The daemon is only available on some platforms, which is reported
+        by ``git version --build-options``.
+
+        :returns: ``True`` if ``core.fsmonitor`` can be enabled, ``False``
+            otherwise.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if the ``git version`` command
+            fails.
+
+        """
+        out_msg = self._exec_git('version --build-options',
+                                 capture_stdout=True,
+                                 no_work_tree=True,
+                                 no_git_dir=True,
+                                 profile=type(self)._QUERY_PROFILE)
+        return 'fsmonitor--daemon' in out_msg
+
+    def optimize(self, fsmonitor=False):
+        """Speed up the status queries and the history walks of the repo.
+
+        Enables ``feature.manyFiles`` and ``core.untrackedCache``, upgrades
+        the index to version 4 and writes a commit-graph with the changed
+        paths. :meth:`refresh_status_cache` is then run to store the
+        untracked cache in the index, and to start the file system monitor
+        daemon if it is enabled. Note that ``git`` only uses the untracked
+        cache for ``--untracked-files=all``, as in :meth:`get_status`, since
+        version 2.41 and when ``status.showUntrackedFiles`` is set to
+        ``all``.
+
+        :param fsmonitor: If ``True``, ``core.fsmonitor`` is enabled to use
+            the built-in file system monitor daemon, which should be
+            supported as per :meth:`is_fsmonitor_supported`.
+        :type fsmonitor: Boolean
+        :returns: None
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        self._exec_git('config feature.manyFiles true')
+        self._exec_git('config core.untrackedCache true')
+        if fsmonitor:
+            self._exec_git('config core.fsmonitor true')
+        self._exec_git('update-index --index-version 4')
+        self._exec_git('commit-graph write --reachable --changed-paths')
+        self.refresh_status_cache()
+        return
+
+    def refresh_status_cache(self):
+        """Store the refreshed index for the following status queries.
+
+        Runs ``git status`` with the same options as :meth:`get_status`,
+        but writing the index, so that it stores the refreshed stat
+        information, the untracked cache and the file system monitor token
+        when they are enabled. ``git status`` skips writing the index if
+        another process holds ``index.lock``.
+
+        :returns: None
+        :raises: :exc:`GitWrapperError` if the ``git status`` command fails.
+
+        """
+        self._exec_git('status --porcelain -z --untracked-files=all ' +
+                       '--ignore-submodules=all --no-renames',
+                       capture_stdout=True)
+        return
+
+    def run_maintenance(self, tasks):
+        """Run the ``git maintenance`` tasks on the repo.
+
+        The tasks run with a low CPU and I/O priority, so that maintaining
+        several repos in parallel does not starve the other processes of
+        the disk.
+
+        :param tasks: The tasks to run, in order, from
+            :attr:`MAINTENANCE_TASKS`.
+        :type tasks: list of str
+        :returns: None
+        :raises: :exc:`GitWrapperError` if ``git maintenance run`` fails.
+
+        """
+        self._exec_git('maintenance run --quiet ' +
+                       ' '.join(['--task=%s' % task for task in tasks]),
+                       low_priority=True)
+        return
+
+    def register_maintenance(self):
+        """Add the repo to the repos maintained by the periodic schedule.
+
+        Runs ``git maintenance register``, which adds the repo to the
+        ``maintenance.repo`` list of the global configuration. Not safe to
+        run in parallel with other changes to the global configuration.
+
+        :returns: None
+        :raises: :exc:`GitWrapperError` if the ``git`` command fails.
+
+        """
+        self._exec_git('maintenance register')
+        return
+
+    def start_maintenance(self):
+        """Start the periodic schedule of the registered repos.
+
+        Runs ``git maintenance start``, which also registers the repo, and
+        sets up the schedule with the scheduler of the platform (``cron``,
+        ``systemd`` timers, ``launchctl`` or ``schtasks``).
+
+        :returns: None
+        :raises: :exc:`GitWrapperError` if the ``git`` command fails.
+
+        """
+        self._exec_git('maintenance start')
         return
 
+    def get_object_counts(self):
+        """Get the statistics of the object store of the repo.
+
+        :returns: The numeric values reported by ``git count-objects -v``,
+            i.e. ``count``, ``size``, ``in-pack``, ``packs``, ``size-pack``,
+            ``prune-packable``, ``garbage`` and ``size-garbage``, where the
+            sizes are in KiB.
+        :rtype: dict of str to int
+        :raises: :exc:`GitWrapperError` if ``git count-objects`` fails.
+
+        """
+        out_msg = self._exec_git('count-objects -v',
+                                 capture_stdout=True,
+                                 profile=type(self)._QUERY_PROFILE)
+        counts = {}
+        for line in out_msg.split('\n'):
+            (name, _, value) = line.partition(':')
+            value = value.strip()
+            # Skip the paths of the alternate object stores
+            if value.isdigit():
+                counts[name] = int(value)
+        return counts
+
+    def get_object_store_size(self):
+        """Get the disk space used by the object store of the repo.
+
+        :returns: The size of the loose objects, the packs and the garbage
+            files in bytes, excluding the alternate object stores.
+        :rtype: int
+        :raises: :exc:`GitWrapperError` if ``git count-objects`` fails.
+
+        """
+        counts = self.get_object_counts()
+        return (counts['size'] + counts['size-pack'] +
+                counts['size-garbage']) * 1024
+
+    def get_work_tree_size(self):
+        """Get the disk space used by the files in the work-tree.
+
+        The ``.git`` directory, and the nested repositories such as the
+        other repos of the client or the submodules, are not included.
+
+        :returns: The total size of the files in bytes, where the symbolic
+            links are not followed.
+        :rtype: int
+
+        """
+        size = 0
+        for (dir_path, dir_names, file_names) in _os.walk(self._base_dir):
+            if dir_path != self._base_dir and '.git' in file_names:
+                # A submodule, whose .git is a file
+                dir_names[:] = []
+                continue
+            for dir_name in list(dir_names):
+                if dir_name == '.git' or _os.path.exists(
+                        _os.path.join(dir_path, dir_name, '.git')):
+                    dir_names.remove(dir_name)
+            for file_name in file_names:
+                try:
+                    size += _os.lstat(_os.path.join(dir_path,
+                                                    file_name)).st_size
+                except OSError:
+                    # Removed while walking the work-tree
+                    pass
+        return size
+
+    def get_index_entry_count(self):
+        """Get the number of entries in the index.
+
+        Reads the count from the header of ``.git/index``, rather than
+        listing the entries. With a split index, only the entries of the
+        split index are counted.
+
+        :returns: The number of entries, ``0`` if there is no index.
+        :rtype: int
+        :raises: :exc:`GitWrapperError` if the index cannot be read or is
+            invalid.
+
+        """
+        index_file = _os.path.join(self._base_dir, '.git', 'index')
+        if not _os.path.isfile(index_file):
+            return 0
+        try:
+            with open(index_file, 'rb') as file_handle:
+                header = file_handle.read(12)
+        except (OSError, IOError) as err:
+            raise GitWrapperError(str(err), is_git_error=False)
+        if len(header) != 12 or header[:4] != b'DIRC':
+            raise GitWrapperError('Invalid index file: ' + index_file,
+                                  is_git_error=False)
+        return _struct.unpack('>L', header[8:12])[0]
+
+    def _exec_git_check(self, command):
+        """Execute a git query which reports its result in the exit status.
+
+        The query runs with the :attr:`_QUERY_PROFILE`.
+
+        :param command: The command string, which exits with ``0`` or ``1``
+            on success.
+        :type command: str
+        :returns: ``True`` if the command exits with ``0``, ``False`` if it
+            exits with ``1``.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if the command exits with any other
+            status.
+
+        """
+        profile = type(self)._QUERY_PROFILE
+        Logger.debug('Exec: git %s' % command)
+        try:
+            with _GitProcess(command,
+                             _shlex.split(self._get_git_command(
+                                 command, profile=profile)),
+                             self._base_dir,
+                             self._timeout,
+                             profile[0]) as git_proc:
+                return_code = git_proc.proc.wait()
+        except OSError as err:
+            raise GitWrapperError(str(err), is_git_error=False)
+
+        if return_code not in (0, 1):
+            git_proc.check_killed()
+            raise GitWrapperError('Command \'git %s\' failed' % command,
+                                  is_git_error=True)
+        return return_code == 0
+
+    def has_untracked_files(self):
+        """Determine if the repository has any untracked files.
+
+        Stops ``git ls-files --exclude-standard --others --directory
+        --no-empty-directory --`` as soon as it lists the first untracked
+        file, rather than listing all of them.
+
+        :returns: ``True`` if there are untracked files, ``False`` otherwise.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if the ``git ls-files`` command fails.
+
+        """
+        command = 'ls-files --exclude-standard --others --directory ' + \
+            '--no-empty-directory --'
+        profile = type(self)._QUERY_PROFILE
+        Logger.debug('Exec: git %s' % command)
+        try:
+            with _GitProcess(command,
+                             _shlex.split(self._get_git_command(
+                                 command, profile=profile)),
+                             self._base_dir,
+                             self._timeout,
+                             profile[0],
+                             stdout=_subprocess.PIPE) as git_proc:
+                try:
+                    first_line = git_proc.proc.stdout.readline()
+                finally:
+                    # Killed on exiting, if still running
+                    git_proc.proc.stdout.close()
+            return_code = git_proc.proc.poll()
+        except OSError as err:
+            raise GitWrapperError(str(err), is_git_error=False)
+
+        if len(first_line) != 0:
+            return True
+        if return_code != 0:
+            git_proc.check_killed()
+            raise GitWrapperError('Command \'git %s\' failed' % command,
+                                  is_git_error=True)
+        return False
+
+    def has_unstaged_changes(self):
+        """Determine if the repository has any unstaged changes.
+
+        Uses ``git diff-files --quiet --ignore-submodules --``, which stops
+        at the first change. ``git diff-files`` also reports the files whose
+        stat information in the index is out of date, so a change it finds
+        is confirmed with ``git status --porcelain -z --untracked-files=no
+        --ignore-submodules=all --no-renames``, which compares such files
+        by content without writing the index. The index hence need not be
+        refreshed beforehand with :meth:`update_index`, which would take
+        ``index.lock``.
+
+        :returns: ``True`` if there are unstaged changes, ``False``
+            otherwise.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if the ``git diff-files`` or the
+            ``git status`` command fails.
+
+        """
+        if self._exec_git_check('diff-files --quiet --ignore-submodules --'):
+            return False
+
+        out_msg = self._exec_git(
+            'status --porcelain -z --untracked-files=no ' +
+            '--ignore-submodules=all --no-renames',
+            capture_stdout=True,
+            profile=type(self)._QUERY_PROFILE)
+        for entry in out_msg.split('\0'):
+            if len(entry) > 1 and entry[1] != ' ':
+                return True
+        return False
+
+    def has_uncommitted_staged_changes(self):
+        """Determine if the repository has any uncommitted staged changes.
+
+        Uses ``git diff-index --cached --quiet --ignore-submodules HEAD
+        --``, which stops at the first change.
+
+        :returns: ``True`` if there are uncommitted staged changes, ``False``
+            otherwise.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if the ``git diff-index`` command
+            fails.
+
+        """
+        return not self._exec_git_check(
+            'diff-index --cached --quiet --ignore-submodules HEAD --')
+
+    def has_unpushed_commits(self):
+        """Determine if any local branch has commits missing in the remotes.
+
+        Uses ``git rev-list -n 1 --branches --not --remotes``, which stops
+        at the first such commit.
+
+        :returns: ``True`` if there are unpushed commits, ``False``
+            otherwise.
+        :rtype: Boolean
+        :raises: :exc:`GitWrapperError` if the ``git rev-list`` command
+            fails.
+
+        """
+        return self._exec_git('rev-list -n 1 --branches --not --remotes',
+                              capture_stdout=True,
+                              profile=type(self)._QUERY_PROFILE) != ''
+
     def get_untracked_files(self):
         """Get a list of all untracked files in the repository.
 
@@ -225,7 +1320,8 @@ class GitWrapper(object):
         """
         untracked_files = self._exec_git(
             'ls-files --exclude-standard --others --',
-            capture_stdout=True)
+            capture_stdout=True,
+            profile=type(self)._QUERY_PROFILE)
         if untracked_files == '':
             return []
         else:
@@ -245,7 +1341,8 @@ class GitWrapper(object):
         """
         unstaged_files = self._exec_git(
             'diff-files --name-status -r --ignore-submodules --',
-            capture_stdout=True)
+            capture_stdout=True,
+            profile=type(self)._QUERY_PROFILE)
         if unstaged_files == '':
             return []
         else:
@@ -266,12 +1363,66 @@ class GitWrapper(object):
         uncommited_staged_files = self._exec_git(
             'diff-index --cached --name-status -r ' +
             '--ignore-submodules HEAD --',
-            capture_stdout=True)
+            capture_stdout=True,
+            profile=type(self)._QUERY_PROFILE)
         if uncommited_staged_files == '':
             return []
         else:
             return uncommited_staged_files.split('\n')
 
+    def get_status(self):
+        """Get the untracked, unstaged and uncommitted staged files at once.
+
+        Uses a single ``git status --porcelain -z --untracked-files=all
+        --ignore-submodules=all --no-renames``, which makes use of the
+        untracked cache and the file system monitor when they are enabled
+        for the repo (see :meth:`optimize`), unlike ``git ls-files``.
+
+        The query runs with the :attr:`_QUERY_PROFILE`, so the refreshed
+        index is not written back, and the untracked cache and the file
+        system monitor token go stale as the work-tree changes, until they
+        are stored again by :meth:`refresh_status_cache`.
+
+        The files are listed in the same format as
+        :meth:`get_untracked_files`, :meth:`get_unstaged_files` and
+        :meth:`get_uncommitted_staged_files`, except that the paths are
+        never quoted. An unmerged file is listed once with the status ``U``
+        in both the unstaged and the staged files.
+
+        :returns: The untracked, unstaged and uncommitted staged files.
+        :rtype: Tuple of three lists of str
+        :raises: :exc:`GitWrapperError` if the ``git status`` command fails.
+
+        """
+        out_msg = self._exec_git(
+            'status --porcelain -z --untracked-files=all ' +
+            '--ignore-submodules=all --no-renames',
+            capture_stdout=True,
+            profile=type(self)._QUERY_PROFILE)
+
+        untracked_files = []
+        unstaged_files = []
+        staged_files = []
+        for entry in out_msg.split('\0'):
+            if entry == '':
+                continue
+            index_status, work_tree_status = entry[0], entry[1]
+            path = entry[3:]
+            if index_status == '?':
+                untracked_files.append(path)
+            elif 'U' in entry[:2] or entry[:2] in ('AA', 'DD'):
+                unstaged_files.append('U\t' + path)
+                staged_files.append('U\t' + path)
+            else:
+                if index_status != ' ':
+                    staged_files.append(index_status + '\t' + path)
+                elif work_tree_status == 'A':
+                    # Added with --intent-to-add
+                    staged_files.append('A\t' + path)
+                if work_tree_status != ' ':
+                    unstaged_files.append(work_tree_status + '\t' + path)
+        return (untracked_files, unstaged_files, staged_files)
+
     def get_current_branch(self):
         """Get the currently checked out branch.
 
@@ -284,7 +1435,8 @@ class GitWrapper(object):
         try:
             out_msg = self._exec_git('symbolic-ref HEAD',
                                      capture_stdout=True,
-                                     capture_stderr=True)[0]
+                                     capture_stderr=True,
+                                     profile=type(self)._QUERY_PROFILE)[0]
         except GitWrapperError as err:
             if not err.is_git_error:
                 raise err
@@ -299,6 +1451,91 @@ class GitWrapper(object):
             raise GitWrapperError('Error: Unknown symbolic-ref for HEAD')
         return
 
+    def get_head_revision(self):
+        """Get the commit SHA which ``HEAD`` points to.
+
+        :returns: The commit SHA of ``HEAD``.
+        :rtype: str
+        :raises: :exc:`GitWrapperError` on errors.
+
+        """
+        return self._exec_git('rev-parse --verify HEAD^{commit}',
+                              capture_stdout=True,
+                              profile=type(self)._QUERY_PROFILE)
+
+    def get_remote_revision(self, remote_url, branch):
+        """Get the commit SHA at the tip of a remote branch.
+
+        Executes ``git ls-remote remote_url refs/heads/branch``, which does
+        not need ``base_dir`` to be a git repository.
+
+        :param remote_url: URL of the repository.
+        :type remote_url: str
+        :param branch: Name of the branch.
+        :type branch: str
+        :returns: The commit SHA, ``None`` if the branch does not exist.
+        :rtype: str
+        :raises: :exc:`GitWrapperError` if the ``git ls-remote`` command
+            fails.
+
+        """
+        out_msg = self._exec_git(
+            'ls-remote %s refs/heads/%s' % (remote_url, branch),
+            capture_stdout=True,
+            no_work_tree=True,
+            no_git_dir=True,
+            profile=type(self)._QUERY_PROFILE)
+        for line in out_msg.split('\n'):
+            fields = line.split()
+            if len(fields) == 2 and fields[1] == 'refs/heads/' + branch:
+                return fields[0]
+        return None
+
+    def read_remote_file(self, remote_url, branch, path):
+        """Read a file at the tip of a remote branch.
+
+        Only the tip of ``branch`` is fetched with ``--depth 1`` into the
+        bare repository at ``base_dir``, which is created if it does not
+        exist, and the file is read using ``git show FETCH_HEAD:path``.
+        The commit SHA is read from ``FETCH_HEAD`` as well, so that it
+        matches the contents even if the branch moves meanwhile.
+
+        :param remote_url: URL of the repository.
+        :type remote_url: str
+        :param branch: Name of the branch.
+        :type branch: str
+        :param path: Path of the file relative to the root of the
+            repository.
+        :type path: str
+        :returns: The contents of the file, and the commit SHA it was read
+            at.
+        :rtype: Tuple of str
+        :raises: :exc:`GitWrapperError` if any of the ``git`` commands fail.
+
+        """
+        if not _os.path.isdir(_os.path.join(self._base_dir, 'objects')):
+            try:
+                if not _os.path.isdir(self._base_dir):
+                    _os.makedirs(self._base_dir)
+            except OSError as err:
+                raise GitWrapperError(str(err), is_git_error=False)
+            self._exec_git('init -q --bare', no_work_tree=True,
+                           no_git_dir=True)
+        self._exec_git('fetch -q --depth 1 %s refs/heads/%s' %
+                       (remote_url, branch),
+                       no_work_tree=True, no_git_dir=True)
+        revision = self._exec_git('rev-parse --verify FETCH_HEAD^{commit}',
+                                  capture_stdout=True,
+                                  no_work_tree=True,
+                                  no_git_dir=True,
+                                  profile=type(self)._QUERY_PROFILE)
+        contents = self._exec_git('show %s:%s' % (revision, path),
+                                  capture_stdout=True,
+                                  no_work_tree=True,
+                                  no_git_dir=True,
+                                  profile=type(self)._QUERY_PROFILE) + '\n'
+        return (contents, revision)
+
     def get_current_tag(self):
         """Get the currently checked out tag.
 
@@ -313,7 +1550,8 @@ class GitWrapper(object):
             out_msg = self._exec_git(
                 'name-rev --name-only --tags --no-undefined HEAD',
                 capture_stdout=True,
-                capture_stderr=True)[0]
+                capture_stderr=True,
+                profile=type(self)._QUERY_PROFILE)[0]
         except GitWrapperError as err:
             if not err.is_git_error:
                 raise err
@@ -53,12 +53,93 @@ class HelpStrings:  # pylint: disable=W0232
     MASTER_PARSER_ARG_HELP = 'Command to invoke'
     MASTER_PARSER_ARG_TITLE = 'Available Commands'
     INIT_COMMAND_HELP = 'Init the current directory to set up the repos'
-    INIT_MANIFEST_ARG = 'The Manifest file to use for this client'
+    INIT_MANIFEST_ARG = 'The Manifest to use for this client, either a ' + \
+                        'file, an http(s):// URL or a git repository as ' + \
+                        'git+<url>#<branch>:<path>'
     INIT_CLIENT_SPEC_ARG = 'The Client Spec in the Manifest to use for ' + \
                            'this client'
+    INIT_RESUME_ARG = 'Resume an interrupted init, skipping the repos ' + \
+                      'which have already been cloned'
+    INIT_BUNDLE_DIR_ARG = 'Directory with the git bundles to seed the ' + \
+                          'repos from, before fetching from the remotes'
+    INIT_FROM_CLIENT_ARG = 'An existing client on the same filesystem ' + \
+                           'to seed the repos from, by hardlinking ' + \
+                           'their objects'
+    INIT_NO_FSYNC_ARG = 'Skip flushing the client files to the disk, ' + \
+                        'for throwaway clients like in CI'
+    INIT_OPTIMIZE_ARG = 'Optimize the repos for the status queries ' + \
+                        'once they are cloned, as the optimize command'
     HELP_COMMAND_HELP = 'Show usage details for a command'
     HELP_COMMAND_ARG = 'Command to see the help message for'
     STATUS_COMMAND = 'Show status of the current client config'
+    STATUS_SHORT_ARG = 'Only show which repos are dirty or not on ' + \
+                       'their branch, without listing the files'
+    STATUS_FORMAT_ARG = 'Output format, json and ndjson write a record ' + \
+                        'per repo as soon as its status is available'
+    BUNDLE_CREATE_COMMAND_HELP = 'Create git bundles for all the repos ' + \
+                                 'in the client'
+    BUNDLE_CREATE_BUNDLE_DIR_ARG = 'Directory to store the bundles in'
+    SNAPSHOT_COMMAND_HELP = 'Write a manifest pinning all the repos in ' + \
+                            'the client to their current commits'
+    SNAPSHOT_OUTPUT_ARG = 'File to write the pinned manifest into'
+    OPTIMIZE_COMMAND_HELP = 'Enable the untracked cache, the file ' + \
+                            'system monitor and feature.manyFiles, ' + \
+                            'and write the commit-graph for all the ' + \
+                            'repos in the client'
+    OPTIMIZE_NO_FSMONITOR_ARG = 'Do not enable the file system monitor ' + \
+                                'daemon'
+    MAINTENANCE_COMMAND_HELP = 'Run the git maintenance tasks on all ' + \
+                               'the repos in the client, and report ' + \
+                               'the disk space reclaimed'
+    MAINTENANCE_TASK_ARG = 'Task to run, can be repeated, defaults to ' + \
+                           'all the tasks'
+    MAINTENANCE_SCHEDULE_ARG = 'Also register the repos for the periodic ' + \
+                               'maintenance, and start its schedule'
+    STATS_COMMAND_HELP = 'Show the disk usage, the object store ' + \
+                         'statistics and the index entries of all the ' + \
+                         'repos in the client'
+    STATS_SORT_ARG = 'Statistic to sort the repos by, largest first, ' + \
+                     'or dest to sort by the repo path'
+    STATS_FORMAT_ARG = 'Output format of the statistics'
+    SERVE_COMMAND_HELP = 'Serve the status command for the client over ' + \
+                         'a Unix domain socket, which the other ' + \
+                         'invocations use when available'
+    MANIFEST_COMMAND_HELP = 'Manage the manifest of the client'
+    MANIFEST_REFRESH_COMMAND_HELP = 'Retrieve the manifest again from ' + \
+                                    'the location the client was ' + \
+                                    'initialized with'
+    MANIFEST_UPDATE_COMMAND_HELP = 'Update the client to a new ' + \
+                                   'manifest, applying only the ' + \
+                                   'changes to its repos'
+    MANIFEST_UPDATE_MANIFEST_ARG = 'The new Manifest, defaults to the ' + \
+                                   'location the client was initialized ' + \
+                                   'with'
+    MANIFEST_VALIDATE_COMMAND_HELP = 'Validate a manifest, reporting ' + \
+                                     'all the errors in it'
+    MANIFEST_VALIDATE_MANIFEST_ARG = 'The Manifest to validate, ' + \
+                                     'defaults to the location the ' + \
+                                     'client was initialized with'
+    MANIFEST_COMPILE_COMMAND_HELP = 'Compile a manifest into a binary ' + \
+                                    'format, which is faster to load ' + \
+                                    'for very large manifests'
+    MANIFEST_COMPILE_MANIFEST_ARG = 'The Manifest file to compile, ' + \
+                                    'defaults to the manifest of the ' + \
+                                    'client, which is then loaded from ' + \
+                                    'the compiled manifest by the other ' + \
+                                    'commands'
+    MANIFEST_COMPILE_OUTPUT_ARG = 'File to write the compiled manifest ' + \
+                                  'into, defaults to the manifest file ' + \
+                                  'with the .bin extension'
+    JOBS_ARG = 'Number of repos to process in parallel'
+    RETRIES_ARG = 'Number of times to retry the clones and fetches ' + \
+                  'failing with network or server errors, with an ' + \
+                  'exponential backoff'
+    MAX_CONNECTIONS_PER_HOST_ARG = 'Maximum number of parallel clones ' + \
+                                   'and fetches from the same server, ' + \
+                                   '0 for no limit'
+    TIMEOUT_ARG = 'Seconds after which a git command is killed, so that ' + \
+                  'a hung clone or fetch does not stall the other ' + \
+                  'repos, 0 for no timeout'
 
     def __new__(cls):
         """Ensure this class should not be instantiated."""
@@ -0,0 +1,266 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+.. module: repobuddy.journal
+   :platform: Unix, Windows
+   :synopsis: Records the progress of the ``init`` command.
+.. moduleauthor: Ash <tuxdude.github@gmail.com>
+
+"""
+
+import os as _os
+import sys as _sys
+import threading as _threading
+
+if _sys.version_info >= (3, 0):
+    import configparser as _configparser    # pylint: disable=F0401
+else:
+    import ConfigParser as _configparser    # pylint: disable=F0401
+
+from repobuddy.utils import AtomicFile, AtomicFileError, \
+    RepoBuddyBaseException
+
+
+class InitJournalError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`InitJournal`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(InitJournalError, self).__init__(error_str)
+        return
+
+
+class InitJournal(object):
+
+    """Tracks the clone state of every repo during ``init``.
+
+    The journal is written to disk after every state change, so that an
+    interrupted ``init`` can later be resumed from where it stopped. The
+    states of the repos can be updated from multiple threads.
+
+    Each repo is in one of the following states:
+
+    -   ``STATE_PENDING`` - The clone has not been started yet.
+    -   ``STATE_CLONING`` - The clone was started, but has not been
+        confirmed to be complete.
+    -   ``STATE_CLONED`` - The clone has completed successfully.
+
+    """
+
+    STATE_PENDING = 'pending'
+    STATE_CLONING = 'cloning'
+    STATE_CLONED = 'cloned'
+
+    _INFO_SECTION = 'RepoBuddyInitJournal'
+    _REPO_SECTION_PREFIX = 'Repo:'
+
+    def _get_repo_section(self, dest):
+        """Get the name of the section storing the state of a repo.
+
+        :param dest: Destination directory of the repo.
+        :type dest: str
+        :returns: Name of the section.
+        :rtype: str
+
+        """
+        return type(self)._REPO_SECTION_PREFIX + dest
+
+    def _get_config(self, section, option):
+        """Get the journal value.
+
+        :param section: The name of the section in the journal.
+        :type section: str
+        :param option: The name of the option in the journal.
+        :type option: str
+        :returns: The value of the option under the section.
+        :raises: :exc:`InitJournalError` when the section or the option or
+            both do not exist.
+
+        """
+        try:
+            return self._config.get(section, option)
+        except (_configparser.NoOptionError,
+                _configparser.NoSectionError) as err:
+            raise InitJournalError('Error: ' + str(err))
+        return
+
+    def __init__(self, file_name, sync=True):
+        """Initializer.
+
+        :param file_name: The name of the journal file. If the file exists,
+            it is opened and parsed, otherwise an empty journal is created
+            in-memory until :meth:`write()` is invoked.
+        :type file_name: str
+        :param sync: If ``True``, the journal is flushed to the disk on
+            every write.
+        :type sync: Boolean
+        :raises: :exc:`InitJournalError` on failures in reading or parsing
+            an existing journal file.
+
+        """
+        self._file_name = file_name
+        self._sync = sync
+        self._lock = _threading.Lock()
+        self._config = _configparser.RawConfigParser()
+        if _os.path.isfile(file_name):
+            try:
+                with open(file_name, 'r') as file_handle:
+                    try:
+                        self._config.readfp(file_handle)
+                    except _configparser.Error as err:
+                        raise InitJournalError(
+                            'Error: Parsing journal failed => ' + str(err))
+            except IOError as err:
+                raise InitJournalError('Error: ' + str(err))
+            # Verify the mandatory options are present
+            self.get_client_spec()
+            self.get_manifest()
+        else:
+            self._config.add_section(type(self)._INFO_SECTION)
+        return
+
+    def exists(self):
+        """Determine if the journal file exists.
+
+        :returns: ``True`` if the journal file exists, ``False`` otherwise.
+        :rtype: Boolean
+
+        """
+        return _os.path.isfile(self._file_name)
+
+    def set_client_spec(self, client_spec_name):
+        """Set the name of the client spec being initialized.
+
+        :param client_spec_name: Name of the client spec.
+        :type client_spec_name: str
+        :returns: None
+
+        """
+        self._config.set(type(self)._INFO_SECTION,
+                         'client_spec',
+                         client_spec_name)
+        return
+
+    def get_client_spec(self):
+        """Get the name of the client spec being initialized.
+
+        :returns: Name of the client spec.
+        :rtype: str
+        :raises: :exc:`InitJournalError` if the journal does not have the
+            ``client_spec`` option.
+
+        """
+        return self._get_config(type(self)._INFO_SECTION, 'client_spec')
+
+    def set_manifest(self, manifest):
+        """Set the manifest used for the initialization.
+
+        :param manifest: The manifest passed to the ``init`` command.
+        :type manifest: str
+        :returns: None
+
+        """
+        self._config.set(type(self)._INFO_SECTION, 'manifest', manifest)
+        return
+
+    def get_manifest(self):
+        """Get the manifest used for the initialization.
+
+        :returns: The manifest passed to the ``init`` command.
+        :rtype: str
+        :raises: :exc:`InitJournalError` if the journal does not have the
+            ``manifest`` option.
+
+        """
+        return self._get_config(type(self)._INFO_SECTION, 'manifest')
+
+    def get_repo_state(self, dest):
+        """Get the clone state of a repo.
+
+        :param dest: Destination directory of the repo.
+        :type dest: str
+        :returns: State of the repo, ``STATE_PENDING`` if the repo is not
+            part of the journal.
+        :rtype: str
+
+        """
+        section = self._get_repo_section(dest)
+        with self._lock:
+            if not self._config.has_section(section):
+                return type(self).STATE_PENDING
+            return self._get_config(section, 'state')
+        return
+
+    def set_repo_state(self, dest, state):
+        """Set the clone state of a repo and write the journal to disk.
+
+        :param dest: Destination directory of the repo.
+        :type dest: str
+        :param state: New state of the repo.
+        :type state: str
+        :returns: None
+        :raises: :exc:`InitJournalError` on errors in writing the journal.
+
+        """
+        section = self._get_repo_section(dest)
+        with self._lock:
+            if not self._config.has_section(section):
+                self._config.add_section(section)
+            self._config.set(section, 'state', state)
+            self.write()
+        return
+
+    def write(self):
+        """Write the journal to disk.
+
+        The journal file is replaced atomically, so that an interruption
+        never leaves behind a partially written journal.
+
+        :returns: None
+        :raises: :exc:`InitJournalError` on errors in writing the journal.
+
+        """
+        try:
+            with AtomicFile(self._file_name, self._sync) as journal_file:
+                self._config.write(journal_file)
+        except AtomicFileError as err:
+            raise InitJournalError(str(err))
+        except IOError as err:
+            raise InitJournalError('Error: ' + str(err))
+        return
+
+    def remove(self):
+        """Remove the journal file from disk.
+
+        :returns: None
+        :raises: :exc:`InitJournalError` on errors in removing the file. No
+            exception is raised if the file does not exist.
+
+        """
+        try:
+            _os.unlink(self._file_name)
+        except OSError as err:
+            if _os.path.exists(self._file_name):
+                raise InitJournalError('Error: ' + str(err))
+        return
@@ -23,10 +23,12 @@
 
 """
 
+import os as _os
 import sys as _sys
 
 from repobuddy.arg_parser import ArgParser, ArgParserError
 from repobuddy.command_handler import CommandHandler, CommandHandlerError
+from repobuddy.server import Server, ServerClient, ServerError
 from repobuddy.utils import Logger
 
 
@@ -42,16 +44,24 @@ def run_repobuddy():
     command_handler = CommandHandler()
     handlers = command_handler.get_handlers()
 
+    # Use the server running for the client when available
+    server_client = ServerClient(Server.get_socket_file(_os.getcwd()))
+    for command in Server.COMMANDS:
+        handlers[command] = server_client.get_handler(handlers[command])
+
     # Parse the command line arguments and invoke the handler
     arg_parser = ArgParser(handlers)
     try:
         arg_parser.parse(_sys.argv[1:])
-    except (CommandHandlerError, ArgParserError) as err:
-        if isinstance(err, CommandHandlerError) or \
+    except (CommandHandlerError, ArgParserError, ServerError) as err:
+        if not isinstance(err, ArgParserError) or \
            (not err.exit_prog_without_error):
             err_msg = str(err)
             if not err_msg is 'None':
                 Logger.error(err_msg)
             _sys.exit(1)
+    except KeyboardInterrupt:
+        Logger.error('Error: Interrupted')
+        _sys.exit(130)
 
     _sys.exit(0)
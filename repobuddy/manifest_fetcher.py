@@ -0,0 +1,307 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+.. module: repobuddy.manifest_fetcher
+   :platform: Unix, Windows
+   :synopsis: Fetches remote manifests into a local cache.
+.. moduleauthor: Ash <tuxdude.github@gmail.com>
+
+"""
+
+import hashlib as _hashlib
+import json as _json
+import os as _os
+import sys as _sys
+
+if _sys.version_info >= (3, 0):
+    import urllib.request as _urllib_request    # pylint: disable=F0401
+    import urllib.error as _urllib_error        # pylint: disable=F0401
+else:
+    import urllib2 as _urllib_request           # pylint: disable=F0401
+    import urllib2 as _urllib_error             # pylint: disable=F0401
+
+from repobuddy.git_wrapper import GitWrapper, GitWrapperError
+from repobuddy.utils import AtomicFile, AtomicFileError, Logger, \
+    RepoBuddyBaseException
+
+
+class ManifestFetcherError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`ManifestFetcher`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(ManifestFetcherError, self).__init__(error_str)
+        return
+
+
+class ManifestFetcher(object):
+
+    """Fetches remote manifests into a local cache.
+
+    The following kinds of manifest locations are supported:
+
+    -   ``http://`` and ``https://`` URLs. The cached manifest is
+        revalidated using the ``ETag`` and ``Last-Modified`` headers, so
+        that an unchanged manifest costs a single ``304 Not Modified``
+        response.
+    -   Git repositories, as ``<url>#<branch>:<path>``, where ``<url>`` is
+        either a ``git://`` URL, or any URL supported by ``git`` prefixed
+        with ``git+``, like ``git+ssh://`` or ``git+file://``. The branch
+        is looked up using ``git ls-remote``, and fetched only if it has
+        moved since the manifest was cached. The cached manifest records
+        the commit SHA it was actually fetched at.
+
+    """
+
+    _GIT_PREFIX = 'git+'
+
+    @classmethod
+    def is_remote(cls, manifest):
+        """Determine if the manifest needs to be fetched using this class.
+
+        :param manifest: The location of the manifest.
+        :type manifest: str
+        :returns: ``True`` if the manifest is remote, ``False`` if it is a
+            local file.
+        :rtype: Boolean
+
+        """
+        return manifest.startswith('http://') or \
+            manifest.startswith('https://') or \
+            manifest.startswith('git://') or \
+            manifest.startswith(cls._GIT_PREFIX)
+
+    @classmethod
+    def get_default_cache_dir(cls):
+        """Get the default directory for caching the manifests.
+
+        :returns: ``repobuddy/manifests`` under ``$XDG_CACHE_HOME``, or
+            ``~/.cache`` if it is not set.
+        :rtype: str
+
+        """
+        cache_home = _os.environ.get('XDG_CACHE_HOME')
+        if cache_home is None or cache_home == '':
+            cache_home = _os.path.join(_os.path.expanduser('~'), '.cache')
+        return _os.path.join(cache_home, 'repobuddy', 'manifests')
+
+    def _get_cache_files(self, manifest):
+        """Get the names of the files caching the manifest.
+
+        :param manifest: The location of the manifest.
+        :type manifest: str
+        :returns: A tuple with the names of the cached manifest file and the
+            file storing its metadata.
+        :rtype: Tuple
+
+        """
+        key = _hashlib.sha1(manifest.encode('utf-8')).hexdigest()
+        return (_os.path.join(self._cache_dir, key + '.xml'),
+                _os.path.join(self._cache_dir, key + '.json'))
+
+    def _read_metadata(self, metadata_file):
+        """Read the metadata of a cached manifest.
+
+        :param metadata_file: The name of the metadata file.
+        :type metadata_file: str
+        :returns: The metadata, an empty dictionary if it is missing or
+            cannot be read.
+        :rtype: dict
+
+        """
+        try:
+            with open(metadata_file, 'r') as file_handle:
+                metadata = _json.load(file_handle)
+        except (IOError, ValueError):
+            return {}
+        if not isinstance(metadata, dict):
+            return {}
+        return metadata
+
+    def _write_cache(self, manifest, contents, metadata):
+        """Store a fetched manifest in the cache.
+
+        :param manifest: The location of the manifest.
+        :type manifest: str
+        :param contents: The contents of the manifest.
+        :type contents: bytes
+        :param metadata: The metadata to revalidate the manifest with.
+        :type metadata: dict
+        :returns: None
+        :raises: :exc:`ManifestFetcherError` on errors in writing the cache.
+
+        """
+        (cache_file, metadata_file) = self._get_cache_files(manifest)
+        try:
+            if not _os.path.isdir(self._cache_dir):
+                _os.makedirs(self._cache_dir)
+            with AtomicFile(cache_file, self._sync, 'wb') as file_handle:
+                file_handle.write(contents)
+            with AtomicFile(metadata_file, self._sync) as file_handle:
+                _json.dump(metadata, file_handle)
+        except (AtomicFileError, IOError, OSError) as err:
+            raise ManifestFetcherError(
+                'Error: Unable to cache the manifest => ' + str(err))
+        return
+
+    def _fetch_http(self, manifest):
+        """Fetch a manifest over ``http`` or ``https``.
+
+        :param manifest: The URL of the manifest.
+        :type manifest: str
+        :returns: The name of the cached manifest file.
+        :rtype: str
+        :raises: :exc:`ManifestFetcherError` on errors.
+
+        """
+        (cache_file, metadata_file) = self._get_cache_files(manifest)
+        metadata = {}
+        if _os.path.isfile(cache_file):
+            metadata = self._read_metadata(metadata_file)
+
+        request = _urllib_request.Request(manifest)
+        if 'etag' in metadata:
+            request.add_header('If-None-Match', metadata['etag'])
+        if 'last_modified' in metadata:
+            request.add_header('If-Modified-Since', metadata['last_modified'])
+
+        try:
+            response = _urllib_request.urlopen(request, timeout=self._timeout)
+            try:
+                contents = response.read()
+                headers = response.info()
+            finally:
+                response.close()
+        except _urllib_error.HTTPError as err:
+            if err.code == 304 and len(metadata) != 0:
+                Logger.debug('Manifest not modified: ' + manifest)
+                return cache_file
+            raise ManifestFetcherError(
+                'Error: Unable to fetch the manifest ' + manifest +
+                ' => ' + str(err))
+        except (_urllib_error.URLError, IOError) as err:
+            raise ManifestFetcherError(
+                'Error: Unable to fetch the manifest ' + manifest +
+                ' => ' + str(err))
+
+        metadata = {}
+        if not headers.get('ETag') is None:
+            metadata['etag'] = headers.get('ETag')
+        if not headers.get('Last-Modified') is None:
+            metadata['last_modified'] = headers.get('Last-Modified')
+        self._write_cache(manifest, contents, metadata)
+        return cache_file
+
+    def _fetch_git(self, manifest):
+        """Fetch a manifest from a git repository.
+
+        :param manifest: The location of the manifest as
+            ``<url>#<branch>:<path>``.
+        :type manifest: str
+        :returns: The name of the cached manifest file.
+        :rtype: str
+        :raises: :exc:`ManifestFetcherError` on errors.
+
+        """
+        url = manifest
+        if url.startswith(type(self)._GIT_PREFIX):
+            url = url[len(type(self)._GIT_PREFIX):]
+        (url, _separator, ref_path) = url.partition('#')
+        (branch, _separator, path) = ref_path.partition(':')
+        if branch == '' or path == '':
+            raise ManifestFetcherError(
+                'Error: Git manifest \'' + manifest + '\' needs to be ' +
+                'specified as <url>#<branch>:<path>')
+
+        (cache_file, metadata_file) = self._get_cache_files(manifest)
+        metadata = {}
+        if _os.path.isfile(cache_file):
+            metadata = self._read_metadata(metadata_file)
+
+        try:
+            if not _os.path.isdir(self._cache_dir):
+                _os.makedirs(self._cache_dir)
+            revision = GitWrapper(self._cache_dir).get_remote_revision(
+                url, branch)
+            if revision is None:
+                raise ManifestFetcherError(
+                    'Error: Branch \'' + branch + '\' not found in ' + url)
+            if metadata.get('revision') == revision:
+                Logger.debug('Manifest not modified: ' + manifest)
+                return cache_file
+            # The objects are fetched into a bare repo kept per URL, and
+            # the branch may have moved since it was looked up
+            repo_dir = _os.path.join(
+                self._cache_dir, 'git',
+                _hashlib.sha1(url.encode('utf-8')).hexdigest())
+            (contents, revision) = GitWrapper(repo_dir).read_remote_file(
+                url, branch, path)
+        except OSError as err:
+            raise ManifestFetcherError('Error: ' + str(err))
+        except GitWrapperError as err:
+            raise ManifestFetcherError(
+                'Error: Unable to fetch the manifest ' + manifest +
+                ' => ' + str(err))
+
+        self._write_cache(manifest, contents.encode('utf-8'),
+                          {'revision': revision})
+        return cache_file
+
+    def __init__(self, cache_dir=None, sync=True, timeout=60):
+        """Initializer.
+
+        :param cache_dir: Absolute path of the directory to cache the
+            manifests in. If ``None``, :meth:`get_default_cache_dir()` is
+            used.
+        :type cache_dir: str
+        :param sync: If ``True``, the cached files are flushed to the disk.
+        :type sync: Boolean
+        :param timeout: Timeout in seconds for the ``http`` requests.
+        :type timeout: float
+
+        """
+        if cache_dir is None:
+            cache_dir = type(self).get_default_cache_dir()
+        self._cache_dir = cache_dir
+        self._sync = sync
+        self._timeout = timeout
+        return
+
+    def fetch(self, manifest):
+        """Fetch the manifest into the cache, if it has changed.
+
+        :param manifest: The location of the manifest.
+        :type manifest: str
+        :returns: The name of the cached manifest file.
+        :rtype: str
+        :raises: :exc:`ManifestFetcherError` on errors in fetching the
+            manifest, or if ``manifest`` is not a remote location.
+
+        """
+        if manifest.startswith('http://') or manifest.startswith('https://'):
+            return self._fetch_http(manifest)
+        elif type(self).is_remote(manifest):
+            return self._fetch_git(manifest)
+        raise ManifestFetcherError(
+            'Error: \'' + manifest + '\' is not a remote manifest')
@@ -24,7 +24,9 @@
 """
 
 import copy as _copy
+import os as _os
 import xml.sax as _sax
+import xml.sax.saxutils as _saxutils
 
 from repobuddy.utils import EqualityBase, RepoBuddyBaseException
 
@@ -33,16 +35,56 @@ class ManifestParserError(RepoBuddyBaseException):
 
     """Exception raised by :class:`ManifestParser`."""
 
-    def __init__(self, error_str):
+    def __init__(self, error_str, errors=None):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+        :param errors: The individual errors, if the exception reports
+            multiple errors in the manifest. If ``None``, ``error_str`` is
+            the only error.
+        :type errors: list of str
+
+        """
         super(ManifestParserError, self).__init__(error_str)
+        if errors is None:
+            errors = [str(error_str)]
+        self._errors = errors[:]
         return
 
+    @classmethod
+    def from_errors(cls, errors):
+        """Create an exception reporting all the errors in a manifest.
+
+        :param errors: The errors found in the manifest.
+        :type errors: list of str
+        :returns: The exception, with the error string being the only error,
+            or a summary followed by one error per line.
+        :rtype: :exc:`ManifestParserError`
+
+        """
+        if len(errors) == 1:
+            return cls(errors[0])
+        return cls('Error: Found %d errors in the manifest:\n' % len(errors) +
+                   '\n'.join(errors),
+                   errors)
+
+    def get_errors(self):
+        """Get the individual errors reported by the exception.
+
+        :returns: The errors.
+        :rtype: list of str
+
+        """
+        return self._errors[:]
+
 
 class Repo(EqualityBase):
 
     """Represents the Repository in the manifest."""
 
-    def __init__(self, url=None, branch=None, dest=None):
+    def __init__(self, url=None, branch=None, dest=None, bundle=None,
+                 revision=None, sparse_paths=None):
         """Initializer.
 
         :param url: URL of the repository.
@@ -51,16 +93,38 @@ class Repo(EqualityBase):
         :type branch: str
         :dest: Destination directory.
         :type dest: str
+        :param bundle: Optional git bundle file to seed the clone from. A
+            relative path is looked up in the bundle directory passed to
+            ``init``.
+        :type bundle: str
+        :param revision: Optional commit SHA to pin the repo to.
+        :type revision: str
+        :param sparse_paths: Optional list of directories to restrict the
+            checkout to, using sparse-checkout in cone mode.
+        :type sparse_paths: list of str
 
         """
         self.url = url
         self.branch = branch
         self.dest = dest
+        self.bundle = bundle
+        self.revision = revision
+        if not sparse_paths is None:
+            self.sparse_paths = sparse_paths[:]
+        else:
+            self.sparse_paths = None
         return
 
     def __str__(self):
-        return ('<Repo url:%s branch:%s dest:%s>' %
-                (self.url, self.branch, self.dest))
+        repo_str = ('<Repo url:%s branch:%s dest:%s' %
+                    (self.url, self.branch, self.dest))
+        if not self.bundle is None:
+            repo_str += ' bundle:%s' % self.bundle
+        if not self.revision is None:
+            repo_str += ' revision:%s' % self.revision
+        if not self.sparse_paths is None:
+            repo_str += ' sparse_paths:%s' % str(self.sparse_paths)
+        return repo_str + '>'
 
     def __repr__(self):
         return self.__str__()
@@ -70,13 +134,16 @@ class ClientSpec(EqualityBase):
 
     """Represents the Client Spec in the manifest."""
 
-    def __init__(self, name=None, repo_list=None):
+    def __init__(self, name=None, repo_list=None, extends=None):
         """Initializer.
 
         :param name: Name of the client spec.
         :type name: str
         :param repo_list: List of Repositories in the manifest.
         :type: list of :class:`Repo`
+        :param extends: Names of the client specs this client spec inherits
+            the repos from.
+        :type extends: list of str
 
         """
         self.name = name
@@ -84,9 +151,16 @@ class ClientSpec(EqualityBase):
             self.repo_list = repo_list[:]
         else:
             self.repo_list = None
+        if not extends is None:
+            self.extends = extends[:]
+        else:
+            self.extends = None
         return
 
     def __str__(self):
+        if not self.extends is None:
+            return ('<ClientSpec name:%s extends:%s repo_list:%s>' %
+                    (self.name, str(self.extends), str(self.repo_list)))
         return ('<ClientSpec name:%s repo_list:%s>' %
                 (self.name, str(self.repo_list)))
 
@@ -122,98 +196,325 @@ class Manifest(EqualityBase):
         return self.__str__()
 
 
-# manifest - a list of client specs
-# Each client Spec - a list of repos
+# manifest - a list of client specs, and the files to include client
+# specs from
+# Each client Spec - a list of repos, and the client specs it extends
 # Each repo - a dict with following keys { Url, Branch, Destination }
+# and the optional keys { Bundle, Revision, SparseCheckout }
 class _XmlContentHandler(_sax.ContentHandler):
 
     """Handler for the SAX XML parser events.
 
     Helps in parsing and storing the information from the manifest.
 
+    ``<Include file="..."/>`` elements pull in the client specs from
+    another manifest file, whose path is relative to the including file.
+    Each file is parsed only once, even if it is included multiple times,
+    and cyclic includes are reported as errors.
+
+    ``<ClientSpec extends="...">`` makes the client spec inherit the repos
+    of the whitespace separated list of client specs, followed by its own
+    repos. An own repo replaces an inherited repo with the same
+    destination. Each client spec is resolved only once, and the inherited
+    :class:`Repo` objects are shared with the parent client specs, rather
+    than being copied.
+
     """
 
+    def _validate_repo(self, client_spec, repo, errors):
+        """Validate the fields of a repo.
+
+        :param client_spec: The client spec containing the repo.
+        :type client_spec: :class:`ClientSpec`
+        :param repo: The repo to validate.
+        :type repo: :class:`Repo`
+        :param errors: List to add the errors found to.
+        :type errors: list of str
+        :returns: None
+
+        """
+        prefix = 'Error: Client Spec \'%s\' ' % client_spec.name
+        if repo.url is None and repo.branch is None and repo.dest is None:
+            errors.append(prefix + 'has no info about the Repo')
+            return
+
+        for (value, name) in [(repo.url, 'Url'),
+                              (repo.branch, 'Branch'),
+                              (repo.dest, 'Destination')]:
+            if value is None:
+                errors.append(
+                    prefix + 'has a Repo with no \'%s\' info' % name)
+            elif value == '':
+                errors.append(prefix + 'has an empty Repo \'%s\'' % name)
+
+        for (value, name) in [(repo.bundle, 'Bundle'),
+                              (repo.revision, 'Revision')]:
+            if value == '':
+                errors.append(prefix + 'has an empty Repo \'%s\'' % name)
+
+        if repo.sparse_paths == []:
+            errors.append(prefix + 'has an empty Repo \'SparseCheckout\'')
+        elif not repo.sparse_paths is None and '' in repo.sparse_paths:
+            errors.append(
+                prefix + 'has an empty Repo \'SparseCheckout\' \'Path\'')
+        return
+
+    def _validate_dests(self, client_spec, errors):
+        """Validate the destinations of the repos in a client spec.
+
+        The destinations are indexed by their normalized path, so that both
+        the duplicate destinations, and the destinations nested within
+        another repo are found by looking up each repo and its parent
+        directories just once.
+
+        :param client_spec: The client spec to validate.
+        :type client_spec: :class:`ClientSpec`
+        :param errors: List to add the errors found to.
+        :type errors: list of str
+        :returns: None
+
+        """
+        prefix = 'Error: Client Spec \'%s\' ' % client_spec.name
+        dests = {}
+        repo_dests = []
+        for repo in client_spec.repo_list or []:
+            if not repo.dest:
+                continue
+            dest = _os.path.normpath(repo.dest)
+            if dest in dests:
+                errors.append(
+                    prefix + 'has multiple Repos with the Destination ' +
+                    '\'%s\'' % repo.dest)
+                continue
+            dests[dest] = repo.dest
+            repo_dests.append(dest)
+
+        for dest in repo_dests:
+            parent = _os.path.dirname(dest)
+            while parent != '' and parent != _os.path.dirname(parent):
+                if parent in dests:
+                    errors.append(
+                        prefix + 'has the Repo Destination \'%s\' ' %
+                        dests[dest] +
+                        'nested within the Repo Destination \'%s\'' %
+                        dests[parent])
+                    break
+                parent = _os.path.dirname(parent)
+        return
+
     def _validate_manifest(self):
         """Validate the current manifest.
 
-        :returns: None
-        :raises: :exc:`ManifestParserError` on errors.
+        All the client specs and their repos are validated in a single pass,
+        and all the errors found are returned together. The destinations of
+        the client specs extending other client specs are validated after
+        resolving them, using :meth:`_validate_resolved_manifest()`.
+
+        :returns: The errors found.
+        :rtype: list of str
 
         """
+        errors = []
+
         # Verify that default_client_spec is set
         if self._manifest.default_client_spec == '':
-            raise ManifestParserError(
-                'Error: default_client_spec cannot be empty')
+            errors.append('Error: default_client_spec cannot be empty')
 
         # Verify that there is at least one element in the client_spec_list
         if self._manifest.client_spec_list is None:
-            raise ManifestParserError(
+            errors.append(
                 'Error: There should be at least one valid Client Spec')
+            return errors
+
+        client_spec_names = set()
+        for client_spec in self._manifest.client_spec_list:
+            if client_spec.name in client_spec_names:
+                errors.append('Error: Duplicate Client Spec \'' +
+                              client_spec.name + '\' found')
+            client_spec_names.add(client_spec.name)
 
         # Verify default_client_spec is part of client_spec_list
-        # Check for duplicate names
-        found_default_client_spec = False
-        found_client_specs = set()
+        if self._manifest.default_client_spec != '' and \
+                not self._manifest.default_client_spec in client_spec_names:
+            errors.append(
+                'Error: Unable to find the Client Spec \'' +
+                self._manifest.default_client_spec +
+                '\' in the list of Repos')
+
         for client_spec in self._manifest.client_spec_list:
-            if client_spec.name == self._manifest.default_client_spec:
-                found_default_client_spec = True
-            if client_spec.name in found_client_specs:
-                raise ManifestParserError(
-                    'Error: Duplicate Client Spec \'' +
-                    client_spec.name + '\' found')
-            if client_spec.repo_list is None:
-                raise ManifestParserError(
+            if client_spec.repo_list is None and client_spec.extends is None:
+                errors.append(
                     'Error: Client Spec \'%s\' should have at least one repo' %
                     client_spec.name)
-            for repo in client_spec.repo_list:
-                if repo.url is None and repo.branch is None and \
-                        repo.dest is None:
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has no info about the Repo')
+            for parent_name in client_spec.extends or []:
+                if not parent_name in client_spec_names:
+                    errors.append(
+                        'Error: Client Spec \'%s\' extends an unknown ' %
+                        client_spec.name +
+                        'Client Spec \'%s\'' % parent_name)
+            for repo in client_spec.repo_list or []:
+                self._validate_repo(client_spec, repo, errors)
+            self._validate_dests(client_spec, errors)
+        return errors
+
+    def _validate_resolved_manifest(self):
+        """Validate the client specs extending other client specs.
+
+        :returns: The errors found.
+        :rtype: list of str
 
-                if repo.url is None:
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has a Repo with no \'Url\' info')
-                elif repo.url == '':
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has an empty Repo \'Url\'')
+        """
+        errors = []
+        for client_spec in self._manifest.client_spec_list:
+            if not client_spec.extends is None:
+                self._validate_dests(client_spec, errors)
+        return errors
+
+    def _resolve_client_spec(self, client_spec, client_specs, resolving):
+        """Resolve the repos of a client spec, including the inherited ones.
+
+        :param client_spec: The client spec to resolve.
+        :type client_spec: :class:`ClientSpec`
+        :param client_specs: All the client specs in the manifest, keyed
+            by name.
+        :type client_specs: dict
+        :param resolving: Names of the client specs being resolved, to
+            detect cycles.
+        :type resolving: list of str
+        :returns: The resolved list of repos.
+        :rtype: list of :class:`Repo`
+        :raises: :exc:`ManifestParserError` on cyclic extends.
 
-                if repo.branch is None:
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has a Repo with no \'Branch\' info')
-                elif repo.branch == '':
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has an empty Repo \'Branch\'')
+        """
+        if client_spec.name in self._resolved_client_specs:
+            return client_spec.repo_list
+        if client_spec.name in resolving:
+            raise ManifestParserError(
+                'Error: Client Spec \'%s\' extends itself through: %s' %
+                (client_spec.name,
+                 ' -> '.join(resolving + [client_spec.name])))
+
+        resolving.append(client_spec.name)
+        inherited_repo_list = []
+        # The parents are known to exist, from validating the manifest
+        for parent_name in client_spec.extends:
+            inherited_repo_list.extend(self._resolve_client_spec(
+                client_specs[parent_name], client_specs, resolving))
+        resolving.pop()
+
+        # A later repo replaces an earlier one with the same destination,
+        # while retaining the position of the earlier one
+        repo_list = []
+        repo_index = {}
+        for repo in inherited_repo_list + (client_spec.repo_list or []):
+            dest = _os.path.normpath(repo.dest)
+            if dest in repo_index:
+                repo_list[repo_index[dest]] = repo
+            else:
+                repo_index[dest] = len(repo_list)
+                repo_list.append(repo)
+
+        client_spec.repo_list = repo_list
+        self._resolved_client_specs.add(client_spec.name)
+        return repo_list
+
+    def _resolve_manifest(self):
+        """Resolve the repos of the client specs extending other specs.
 
-                if repo.dest is None:
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has a Repo with no \'Destination\' info')
-                elif repo.dest == '':
-                    raise ManifestParserError(
-                        'Error: Client Spec \'%s\' ' % client_spec.name +
-                        'has an empty Repo \'Destination\'')
+        :returns: None
+        :raises: :exc:`ManifestParserError` on errors.
 
-            found_client_specs.add(client_spec.name)
+        """
+        client_specs = dict((client_spec.name, client_spec)
+                            for client_spec in self._manifest.client_spec_list)
+        for client_spec in self._manifest.client_spec_list:
+            if client_spec.extends is None:
+                self._resolved_client_specs.add(client_spec.name)
+        for client_spec in self._manifest.client_spec_list:
+            self._resolve_client_spec(client_spec, client_specs, [])
+        return
+
+    def _include(self, file_name):
+        """Add the client specs from another manifest file.
+
+        :param file_name: Path of the file, relative to the directory of
+            the including file.
+        :type file_name: str
+        :returns: None
+        :raises: :exc:`ManifestParserError` on cyclic includes, or errors in
+            opening or parsing the file.
 
-        if not found_default_client_spec:
+        """
+        file_name = _os.path.normpath(_os.path.join(self._base_dir,
+                                                    file_name))
+        if file_name in self._include_stack:
             raise ManifestParserError(
-                'Error: Unable to find the Client Spec \'' +
-                self._manifest.default_client_spec +
-                '\' in the list of Repos')
+                'Error: Cyclic Include of \'%s\'' % file_name)
+        if file_name in self._included_files:
+            return
+
+        self._included_files.append(file_name)
+        self._include_stack.append(file_name)
+        xml_parser = _XmlContentHandler(_os.path.dirname(file_name),
+                                        included_files=self._included_files,
+                                        include_stack=self._include_stack)
+        try:
+            with open(file_name, 'r') as file_handle:
+                _sax.parse(file_handle, xml_parser)
+        except IOError as err:
+            raise ManifestParserError(
+                'Error: Unable to open the included file: ' + str(err))
+        except _sax.SAXParseException as err:
+            raise ManifestParserError(
+                'Error: Unable to parse the included file: ' + str(err))
+        self._include_stack.pop()
+
+        included_client_specs = xml_parser.get_manifest().client_spec_list
+        if not included_client_specs is None:
+            if self._manifest.client_spec_list is None:
+                self._manifest.client_spec_list = []
+            self._manifest.client_spec_list.extend(included_client_specs)
         return
 
-    def __init__(self):
-        """Initializer."""
+    def __init__(self, base_dir=None, file_name=None, included_files=None,
+                 include_stack=None):
+        """Initializer.
+
+        :param base_dir: Directory to resolve the included files relative
+            to. If ``None``, the current working directory is used.
+        :type base_dir: str
+        :param file_name: Absolute path of the manifest file being parsed,
+            if known, to detect it being included by the other files.
+        :type file_name: str
+        :param included_files: Absolute paths of the files included so
+            far in the order of inclusion, shared with the handlers of the
+            included files.
+        :type included_files: list of str
+        :param include_stack: Absolute paths of the files being included,
+            shared with the handlers of the included files. If not ``None``,
+            this handler parses an included file.
+        :type include_stack: list of str
+
+        """
         self._last_repo = None
+        self._in_sparse_checkout = False
         self._manifest = None
         self._last_content = None
         self._last_client_spec = None
+        self._base_dir = base_dir
+        if base_dir is None:
+            self._base_dir = _os.getcwd()
+        self._is_included = not include_stack is None
+        self._included_files = included_files
+        if included_files is None:
+            self._included_files = []
+        self._include_stack = include_stack
+        if include_stack is None:
+            self._include_stack = []
+            if not file_name is None:
+                self._included_files.append(file_name)
+                self._include_stack.append(file_name)
+        self._resolved_client_specs = set()
         _sax.ContentHandler.__init__(self)
         return
 
@@ -224,7 +525,14 @@ class _XmlContentHandler(_sax.ContentHandler):
 
     def endDocument(self):
         """Overriden method of :class:`xml.sax.handler.ContentHandler`."""
-        self._validate_manifest()
+        # The included files are validated along with the including file
+        if not self._is_included:
+            errors = self._validate_manifest()
+            if len(errors) == 0:
+                self._resolve_manifest()
+                errors = self._validate_resolved_manifest()
+            if len(errors) != 0:
+                raise ManifestParserError.from_errors(errors)
         return
 
     def startElement(self, name, attrs):
@@ -233,9 +541,20 @@ class _XmlContentHandler(_sax.ContentHandler):
             try:
                 self._manifest.default_client_spec = \
                     _copy.deepcopy(str(attrs.getValue('default_client_spec')))
+            except KeyError:
+                # Included files use the default of the including file
+                if not self._is_included:
+                    raise ManifestParserError(
+                        'Error: No default_client_spec found')
+        elif name == 'Include':
+            if not self._last_client_spec is None:
+                raise ManifestParserError(
+                    'Error: Include is not allowed within a ClientSpec')
+            try:
+                self._include(attrs.getValue('file'))
             except KeyError:
                 raise ManifestParserError(
-                    'Error: No default_client_spec found')
+                    'Error: No file specified for Include')
         elif name == 'ClientSpec':
             if self._manifest.client_spec_list is None:
                 self._manifest.client_spec_list = []
@@ -245,10 +564,26 @@ class _XmlContentHandler(_sax.ContentHandler):
             except KeyError:
                 raise ManifestParserError(
                     'Error: No name specified for ClientSpec')
+            try:
+                self._last_client_spec.extends = \
+                    str(attrs.getValue('extends')).split()
+            except KeyError:
+                pass
+            if self._last_client_spec.extends == []:
+                raise ManifestParserError(
+                    'Error: Client Spec \'%s\' has an empty \'extends\'' %
+                    self._last_client_spec.name)
         elif name == 'Repo':
             if self._last_client_spec.repo_list is None:
                 self._last_client_spec.repo_list = []
             self._last_repo = Repo()
+        elif name == 'SparseCheckout':
+            self._last_repo.sparse_paths = []
+            self._in_sparse_checkout = True
+        elif name == 'Path':
+            if not self._in_sparse_checkout:
+                raise ManifestParserError(
+                    'Error: Path is not allowed outside a SparseCheckout')
 
         self._last_content = ''
         return
@@ -258,6 +593,7 @@ class _XmlContentHandler(_sax.ContentHandler):
         if name == 'ClientSpec':
             # Add this clientspec to the manifest
             self._manifest.client_spec_list.append(self._last_client_spec)
+            self._last_client_spec = None
         elif name == 'Repo':
             # Add this repo to the clientspec
             self._last_client_spec.repo_list.append(self._last_repo)
@@ -270,6 +606,17 @@ class _XmlContentHandler(_sax.ContentHandler):
         elif name == 'Destination':
             # Set the dest key in the repo
             self._last_repo.dest = self._last_content
+        elif name == 'Bundle':
+            # Set the optional bundle key in the repo
+            self._last_repo.bundle = self._last_content
+        elif name == 'Revision':
+            # Set the optional revision key in the repo
+            self._last_repo.revision = self._last_content
+        elif name == 'SparseCheckout':
+            self._in_sparse_checkout = False
+        elif name == 'Path':
+            # Add the path to the sparse-checkout paths in the repo
+            self._last_repo.sparse_paths.append(self._last_content)
         return
 
     def characters(self, content):
@@ -286,6 +633,20 @@ class _XmlContentHandler(_sax.ContentHandler):
         """
         return self._manifest
 
+    def get_included_files(self):
+        """Get the files included by the manifest.
+
+        :returns: Absolute paths of the included files, in the order they
+            were included.
+        :rtype: list of str
+
+        """
+        if self._is_included or len(self._include_stack) == 0:
+            return self._included_files[:]
+        # Skip the manifest file itself
+        return [file_name for file_name in self._included_files
+                if file_name != self._include_stack[0]]
+
 
 class ManifestParser(object):
 
@@ -294,13 +655,19 @@ class ManifestParser(object):
     def __init__(self):
         """Initializer."""
         self._manifest = None
+        self._included_files = []
         return
 
-    def parse(self, file_handle):
+    def parse(self, file_handle, base_dir=None):
         """Parse the manifest from the stream.
 
         :param file_handle: The stream to parse the manifest from.
         :type file_handle: File object.
+        :param base_dir: Directory to resolve the included files relative
+            to. If ``None``, the directory of the file is used when
+            ``file_handle`` is a file, or the current working directory
+            otherwise.
+        :type base_dir: str
         :returns: None
         :raises: :exc:`ManifestParserError` on errors.
 
@@ -318,7 +685,15 @@ class ManifestParser(object):
             raise ManifestParserError(
                 'Error: file_handle cannot be a string')
 
-        xml_parser = _XmlContentHandler()
+        file_name = getattr(file_handle, 'name', None)
+        if isinstance(file_name, basestring):
+            file_name = _os.path.abspath(file_name)
+            if base_dir is None:
+                base_dir = _os.path.dirname(file_name)
+        else:
+            file_name = None
+
+        xml_parser = _XmlContentHandler(base_dir, file_name)
         try:
             _sax.parse(file_handle, xml_parser)
         except _sax.SAXParseException as err:
@@ -336,6 +711,7 @@ class ManifestParser(object):
             except AttributeError:
                 pass
         self._manifest = xml_parser.get_manifest()
+        self._included_files = xml_parser.get_included_files()
         return
 
     def get_manifest(self):
@@ -346,3 +722,91 @@ class ManifestParser(object):
 
         """
         return self._manifest
+
+    def get_included_files(self):
+        """Get the files included by the parsed manifest.
+
+        :returns: Absolute paths of the included files, in the order they
+            were included.
+        :rtype: list of str
+
+        """
+        return self._included_files[:]
+
+
+class ManifestWriter(object):
+
+    """Helper class for writing a manifest as XML."""
+
+    def _write_element(self, file_handle, indent, name, value):
+        """Write a single element with text content.
+
+        :param file_handle: The stream to write to.
+        :type file_handle: File object.
+        :param indent: The indentation level of the element.
+        :type indent: int
+        :param name: The name of the element.
+        :type name: str
+        :param value: Text content of the element. If ``None``, the element
+            is not written.
+        :type value: str
+        :returns: None
+
+        """
+        if not value is None:
+            file_handle.write('%s<%s>%s</%s>\n' % (
+                '    ' * indent, name, _saxutils.escape(value), name))
+        return
+
+    def write(self, manifest, file_handle):
+        """Write the manifest as XML to the stream.
+
+        :param manifest: The manifest to write.
+        :type manifest: :class:`Manifest`
+        :param file_handle: The stream to write the manifest XML into.
+        :type file_handle: File object.
+        :returns: None
+        :raises: :exc:`IOError` on errors in writing to the stream.
+
+        """
+        file_handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        file_handle.write(
+            '<RepoBuddyManifest default_client_spec=%s>\n' %
+            _saxutils.quoteattr(manifest.default_client_spec))
+        client_specs = dict((client_spec.name, client_spec)
+                            for client_spec in manifest.client_spec_list)
+        for client_spec in manifest.client_spec_list:
+            if client_spec.extends is None:
+                file_handle.write('    <ClientSpec name=%s>\n' %
+                                  _saxutils.quoteattr(client_spec.name))
+                repo_list = client_spec.repo_list
+            else:
+                file_handle.write(
+                    '    <ClientSpec name=%s extends=%s>\n' %
+                    (_saxutils.quoteattr(client_spec.name),
+                     _saxutils.quoteattr(' '.join(client_spec.extends))))
+                # Only write the repos which are not inherited
+                inherited_repos = set()
+                for parent_name in client_spec.extends:
+                    inherited_repos.update(
+                        id(repo)
+                        for repo in client_specs[parent_name].repo_list)
+                repo_list = [repo for repo in client_spec.repo_list
+                             if not id(repo) in inherited_repos]
+            for repo in repo_list:
+                file_handle.write('        <Repo>\n')
+                self._write_element(file_handle, 3, 'Url', repo.url)
+                self._write_element(file_handle, 3, 'Branch', repo.branch)
+                self._write_element(file_handle, 3, 'Destination', repo.dest)
+                self._write_element(file_handle, 3, 'Bundle', repo.bundle)
+                self._write_element(file_handle, 3, 'Revision',
+                                    repo.revision)
+                if not repo.sparse_paths is None:
+                    file_handle.write('            <SparseCheckout>\n')
+                    for path in repo.sparse_paths:
+                        self._write_element(file_handle, 4, 'Path', path)
+                    file_handle.write('            </SparseCheckout>\n')
+                file_handle.write('        </Repo>\n')
+            file_handle.write('    </ClientSpec>\n')
+        file_handle.write('</RepoBuddyManifest>\n')
+        return
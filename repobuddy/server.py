@@ -0,0 +1,441 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+"""
+.. module: repobuddy.server
+   :platform: Unix
+   :synopsis: Serves ``repobuddy`` commands over a Unix domain socket.
+.. moduleauthor: Ash <tuxdude.github@gmail.com>
+
+"""
+
+import argparse as _argparse
+import errno as _errno
+import json as _json
+import os as _os
+import socket as _socket
+
+from repobuddy.utils import Logger, RepoBuddyBaseException
+
+
+class ServerError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`Server` and :class:`ServerClient`.
+
+    :ivar is_unavailable: Set to ``True`` if no server is accepting
+        connections on the socket, otherwise ``False``.
+
+    """
+
+    def __init__(self, error_str, is_unavailable=False):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+        :param is_unavailable: ``True`` if no server is accepting
+            connections on the socket, ``False`` otherwise.
+        :type is_unavailable: Boolean
+
+        """
+        super(ServerError, self).__init__(error_str)
+        self.is_unavailable = is_unavailable
+        return
+
+
+def _send_message(file_handle, message):
+    """Send a single message over the connection.
+
+    Messages are JSON objects, one per line.
+
+    :param file_handle: The file object for the connection.
+    :type file_handle: File like object
+    :param message: The message to send.
+    :type message: dict
+    :returns: None
+
+    """
+    file_handle.write((_json.dumps(message) + '\n').encode('utf-8'))
+    file_handle.flush()
+    return
+
+
+def _receive_message(file_handle):
+    """Receive a single message over the connection.
+
+    :param file_handle: The file object for the connection.
+    :type file_handle: File like object
+    :returns: The message, ``None`` if the connection was closed.
+    :rtype: dict
+    :raises: :exc:`ServerError` if the message is malformed.
+
+    """
+    line = file_handle.readline()
+    if len(line) == 0:
+        return None
+    try:
+        return _json.loads(line.decode('utf-8'))
+    except ValueError as err:
+        raise ServerError('Error: Malformed message => ' + str(err))
+    return
+
+
+class _OutputStream(object):
+
+    """Stream which forwards the log entries over the connection."""
+
+    def __init__(self, file_handle, stream_name):
+        """Initializer.
+
+        :param file_handle: The file object for the connection.
+        :type file_handle: File like object
+        :param stream_name: Name of the :class:`repobuddy.utils.Logger`
+            stream being forwarded.
+        :type stream_name: str
+
+        """
+        self._file_handle = file_handle
+        self._stream_name = stream_name
+        return
+
+    def write(self, data):
+        _send_message(self._file_handle,
+                      {'stream': self._stream_name, 'data': data})
+        return
+
+    def flush(self):
+        return
+
+
+class Server(object):
+
+    """Serves ``repobuddy`` commands over a Unix domain socket.
+
+    The server runs in the client directory, and keeps the state of the
+    command handlers, like the parsed manifest, resident across the
+    requests. The requests are handled one at a time.
+
+    Each request is a JSON object with the ``command`` and its ``args``.
+    The output of the command is streamed back as it is logged, followed
+    by a final message with the ``exit_status`` and the ``error``, if any.
+
+    """
+
+    COMMANDS = ['status']
+    """Commands which can be served."""
+
+    @classmethod
+    def is_supported(cls):
+        """Determine if Unix domain sockets are supported on this platform.
+
+        :returns: ``True`` if supported, ``False`` otherwise.
+        :rtype: Boolean
+
+        """
+        return hasattr(_socket, 'AF_UNIX')
+
+    @classmethod
+    def get_socket_file(cls, client_dir):
+        """Get the socket file of the server for a client.
+
+        :param client_dir: Absolute path of the client directory.
+        :type client_dir: str
+        :returns: Absolute path of the socket file.
+        :rtype: str
+
+        """
+        return _os.path.join(client_dir, '.repobuddy', 'server.sock')
+
+    def _handle_request(self, request):
+        """Execute the command in ``request``.
+
+        :param request: The request received from the client, which is
+            expected to be a dict.
+        :type request: dict
+        :returns: The error string if the command failed or the request is
+            malformed, ``None`` otherwise.
+        :rtype: str
+
+        """
+        try:
+            command = request.get('command')
+            if not command in type(self).COMMANDS:
+                return 'Error: Command \'' + str(command) + \
+                    '\' is not served'
+            self._handlers[command](
+                _argparse.Namespace(**request.get('args', {})))
+        except RepoBuddyBaseException as err:
+            return str(err)
+        except Exception as err:    # pylint: disable=W0703
+            # A malformed request, such as one with missing or invalid
+            # arguments, should not stop the server for the other clients
+            return 'Error: Unable to handle the request => ' + \
+                type(err).__name__ + ': ' + str(err)
+        return None
+
+    def _handle_connection(self, connection):
+        """Handle a single request from a client.
+
+        :param connection: The connection accepted from the client.
+        :type connection: :class:`socket.socket`
+        :returns: None
+
+        """
+        file_handle = connection.makefile('rwb')
+        original_streams = (Logger.msg_stream,
+                            Logger.error_stream,
+                            Logger.debug_stream)
+        try:
+            request = _receive_message(file_handle)
+            if request is None:
+                return
+            Logger.msg_stream = _OutputStream(file_handle, 'msg')
+            Logger.error_stream = _OutputStream(file_handle, 'error')
+            Logger.debug_stream = _OutputStream(file_handle, 'debug')
+            try:
+                error = self._handle_request(request)
+            finally:
+                (Logger.msg_stream,
+                 Logger.error_stream,
+                 Logger.debug_stream) = original_streams
+            if error is None:
+                _send_message(file_handle, {'exit_status': 0})
+            else:
+                _send_message(file_handle,
+                              {'exit_status': 1, 'error': error})
+        except (ServerError, _socket.error, IOError) as err:
+            # The client went away, or sent a malformed request
+            Logger.debug('Dropping the request: ' + str(err))
+        finally:
+            try:
+                file_handle.close()
+            except (_socket.error, IOError):
+                pass
+            connection.close()
+        return
+
+    def __init__(self, socket_file, handlers):
+        """Initializer.
+
+        :param socket_file: Absolute path of the socket file to listen on.
+        :type socket_file: str
+        :param handlers: A dictionary with command names as keys and the
+            handler functions as values.
+        :type handlers: dict
+        :raises: :exc:`ServerError` if Unix domain sockets are not
+            supported.
+
+        """
+        if not type(self).is_supported():
+            raise ServerError('Error: Unix domain sockets are not supported')
+        self._socket_file = socket_file
+        self._handlers = handlers
+        self._socket = None
+        self._stop = False
+        return
+
+    def start(self):
+        """Start listening on the socket.
+
+        A socket file left behind by a server which is no longer running
+        is removed.
+
+        :returns: None
+        :raises: :exc:`ServerError` if another server is already running,
+            or on errors in creating the socket.
+
+        """
+        if ServerClient(self._socket_file).is_available():
+            raise ServerError('Error: A server is already running on ' +
+                              self._socket_file)
+        try:
+            if _os.path.exists(self._socket_file):
+                _os.unlink(self._socket_file)
+            self._socket = _socket.socket(_socket.AF_UNIX,
+                                          _socket.SOCK_STREAM)
+            self._socket.bind(self._socket_file)
+            self._socket.listen(5)
+            # Wake up periodically to check if the server was stopped
+            self._socket.settimeout(0.5)
+        except (_socket.error, OSError) as err:
+            self._close()
+            raise ServerError('Error: ' + str(err))
+        return
+
+    def serve(self):
+        """Handle the requests until :meth:`stop()` is invoked.
+
+        :meth:`start()` needs to be invoked before calling this method.
+
+        :returns: None
+
+        """
+        try:
+            while not self._stop:
+                try:
+                    connection = self._socket.accept()[0]
+                except _socket.timeout:
+                    continue
+                connection.settimeout(None)
+                self._handle_connection(connection)
+        finally:
+            self._close()
+        return
+
+    def stop(self):
+        """Stop the server, once the request being handled is complete.
+
+        :returns: None
+
+        """
+        self._stop = True
+        return
+
+    def _close(self):
+        """Close the socket and remove the socket file.
+
+        :returns: None
+
+        """
+        if not self._socket is None:
+            self._socket.close()
+            self._socket = None
+            try:
+                _os.unlink(self._socket_file)
+            except OSError:
+                pass
+        return
+
+
+class ServerClient(object):
+
+    """Sends ``repobuddy`` commands to a :class:`Server`."""
+
+    def _connect(self):
+        """Connect to the server.
+
+        :returns: The connection.
+        :rtype: :class:`socket.socket`
+        :raises: :exc:`ServerError` with ``is_unavailable`` set to ``True``
+            if no server is accepting connections on the socket.
+
+        """
+        if not Server.is_supported() or \
+                not _os.path.exists(self._socket_file):
+            raise ServerError('Error: No server running',
+                              is_unavailable=True)
+        connection = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        try:
+            connection.connect(self._socket_file)
+        except _socket.error as err:
+            connection.close()
+            if err.errno in (_errno.ECONNREFUSED, _errno.ENOENT):
+                raise ServerError('Error: No server running',
+                                  is_unavailable=True)
+            raise ServerError('Error: ' + str(err), is_unavailable=True)
+        return connection
+
+    def __init__(self, socket_file):
+        """Initializer.
+
+        :param socket_file: Absolute path of the socket file of the server.
+        :type socket_file: str
+
+        """
+        self._socket_file = socket_file
+        return
+
+    def is_available(self):
+        """Determine if a server is accepting connections on the socket.
+
+        :returns: ``True`` if a server is available, ``False`` otherwise.
+        :rtype: Boolean
+
+        """
+        try:
+            self._connect().close()
+        except ServerError:
+            return False
+        return True
+
+    def call(self, args):
+        """Execute a command on the server.
+
+        The output of the command is written to the corresponding
+        :class:`repobuddy.utils.Logger` streams as it arrives.
+
+        :param args: The parsed command line arguments, with the name of
+            the command in ``command``.
+        :type args: Namespace containing the arguments.
+        :returns: None
+        :raises: :exc:`ServerError` with ``is_unavailable`` set to ``True``
+            if no server is available, or set to ``False`` if the command
+            failed or the connection was lost.
+
+        """
+        request_args = dict((key, value)
+                            for key, value in vars(args).items()
+                            if key != 'func')
+        connection = self._connect()
+        file_handle = connection.makefile('rwb')
+        streams = {'msg': Logger.msg_stream,
+                   'error': Logger.error_stream,
+                   'debug': Logger.debug_stream}
+        try:
+            _send_message(file_handle,
+                          {'command': args.command, 'args': request_args})
+            while True:
+                message = _receive_message(file_handle)
+                if message is None:
+                    raise ServerError(
+                        'Error: Lost the connection to the server')
+                if 'exit_status' in message:
+                    break
+                stream = streams.get(message.get('stream'))
+                if not stream is None:
+                    stream.write(message.get('data', ''))
+                    stream.flush()
+        except (_socket.error, IOError) as err:
+            raise ServerError('Error: ' + str(err))
+        finally:
+            file_handle.close()
+            connection.close()
+
+        if message['exit_status'] != 0:
+            raise ServerError(message.get('error', 'Error: Command failed'))
+        return
+
+    def get_handler(self, local_handler):
+        """Get a command handler which prefers executing on the server.
+
+        :param local_handler: The handler to fall back to, when no server
+            is available.
+        :type local_handler: Reference to a method
+        :returns: The command handler.
+        :rtype: Reference to a method
+
+        """
+        def _handler(args):
+            """Execute the command on the server if available."""
+            try:
+                self.call(args)
+            except ServerError as err:
+                if not err.is_unavailable:
+                    raise
+                local_handler(args)
+            return
+
+        return _handler
@@ -34,6 +34,9 @@ from repobuddy.version import __version__
 
 
 class ArgParserTestCase(TestCaseBase):
+    _commands = ['init', 'status', 'bundle-create', 'snapshot', 'optimize',
+                 'maintenance', 'stats', 'serve', 'manifest', 'help']
+
     @classmethod
     def setUpClass(cls):
         cls._test_base_dir = TestSuiteManager.get_base_dir()
@@ -61,6 +64,16 @@ class ArgParserTestCase(TestCaseBase):
         self._handlers.clear()
         self._handlers['init'] = None
         self._handlers['status'] = None
+        self._handlers['bundle-create'] = None
+        self._handlers['snapshot'] = None
+        self._handlers['optimize'] = None
+        self._handlers['maintenance'] = None
+        self._handlers['stats'] = None
+        self._handlers['serve'] = None
+        self._handlers['manifest refresh'] = None
+        self._handlers['manifest update'] = None
+        self._handlers['manifest validate'] = None
+        self._handlers['manifest compile'] = None
         return
 
     def _test_help(self, args_str):
@@ -71,17 +84,17 @@ class ArgParserTestCase(TestCaseBase):
         self.assertTrue(err.exception.exit_prog_without_error)
 
         usage_regex = _re.compile(
-            r'^usage: ([a-z]+) ((\[-(h|v)\] ){2})\{(([a-z]+,)*[a-z]+)\} ' +
-            r'\.\.\.\s+' + HelpStrings.PROGRAM_DESCRIPTION + '\s+')
+            r'^usage: ([a-z]+) ((\[-(h|v)\]\s+){2})\{(([a-z-]+,)*[a-z-]+)\}' +
+            r'\s+\.\.\.\s+' + HelpStrings.PROGRAM_DESCRIPTION + '\s+')
         match_obj = usage_regex.search(self._str_stream.getvalue())
         self.assertIsNotNone(match_obj)
         groups = match_obj.groups()
 
         self.assertEqual(groups[0], 'repobuddy')
-        self._assert_count_equal(groups[1].rstrip().split(' '),
+        self._assert_count_equal(groups[1].split(),
                                  ['[-h]', '[-v]'])
         self._assert_count_equal(groups[4].rstrip().split(','),
-                                 ['status', 'init', 'help'])
+                                 type(self)._commands)
         return
 
     def _test_version(self, args_str):
@@ -101,7 +114,14 @@ class ArgParserTestCase(TestCaseBase):
         self.assertTrue(err.exception.exit_prog_without_error)
 
         usage_regex = _re.compile(
-            r'^usage: ([a-z]+) init \[-h\] manifest client_spec\s+')
+            r'^usage: ([a-z]+) init \[-h\] \[--resume\]\s+' +
+            r'\[--bundle-dir BUNDLE_DIR\]\s+' +
+            r'\[--from-client FROM_CLIENT\]\s+\[--no-fsync\]\s+' +
+            r'\[--optimize\]\s+' +
+            r'\[-j JOBS\]\s+\[--retries RETRIES\]\s+' +
+            r'\[--max-connections-per-host MAX_CONNECTIONS_PER_HOST\]\s+' +
+            r'\[--timeout TIMEOUT\]\s+' +
+            r'manifest\s+client_spec\s+')
         match_obj = usage_regex.search(self._str_stream.getvalue())
         self.assertIsNotNone(match_obj)
         groups = match_obj.groups()
@@ -118,7 +138,25 @@ class ArgParserTestCase(TestCaseBase):
         self.assertTrue(err.exception.exit_prog_without_error)
 
         usage_regex = _re.compile(
-            r'^usage: ([a-z]+) status \[-h\]\s+')
+            r'^usage: ([a-z]+) status \[-h\] \[-s\] ' +
+            r'\[--format \{text,json,ndjson\}\]\s+')
+        match_obj = usage_regex.search(self._str_stream.getvalue())
+        self.assertIsNotNone(match_obj)
+        groups = match_obj.groups()
+
+        self.assertEqual(groups[0], 'repobuddy')
+        return
+
+    def _test_command_help(self, args_str, command, args_regex):
+        self._hook_into_logger()
+        arg_parser = ArgParser(self._handlers)
+        with self.assertRaisesRegexp(ArgParserError, None) as err:
+            arg_parser.parse(_shlex.split(args_str))
+        self.assertTrue(err.exception.exit_prog_without_error)
+
+        usage_regex = _re.compile(
+            r'^usage: ([a-z]+) ' + command + r' \[-h\]\s*' + args_regex +
+            r'\s+')
         match_obj = usage_regex.search(self._str_stream.getvalue())
         self.assertIsNotNone(match_obj)
         groups = match_obj.groups()
@@ -155,17 +193,78 @@ class ArgParserTestCase(TestCaseBase):
         self.assertEqual(groups[0], 'repobuddy')
         self._assert_count_equal(
             [cmd_str.strip('\'') for cmd_str in groups[1].split(', ')],
-            ['init', 'status', 'help'])
+            type(self)._commands)
         return
 
     def _init_handler(self, args):
         self._last_handler = args.command
         self._last_handler_args['manifest'] = args.manifest
         self._last_handler_args['client_spec'] = args.client_spec
+        self._last_handler_args['resume'] = args.resume
+        self._last_handler_args['bundle_dir'] = args.bundle_dir
+        self._last_handler_args['from_client'] = args.from_client
+        self._last_handler_args['no_fsync'] = args.no_fsync
+        self._last_handler_args['optimize'] = args.optimize
+        self._last_handler_args['jobs'] = args.jobs
+        self._last_handler_args['retries'] = args.retries
+        self._last_handler_args['max_connections_per_host'] = \
+            args.max_connections_per_host
+        self._last_handler_args['timeout'] = args.timeout
         return
 
     def _status_handler(self, args):
         self._last_handler = args.command
+        self._last_handler_args['short'] = args.short
+        self._last_handler_args['format'] = args.format
+        return
+
+    def _snapshot_handler(self, args):
+        self._last_handler = args.command
+        self._last_handler_args['output'] = args.output
+        self._last_handler_args['jobs'] = args.jobs
+        return
+
+    def _optimize_handler(self, args):
+        self._last_handler = args.command
+        self._last_handler_args['jobs'] = args.jobs
+        self._last_handler_args['no_fsmonitor'] = args.no_fsmonitor
+        return
+
+    def _maintenance_handler(self, args):
+        self._last_handler = args.command
+        self._last_handler_args['jobs'] = args.jobs
+        self._last_handler_args['tasks'] = args.tasks
+        self._last_handler_args['schedule'] = args.schedule
+        return
+
+    def _stats_handler(self, args):
+        self._last_handler = args.command
+        self._last_handler_args['jobs'] = args.jobs
+        self._last_handler_args['sort'] = args.sort
+        self._last_handler_args['format'] = args.format
+        return
+
+    def _serve_handler(self, args):
+        self._last_handler = args.command
+        return
+
+    def _manifest_handler(self, args):
+        self._last_handler = args.command + ' ' + args.manifest_command
+        if args.manifest_command == 'update':
+            self._last_handler_args['manifest'] = args.manifest
+            self._last_handler_args['jobs'] = args.jobs
+            self._last_handler_args['retries'] = args.retries
+        elif args.manifest_command == 'validate':
+            self._last_handler_args['manifest'] = args.manifest
+        elif args.manifest_command == 'compile':
+            self._last_handler_args['manifest'] = args.manifest
+            self._last_handler_args['output'] = args.output
+        return
+
+    def _bundle_create_handler(self, args):
+        self._last_handler = args.command
+        self._last_handler_args['bundle_dir'] = args.bundle_dir
+        self._last_handler_args['jobs'] = args.jobs
         return
 
     def _test_handlers(self,
@@ -217,6 +316,88 @@ class ArgParserTestCase(TestCaseBase):
         self._test_status_help('help status')
         return
 
+    def test_bundle_create_help(self):
+        for args_str in ['bundle-create -h',
+                         'bundle-create --help',
+                         'help bundle-create']:
+            self._test_command_help(args_str,
+                                    'bundle-create',
+                                    r'\[-j JOBS\] bundle_dir')
+        return
+
+    def test_snapshot_help(self):
+        for args_str in ['snapshot -h', 'snapshot --help', 'help snapshot']:
+            self._test_command_help(args_str,
+                                    'snapshot',
+                                    r'\[-j JOBS\] output')
+        return
+
+    def test_optimize_help(self):
+        for args_str in ['optimize -h', 'optimize --help', 'help optimize']:
+            self._test_command_help(args_str,
+                                    'optimize',
+                                    r'\[-j JOBS\] \[--no-fsmonitor\]')
+        return
+
+    def test_maintenance_help(self):
+        for args_str in ['maintenance -h',
+                         'maintenance --help',
+                         'help maintenance']:
+            self._test_command_help(
+                args_str,
+                'maintenance',
+                r'\[-j JOBS\]\s+' +
+                r'\[--task \{loose-objects,incremental-repack,gc,' +
+                r'commit-graph\}\]\s+\[--schedule\]')
+        return
+
+    def test_stats_help(self):
+        for args_str in ['stats -h', 'stats --help', 'help stats']:
+            self._test_command_help(
+                args_str,
+                'stats',
+                r'\[-j JOBS\]\s+' +
+                r'\[--sort \{total-size,object-store-size,work-tree-size,' +
+                r'index-entries,loose-objects,packs,dest\}\]\s+' +
+                r'\[--format \{text,json\}\]')
+        return
+
+    def test_serve_help(self):
+        for args_str in ['serve -h', 'serve --help', 'help serve']:
+            self._test_command_help(args_str, 'serve', '')
+        return
+
+    def test_manifest_help(self):
+        for args_str in ['manifest -h', 'manifest --help', 'help manifest']:
+            self._test_command_help(args_str,
+                                    'manifest',
+                                    r'\{refresh,update,validate,compile\} ' +
+                                    r'\.\.\.')
+        self._test_command_help('manifest refresh -h', 'manifest refresh', '')
+        self._test_command_help('manifest update -h',
+                                'manifest update',
+                                r'\[-j JOBS\] \[--retries RETRIES\]\s+' +
+                                r'\[--max-connections-per-host ' +
+                                r'MAX_CONNECTIONS_PER_HOST\]\s+' +
+                                r'\[--timeout TIMEOUT\]\s+\[manifest\]')
+        self._test_command_help('manifest validate -h',
+                                'manifest validate',
+                                r'\[manifest\]')
+        self._test_command_help('manifest compile -h',
+                                'manifest compile',
+                                r'\[-o OUTPUT\] \[manifest\]')
+        return
+
+    def test_manifest_without_command(self):
+        arg_parser = ArgParser(self._handlers)
+        with self.assertRaisesRegexp(
+                ArgParserError,
+                r'^repobuddy( manifest)?: Error: too few arguments\s+' +
+                r'usage:') as err:
+            arg_parser.parse(['manifest'])
+        self.assertFalse(err.exception.exit_prog_without_error)
+        return
+
     def test_help_unsupported_command(self):
         self._test_help_unsupported_command('help some-unsupported-command')
         self._test_help_unsupported_command('help invalid-command')
@@ -233,11 +414,133 @@ class ArgParserTestCase(TestCaseBase):
                             self._init_handler,
                             'init',
                             {'manifest': 'some-manifest',
-                             'client_spec': 'some-client-spec'})
+                             'client_spec': 'some-client-spec',
+                             'resume': False,
+                             'bundle_dir': None,
+                             'from_client': None,
+                             'no_fsync': False,
+                             'optimize': False,
+                             'jobs': 4,
+                             'retries': 2,
+                             'max_connections_per_host': 4,
+                             'timeout': 0})
+        self._test_handlers('init --resume --bundle-dir some-dir ' +
+                            '--from-client some-client --no-fsync ' +
+                            '--optimize ' +
+                            '-j 8 --retries 0 ' +
+                            '--max-connections-per-host 0 --timeout 600 ' +
+                            'some-manifest some-client-spec',
+                            self._init_handler,
+                            'init',
+                            {'manifest': 'some-manifest',
+                             'client_spec': 'some-client-spec',
+                             'resume': True,
+                             'bundle_dir': 'some-dir',
+                             'from_client': 'some-client',
+                             'no_fsync': True,
+                             'optimize': True,
+                             'jobs': 8,
+                             'retries': 0,
+                             'max_connections_per_host': 0,
+                             'timeout': 600})
         self._test_handlers('status',
                             self._status_handler,
                             'status',
+                            {'short': False,
+                             'format': 'text'})
+        self._test_handlers('status --short --format ndjson',
+                            self._status_handler,
+                            'status',
+                            {'short': True,
+                             'format': 'ndjson'})
+        self._test_handlers('bundle-create some-dir',
+                            self._bundle_create_handler,
+                            'bundle-create',
+                            {'bundle_dir': 'some-dir',
+                             'jobs': 4})
+        self._test_handlers('bundle-create -j 8 some-dir',
+                            self._bundle_create_handler,
+                            'bundle-create',
+                            {'bundle_dir': 'some-dir',
+                             'jobs': 8})
+        self._test_handlers('snapshot --jobs 2 pinned.xml',
+                            self._snapshot_handler,
+                            'snapshot',
+                            {'output': 'pinned.xml',
+                             'jobs': 2})
+        self._test_handlers('optimize',
+                            self._optimize_handler,
+                            'optimize',
+                            {'jobs': 4,
+                             'no_fsmonitor': False})
+        self._test_handlers('optimize -j 2 --no-fsmonitor',
+                            self._optimize_handler,
+                            'optimize',
+                            {'jobs': 2,
+                             'no_fsmonitor': True})
+        self._test_handlers('maintenance',
+                            self._maintenance_handler,
+                            'maintenance',
+                            {'jobs': 4,
+                             'tasks': None,
+                             'schedule': False})
+        self._test_handlers('maintenance -j 2 --task gc ' +
+                            '--task commit-graph --schedule',
+                            self._maintenance_handler,
+                            'maintenance',
+                            {'jobs': 2,
+                             'tasks': ['gc', 'commit-graph'],
+                             'schedule': True})
+        self._test_handlers('stats',
+                            self._stats_handler,
+                            'stats',
+                            {'jobs': 4,
+                             'sort': 'total-size',
+                             'format': 'text'})
+        self._test_handlers('stats -j 8 --sort index-entries --format json',
+                            self._stats_handler,
+                            'stats',
+                            {'jobs': 8,
+                             'sort': 'index-entries',
+                             'format': 'json'})
+        self._test_handlers('serve',
+                            self._serve_handler,
+                            'serve',
+                            {})
+        self._test_handlers('manifest refresh',
+                            self._manifest_handler,
+                            'manifest refresh',
                             {})
+        self._test_handlers('manifest update',
+                            self._manifest_handler,
+                            'manifest update',
+                            {'manifest': None,
+                             'jobs': 4,
+                             'retries': 2})
+        self._test_handlers('manifest update -j 8 --retries 5 new.xml',
+                            self._manifest_handler,
+                            'manifest update',
+                            {'manifest': 'new.xml',
+                             'jobs': 8,
+                             'retries': 5})
+        self._test_handlers('manifest validate',
+                            self._manifest_handler,
+                            'manifest validate',
+                            {'manifest': None})
+        self._test_handlers('manifest validate new.xml',
+                            self._manifest_handler,
+                            'manifest validate',
+                            {'manifest': 'new.xml'})
+        self._test_handlers('manifest compile',
+                            self._manifest_handler,
+                            'manifest compile',
+                            {'manifest': None,
+                             'output': None})
+        self._test_handlers('manifest compile -o out.bin new.xml',
+                            self._manifest_handler,
+                            'manifest compile',
+                            {'manifest': 'new.xml',
+                             'output': 'out.bin'})
         return
 
 
@@ -249,6 +552,14 @@ class ArgParserTestSuite:  # pylint: disable=W0232
             'test_version',
             'test_init_help',
             'test_status_help',
+            'test_bundle_create_help',
+            'test_snapshot_help',
+            'test_optimize_help',
+            'test_maintenance_help',
+            'test_stats_help',
+            'test_serve_help',
+            'test_manifest_help',
+            'test_manifest_without_command',
             'test_help_unsupported_command',
             'test_unsupported_command',
             'test_handlers']
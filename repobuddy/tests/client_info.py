@@ -164,6 +164,7 @@ class ClientInfoTestCase(TestCaseBase):
                          client_info.get_client_spec())
         self.assertEqual('some_valid_manifest',
                          client_info.get_manifest())
+        self.assertIsNone(client_info.get_manifest_source())
         return
 
     def test_read_valid_writeback(self):
@@ -237,6 +238,12 @@ class ClientInfoTestCase(TestCaseBase):
 
         client_info.set_client_spec('some_new_client_spec')
         client_info.write(target_config)
+
+        # manifest_source is optional, but is written when set
+        client_info.set_manifest_source('http://host/some_manifest')
+        client_info.write(target_config)
+        self.assertEqual(ClientInfo(target_config).get_manifest_source(),
+                         'http://host/some_manifest')
         return
 
 
@@ -0,0 +1,144 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os as _os
+import sys as _sys
+
+if _sys.version_info < (2, 7):
+    import unittest2 as _unittest   # pylint: disable=F0401
+else:
+    import unittest as _unittest    # pylint: disable=F0401
+
+
+from repobuddy.client_state import ClientState, ClientStateError
+from repobuddy.manifest_parser import ClientSpec, Repo
+from repobuddy.tests.common import ShellHelper, TestCaseBase, TestSuiteManager
+
+
+class ClientStateTestCase(TestCaseBase):
+    @classmethod
+    def setUpClass(cls):
+        cls._test_base_dir = TestSuiteManager.get_base_dir()
+        cls._state_base_dir = _os.path.join(cls._test_base_dir,
+                                            'test-client-states')
+        ShellHelper.remove_dir(cls._state_base_dir)
+        ShellHelper.make_dir(cls._state_base_dir,
+                             create_parent_dirs=True,
+                             only_if_not_exists=True)
+        return
+
+    @classmethod
+    def tearDownClass(cls):
+        ShellHelper.remove_dir(cls._state_base_dir)
+        return
+
+    def __init__(self, methodName='runTest'):
+        super(ClientStateTestCase, self).__init__(methodName)
+        return
+
+    def _get_state_file(self, file_name):
+        return _os.path.join(type(self)._state_base_dir, file_name)
+
+    def _get_client_spec(self):
+        return ClientSpec(
+            'spec1',
+            [Repo(url='url1', branch='master', dest='repo1'),
+             Repo(url='url2', branch='dev', dest='dir/repo2',
+                  revision='a' * 40, sparse_paths=['docs'])])
+
+    def test_new_state(self):
+        client_state = ClientState(self._get_state_file('new.state'))
+        self.assertFalse(client_state.exists())
+        self.assertIsNone(client_state.get_client_spec([1, 2, 3.5]))
+        self.assertIsNone(client_state.get_repo_state('repo1', [4, 5, 6.5]))
+        return
+
+    def test_write_and_read_back(self):
+        file_name = self._get_state_file('read-back.state')
+        client_state = ClientState(file_name)
+        client_state.set_client_spec(self._get_client_spec(), (1, 2, 3.5))
+        client_state.set_repo_state('repo1', 'b' * 40, 'master', 100.5,
+                                    (4, 5, 6.5))
+        client_state.set_repo_state('dir/repo2', 'c' * 40, None, 100.5,
+                                    None)
+        client_state.write()
+        self.assertTrue(client_state.exists())
+        self.assertFalse(_os.path.exists(file_name + '.tmp'))
+
+        client_state = ClientState(file_name)
+        self.assertEqual(client_state.get_client_spec((1, 2, 3.5)),
+                         self._get_client_spec())
+        self.assertIsNone(client_state.get_client_spec((1, 2, 4.5)))
+        self.assertEqual(client_state.get_repo_state('repo1', (4, 5, 6.5)),
+                         {'head': 'b' * 40,
+                          'current_branch': 'master',
+                          'synced_at': 100.5})
+        # HEAD has moved since, or the repo has no reflog
+        self.assertIsNone(client_state.get_repo_state('repo1', (4, 6, 7.5)))
+        self.assertIsNone(client_state.get_repo_state('repo1', None))
+        self.assertIsNone(client_state.get_repo_state('dir/repo2', None))
+
+        # The client spec is replaced, retaining the repo states
+        client_spec = ClientSpec('spec1', [Repo(url='url1', branch='master',
+                                                dest='repo1')])
+        client_state.set_client_spec(client_spec, (1, 2, 5.5))
+        client_state.write()
+        client_state = ClientState(file_name)
+        self.assertEqual(client_state.get_client_spec((1, 2, 5.5)),
+                         client_spec)
+        self.assertEqual(
+            client_state.get_repo_state('repo1', [4, 5, 6.5])['head'],
+            'b' * 40)
+        with self.assertRaisesRegexp(ClientStateError,
+                                     r'^Error: Unknown repo \'dir/repo2\''):
+            client_state.set_repo_state('dir/repo2', 'c' * 40, None, 1.0,
+                                        None)
+        return
+
+    def test_read_unsupported_version(self):
+        file_name = self._get_state_file('unsupported-version.state')
+        ShellHelper.append_text_to_file('{"version": 1000}',
+                                        file_name,
+                                        type(self)._state_base_dir)
+        with self.assertRaisesRegexp(
+                ClientStateError,
+                r'^Error: Unsupported client state version in '):
+            ClientState(file_name)
+        return
+
+    def test_read_malformed_file(self):
+        file_name = self._get_state_file('malformed.state')
+        ShellHelper.append_text_to_file('{"version": 1, ',
+                                        file_name,
+                                        type(self)._state_base_dir)
+        with self.assertRaisesRegexp(
+                ClientStateError,
+                r'^Error: Parsing client state failed => '):
+            ClientState(file_name)
+        return
+
+
+class ClientStateTestSuite:  # pylint: disable=W0232
+    @classmethod
+    def get_test_suite(cls):
+        tests = [
+            'test_new_state',
+            'test_write_and_read_back',
+            'test_read_unsupported_version',
+            'test_read_malformed_file']
+        return _unittest.TestSuite(map(ClientStateTestCase, tests))
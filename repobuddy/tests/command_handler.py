@@ -16,8 +16,11 @@
 #   limitations under the License.
 #
 
+import json as _json
+import os as _os
 import re as _re
 import shlex as _shlex
+import subprocess as _subprocess
 import sys as _sys
 
 if _sys.version_info < (2, 7):
@@ -26,8 +29,12 @@ else:
     import unittest as _unittest    # pylint: disable=F0401
 
 
+from repobuddy.arg_parser import ArgParser
 from repobuddy.command_handler import CommandHandler, CommandHandlerError
-from repobuddy.tests.common import TestCaseBase, TestCommon, TestSuiteManager
+from repobuddy.git_wrapper import GitWrapper
+from repobuddy.manifest_parser import Repo
+from repobuddy.tests.common import ShellHelper, TestCaseBase, TestCommon, \
+    TestSuiteManager
 from repobuddy.utils import Logger
 
 
@@ -35,17 +42,77 @@ class CommandHandlerTestCase(TestCaseBase):
     @classmethod
     def setUpClass(cls):
         cls._test_base_dir = TestSuiteManager.get_base_dir()
+        cls._clients_dir = _os.path.join(cls._test_base_dir,
+                                         'command-handler')
+        ShellHelper.remove_dir(cls._clients_dir)
+        ShellHelper.make_dir(cls._clients_dir, create_parent_dirs=True)
+
+        # The origin has the branches master and new-branch, and a copy of
+        # it serves as a different URL for the same repo
+        cls._repos_dir = _os.path.join(cls._clients_dir, 'repos')
+        TestCommon.setup_test_repos(cls._repos_dir)
+        cls._origin_repo = _os.path.join(cls._repos_dir, 'repo-origin')
+        cls._other_origin_repo = _os.path.join(cls._repos_dir,
+                                               'repo-origin-copy')
+        ShellHelper.exec_command(
+            _shlex.split('git clone -q --bare %s %s' %
+                         (cls._origin_repo, cls._other_origin_repo)),
+            cls._repos_dir)
+        cls._manifests_dir = _os.path.join(cls._clients_dir, 'manifests')
+        ShellHelper.make_dir(cls._manifests_dir)
         return
 
     @classmethod
     def tearDownClass(cls):
+        ShellHelper.remove_dir(cls._clients_dir)
         return
 
-    def _hook_into_logger(self):
+    def _enter_client_dir(self, client_name):
+        client_dir = _os.path.join(type(self)._clients_dir, client_name)
+        ShellHelper.make_dir(client_dir)
+        self._set_tear_down_cb(self._client_tear_down_cb,
+                               _os.getcwd(),
+                               client_dir)
+        _os.chdir(client_dir)
         self._str_stream = TestCommon.get_string_stream()
         Logger.msg_stream = self._str_stream
         Logger.error_stream = self._str_stream
-        self._set_tear_down_cb(self._reset_logger)
+        return client_dir
+
+    def _write_manifest(self, file_name, repos):
+        # Each repo is a tuple of the url, branch and dest
+        manifest_file = _os.path.join(type(self)._manifests_dir, file_name)
+        with open(manifest_file, 'w') as file_handle:
+            file_handle.write(
+                '<?xml version="1.0" encoding="UTF-8"?>\n' +
+                '<RepoBuddyManifest default_client_spec="Spec">\n' +
+                '    <ClientSpec name="Spec">\n')
+            for (url, branch, dest) in repos:
+                file_handle.write(
+                    '        <Repo>\n' +
+                    '            <Url>%s</Url>\n' % url +
+                    '            <Branch>%s</Branch>\n' % branch +
+                    '            <Destination>%s</Destination>\n' % dest +
+                    '        </Repo>\n')
+            file_handle.write('    </ClientSpec>\n' +
+                              '</RepoBuddyManifest>\n')
+        return manifest_file
+
+    def _run_command(self, args_str):
+        # A new handler for each command, like a new invocation
+        ArgParser(CommandHandler().get_handlers()).parse(
+            _shlex.split(args_str))
+        return
+
+    def _get_remote_url(self, repo_dir):
+        return _subprocess.check_output(
+            _shlex.split('git config --get remote.origin.url'),
+            cwd=repo_dir).decode('utf-8').strip()
+
+    def _client_tear_down_cb(self, original_dir, client_dir):
+        _os.chdir(original_dir)
+        self._reset_logger()
+        ShellHelper.remove_dir(client_dir)
         return
 
     def _reset_logger(self):
@@ -66,10 +133,405 @@ class CommandHandlerTestCase(TestCaseBase):
     def test_verify_handlers(self):
         command_handler = CommandHandler()
         handlers = command_handler.get_handlers()
-        self._assert_count_equal(handlers.keys(), ['init', 'status'])
+        self._assert_count_equal(handlers.keys(),
+                                 ['init', 'status', 'bundle-create',
+                                  'snapshot', 'optimize',
+                                  'maintenance', 'stats', 'serve',
+                                  'manifest refresh', 'manifest update',
+                                  'manifest validate', 'manifest compile'])
         return
 
-    def test_init_client_valid(self):
+    def test_repo_lock_files(self):
+        client_dir = self._enter_client_dir('locks')
+        command_handler = CommandHandler()
+        repos = [Repo(dest=dest) for dest in ['one',
+                                              'sub/two',
+                                              'sub//./two',
+                                              '../outside',
+                                              '/abs/repo',
+                                              'a%2Fb']]
+        # pylint: disable=W0212
+        with command_handler._get_repo_locks(repos, shared=False):
+            self._assert_count_equal(
+                _os.listdir(_os.path.join(client_dir, '.repobuddy', 'locks')),
+                ['one.lock', 'sub%2Ftwo.lock', '..%2Foutside.lock',
+                 '%2Fabs%2Frepo.lock', 'a%252Fb.lock'])
+        self.assertEqual(_os.listdir(client_dir), ['.repobuddy'])
+        self.assertFalse(_os.path.exists(
+            _os.path.join(type(self)._clients_dir, 'outside.lock')))
+        return
+
+    def _init_status_client(self, client_name):
+        client_dir = self._enter_client_dir(client_name)
+        origin = type(self)._origin_repo
+        self._run_command('init %s Spec' % self._write_manifest(
+            client_name + '.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'sub/two')]))
+
+        # Untracked, unstaged and staged changes in one, and two on a
+        # different branch
+        one_dir = _os.path.join(client_dir, 'one')
+        ShellHelper.append_text_to_file('Untracked...\n', 'new file',
+                                        one_dir)
+        ShellHelper.append_text_to_file('Unstaged...\n', 'dummy', one_dir)
+        ShellHelper.append_text_to_file('Staged...\n', 'README', one_dir)
+        ShellHelper.exec_command(_shlex.split('git add README'), one_dir)
+        ShellHelper.exec_command(_shlex.split('git checkout -q new-branch'),
+                                 _os.path.join(client_dir, 'sub', 'two'))
+        self._str_stream.seek(0)
+        self._str_stream.truncate()
+        return client_dir
+
+    def test_status_json(self):
+        client_dir = self._init_status_client('status-json')
+        origin = type(self)._origin_repo
+        self._run_command('status --format json')
+        records = _json.loads(self._str_stream.getvalue())
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self._assert_count_equal(
+                record.keys(),
+                ['dest', 'url', 'branch', 'current_branch', 'dirty',
+                 'elapsed_secs', 'untracked_files', 'unstaged_files',
+                 'staged_files'])
+            self.assertGreaterEqual(record['elapsed_secs'], 0)
+            del record['elapsed_secs']
+        self.assertEqual(records[0],
+                         {'dest': 'one',
+                          'url': origin,
+                          'branch': 'master',
+                          'current_branch': 'master',
+                          'dirty': True,
+                          'untracked_files': ['new file'],
+                          'unstaged_files': ['M\tdummy'],
+                          'staged_files': ['M\tREADME']})
+        self.assertEqual(records[1],
+                         {'dest': 'sub/two',
+                          'url': origin,
+                          'branch': 'master',
+                          'current_branch': 'new-branch',
+                          'dirty': False,
+                          'untracked_files': [],
+                          'unstaged_files': [],
+                          'staged_files': []})
+
+        # A repo failing the status is reported as a record, and the array
+        # is still complete
+        _os.rename(_os.path.join(client_dir, 'sub', 'two', '.git'),
+                   _os.path.join(client_dir, 'sub', 'two', '.git-moved'))
+        self._str_stream.seek(0)
+        self._str_stream.truncate()
+        self._run_command('status --short --format json')
+        records = _json.loads(self._str_stream.getvalue())
+        self.assertEqual([record['dest'] for record in records],
+                         ['one', 'sub/two'])
+        self.assertTrue(records[0]['dirty'])
+        self.assertNotIn('error', records[0])
+        self._assert_count_equal(records[1].keys(),
+                                 ['dest', 'url', 'branch', 'error'])
+        self.assertRegexpMatches(records[1]['error'], r'^Command \'git ')
+
+        # The text format fails on the error
+        with self.assertRaisesRegexp(CommandHandlerError, r'^Error: '):
+            self._run_command('status')
+        return
+
+    def test_status_ndjson(self):
+        self._init_status_client('status-ndjson')
+        self._run_command('status --short --format ndjson')
+        lines = self._str_stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        records = [_json.loads(line) for line in lines]
+        for record in records:
+            self._assert_count_equal(
+                record.keys(),
+                ['dest', 'url', 'branch', 'current_branch', 'dirty',
+                 'elapsed_secs'])
+        self.assertEqual(
+            [(record['dest'], record['current_branch'], record['dirty'])
+             for record in records],
+            [('one', 'master', True), ('sub/two', 'new-branch', False)])
+
+        self._str_stream.seek(0)
+        self._str_stream.truncate()
+        self._run_command('status --format ndjson')
+        records = [_json.loads(line)
+                   for line in self._str_stream.getvalue().splitlines()]
+        self.assertEqual([record['untracked_files'] for record in records],
+                         [['new file'], []])
+        return
+
+    def _read_client_state(self, client_dir):
+        state_file = _os.path.join(client_dir, '.repobuddy', 'client.state')
+        with open(state_file, 'r') as file_handle:
+            return _json.load(file_handle)
+
+    def test_recorded_repo_states(self):
+        client_dir = self._enter_client_dir('repo-states')
+        origin = type(self)._origin_repo
+        self._run_command('init %s Spec' % self._write_manifest(
+            'repo-states.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'new-branch', 'two')]))
+        one_dir = _os.path.join(client_dir, 'one')
+        state = self._read_client_state(client_dir)
+        self.assertEqual(
+            [(repo['dest'], repo['head'], repo['current_branch'])
+             for repo in state['repos']],
+            [('one', GitWrapper(one_dir).get_head_revision(), 'master'),
+             ('two',
+              GitWrapper(_os.path.join(client_dir,
+                                       'two')).get_head_revision(),
+              'new-branch')])
+
+        # The recorded states are used while HEAD has not moved
+        state['repos'][0]['head'] = 'a' * 40
+        state['repos'][0]['current_branch'] = 'recorded-branch'
+        with open(_os.path.join(client_dir, '.repobuddy', 'client.state'),
+                  'w') as file_handle:
+            _json.dump(state, file_handle)
+        snapshot_file = _os.path.join(client_dir, 'snapshot.xml')
+        self._run_command('snapshot ' + snapshot_file)
+        self.assertIn('a' * 40,
+                      ShellHelper.read_file_as_string(snapshot_file))
+        self._str_stream.seek(0)
+        self._str_stream.truncate()
+        self._run_command('status --short')
+        self.assertIn('one: clean, on branch recorded-branch instead of ' +
+                      'master', self._str_stream.getvalue())
+
+        # Moving HEAD makes the recorded state out of date
+        ShellHelper.exec_command(_shlex.split('git checkout -q new-branch'),
+                                 one_dir)
+        self._run_command('snapshot ' + snapshot_file)
+        self.assertNotIn('a' * 40,
+                         ShellHelper.read_file_as_string(snapshot_file))
+        self.assertIn(GitWrapper(one_dir).get_head_revision(),
+                      ShellHelper.read_file_as_string(snapshot_file))
+        self._str_stream.seek(0)
+        self._str_stream.truncate()
+        self._run_command('status --short')
+        self.assertIn('one: clean, on branch new-branch instead of master',
+                      self._str_stream.getvalue())
+
+        # manifest update records the states of the updated repos, and
+        # retains the others
+        self._run_command('manifest update ' + self._write_manifest(
+            'repo-states-v2.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'two'),
+             (origin, 'master', 'three')]))
+        state = self._read_client_state(client_dir)
+        self.assertEqual(
+            [(repo['dest'], repo['current_branch'])
+             for repo in state['repos']],
+            [('one', 'recorded-branch'),
+             ('two', 'master'),
+             ('three', 'master')])
+        return
+
+    def test_init_resume_existing_dir(self):
+        client_dir = self._enter_client_dir('init-existing-dir')
+        origin = type(self)._origin_repo
+        manifest_file = self._write_manifest(
+            'existing-dir.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'myrepo')])
+        ShellHelper.make_dir(_os.path.join(client_dir, 'myrepo'))
+        ShellHelper.append_text_to_file('Notes...\n', 'notes.txt',
+                                        _os.path.join(client_dir, 'myrepo'))
+        error_regex = r'^Error: Destination \'myrepo\' already exists$'
+
+        # The directory which init did not create is never removed
+        with self.assertRaisesRegexp(CommandHandlerError, error_regex):
+            self._run_command('init -j 1 %s Spec' % manifest_file)
+        with self.assertRaisesRegexp(CommandHandlerError, error_regex):
+            self._run_command('init --resume -j 1 %s Spec' % manifest_file)
+        self.assertNotIn('Removing the incomplete clone',
+                         self._str_stream.getvalue())
+        self.assertEqual(
+            ShellHelper.read_file_as_string(
+                _os.path.join(client_dir, 'myrepo', 'notes.txt')),
+            'Notes...\n')
+        return
+
+    def test_init_resume_local_changes(self):
+        client_dir = self._enter_client_dir('init-local-changes')
+        origin = type(self)._origin_repo
+        with self.assertRaisesRegexp(CommandHandlerError, r'^Error: '):
+            self._run_command('init -j 1 --retries 0 %s Spec' %
+                              self._write_manifest(
+                                  'local-changes-v1.xml',
+                                  [(origin, 'master', 'one'),
+                                   (origin + '-missing', 'master', 'two')]))
+
+        # The edits in the repo cloned before the failure are retained
+        one_dir = _os.path.join(client_dir, 'one')
+        ShellHelper.append_text_to_file('Modified...\n', 'dummy', one_dir)
+        self._run_command('init --resume -j 1 %s Spec' % self._write_manifest(
+            'local-changes-v2.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'two')]))
+        self.assertNotIn('Removing the incomplete clone',
+                         self._str_stream.getvalue())
+        self.assertTrue(
+            ShellHelper.read_file_as_string(
+                _os.path.join(one_dir, 'dummy')).endswith('Modified...\n'))
+        self.assertTrue(GitWrapper(_os.path.join(
+            client_dir, 'two')).is_clone_complete('master'))
+        return
+
+    def test_manifest_update(self):
+        client_dir = self._enter_client_dir('update')
+        origin = type(self)._origin_repo
+        self._run_command('init %s Spec' % self._write_manifest(
+            'update-v1.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'two'),
+             (origin, 'master', 'sub/three')]))
+
+        # Change the URL of one, the branch of two, remove sub/three and
+        # add four
+        manifest_file = self._write_manifest(
+            'update-v2.xml',
+            [(type(self)._other_origin_repo, 'master', 'one'),
+             (origin, 'new-branch', 'two'),
+             (origin, 'master', 'four')])
+        self._run_command('manifest update ' + manifest_file)
+        output = self._str_stream.getvalue()
+        for msg in ['Changed the URL: one',
+                    'Switched to the branch new-branch: two',
+                    'Removed: sub/three',
+                    'Added: four']:
+            self.assertIn(msg, output)
+
+        self.assertEqual(
+            self._get_remote_url(_os.path.join(client_dir, 'one')),
+            type(self)._other_origin_repo)
+        self.assertEqual(
+            GitWrapper(_os.path.join(client_dir, 'two')).get_current_branch(),
+            'new-branch')
+        self.assertTrue(GitWrapper(_os.path.join(
+            client_dir, 'four')).is_clone_complete('master'))
+        # The parent directory left empty is removed as well
+        self.assertFalse(_os.path.exists(_os.path.join(client_dir, 'sub')))
+
+        # The client is switched over to the new manifest
+        self._run_command('manifest update ' + manifest_file)
+        self.assertTrue(self._str_stream.getvalue().endswith(
+            'Client is up to date\n'))
+        return
+
+    def test_manifest_update_local_work(self):
+        client_dir = self._enter_client_dir('update-local-work')
+        origin = type(self)._origin_repo
+        self._run_command('init %s Spec' % self._write_manifest(
+            'local-work-v1.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'two')]))
+        one_dir = _os.path.join(client_dir, 'one')
+        two_dir = _os.path.join(client_dir, 'two')
+        error_regex = r'^Error: Local changes or unpushed commits in ' + \
+            r'the repos: %s$'
+
+        # Removing a repo with local changes
+        remove_manifest = self._write_manifest(
+            'local-work-remove.xml', [(origin, 'master', 'one')])
+        ShellHelper.append_text_to_file('Untracked...\n', 'untracked',
+                                        two_dir)
+        with self.assertRaisesRegexp(CommandHandlerError,
+                                     error_regex % 'two'):
+            self._run_command('manifest update ' + remove_manifest)
+        self.assertTrue(_os.path.isdir(two_dir))
+
+        # Removing a repo with unpushed commits
+        ShellHelper.exec_command(_shlex.split('git add untracked'), two_dir)
+        ShellHelper.exec_command(
+            _shlex.split('git commit -q -m "Unpushed commit"'), two_dir)
+        with self.assertRaisesRegexp(CommandHandlerError,
+                                     error_regex % 'two'):
+            self._run_command('manifest update ' + remove_manifest)
+        self.assertTrue(_os.path.isdir(two_dir))
+
+        # Switching the branch of a repo with local changes
+        ShellHelper.append_text_to_file('Modified...\n', 'dummy', one_dir)
+        with self.assertRaisesRegexp(CommandHandlerError,
+                                     error_regex % 'one'):
+            self._run_command('manifest update ' + self._write_manifest(
+                'local-work-branch.xml',
+                [(origin, 'new-branch', 'one'),
+                 (origin, 'master', 'two')]))
+        self.assertEqual(GitWrapper(one_dir).get_current_branch(), 'master')
+        return
+
+    def test_manifest_update_resume(self):
+        client_dir = self._enter_client_dir('update-resume')
+        origin = type(self)._origin_repo
+        self._run_command('init %s Spec' % self._write_manifest(
+            'resume-v1.xml', [(origin, 'master', 'one')]))
+
+        # The clone of three fails after two is cloned
+        with self.assertRaisesRegexp(CommandHandlerError, r'^Error: '):
+            self._run_command('manifest update -j 1 --retries 0 ' +
+                              self._write_manifest(
+                                  'resume-v2.xml',
+                                  [(origin, 'master', 'one'),
+                                   (origin, 'master', 'two'),
+                                   (origin + '-missing', 'master',
+                                    'three')]))
+        self.assertTrue(_os.path.isdir(_os.path.join(client_dir, 'two')))
+
+        # The client is still synced to the old manifest, and a rerun with
+        # the fixed manifest skips the repos already cloned
+        self._run_command('manifest update -j 1 ' + self._write_manifest(
+            'resume-v3.xml',
+            [(origin, 'master', 'one'),
+             (origin, 'master', 'two'),
+             (origin, 'master', 'three')]))
+        for dest in ['one', 'two', 'three']:
+            self.assertTrue(GitWrapper(_os.path.join(
+                client_dir, dest)).is_clone_complete('master'))
+        return
+
+    def test_manifest_update_outside_client(self):
+        client_dir = self._enter_client_dir('update-outside')
+        origin = type(self)._origin_repo
+        manifest_file = self._write_manifest('outside-v1.xml',
+                                             [(origin, 'master', 'one')])
+        self._run_command('init %s Spec' % manifest_file)
+        victim_dir = _os.path.join(type(self)._clients_dir, 'victim')
+        ShellHelper.make_dir(victim_dir)
+        try:
+            # Adding a repo outside the client
+            with self.assertRaisesRegexp(
+                    CommandHandlerError,
+                    r'^Error: Destination \'../victim/repo\' is not ' +
+                    r'within the client$'):
+                self._run_command('manifest update ' + self._write_manifest(
+                    'outside-add.xml',
+                    [(origin, 'master', 'one'),
+                     (origin, 'master', '../victim/repo')]))
+            self.assertEqual(_os.listdir(victim_dir), [])
+
+            # Removing a repo outside the client, or the client itself
+            # The client is synced to a manifest with such a repo
+            for dest in ['../victim', '.']:
+                _os.rename(self._write_manifest(
+                    'outside-removed.xml',
+                    [(origin, 'master', 'one'),
+                     (origin, 'master', dest)]),
+                    _os.path.join(client_dir, '.repobuddy',
+                                  'manifest.xml'))
+                with self.assertRaisesRegexp(
+                        CommandHandlerError,
+                        r'^Error: Destination \'%s\' is not within the ' %
+                        _re.escape(dest) + r'client$'):
+                    self._run_command('manifest update ' + manifest_file)
+            self.assertTrue(_os.path.isdir(victim_dir))
+            self.assertTrue(_os.path.isdir(_os.path.join(client_dir, 'one')))
+        finally:
+            ShellHelper.remove_dir(victim_dir)
         return
 
 
@@ -77,5 +539,15 @@ class CommandHandlerTestSuite:  # pylint: disable=W0232
     @classmethod
     def get_test_suite(cls):
         tests = [
-            'test_verify_handlers']
+            'test_verify_handlers',
+            'test_repo_lock_files',
+            'test_status_json',
+            'test_status_ndjson',
+            'test_recorded_repo_states',
+            'test_init_resume_existing_dir',
+            'test_init_resume_local_changes',
+            'test_manifest_update',
+            'test_manifest_update_local_work',
+            'test_manifest_update_resume',
+            'test_manifest_update_outside_client']
         return _unittest.TestSuite(map(CommandHandlerTestCase, tests))
@@ -0,0 +1,182 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os as _os
+import sys as _sys
+
+if _sys.version_info < (2, 7):
+    import unittest2 as _unittest   # pylint: disable=F0401
+else:
+    import unittest as _unittest    # pylint: disable=F0401
+
+
+from repobuddy.compiled_manifest import CompiledManifest, \
+    CompiledManifestError
+from repobuddy.manifest_parser import ManifestParser
+from repobuddy.tests.common import ShellHelper, TestCaseBase, TestSuiteManager
+from repobuddy.utils import ResourceHelper
+
+
+class CompiledManifestTestCase(TestCaseBase):
+    @classmethod
+    def setUpClass(cls):
+        cls._test_base_dir = TestSuiteManager.get_base_dir()
+        cls._compiled_base_dir = _os.path.join(cls._test_base_dir,
+                                               'compiled-manifests')
+        ShellHelper.remove_dir(cls._compiled_base_dir)
+        ShellHelper.make_dir(cls._compiled_base_dir,
+                             create_parent_dirs=True,
+                             only_if_not_exists=True)
+        return
+
+    @classmethod
+    def tearDownClass(cls):
+        ShellHelper.remove_dir(cls._compiled_base_dir)
+        return
+
+    def _get_file(self, file_name):
+        return _os.path.join(type(self)._compiled_base_dir, file_name)
+
+    def _copy_manifest(self, manifest_file):
+        manifest_stream = ResourceHelper.open_data_file(
+            'repobuddy.tests.manifests',
+            manifest_file)
+        with open(self._get_file(manifest_file), 'wb') as file_handle:
+            file_handle.write(manifest_stream.read())
+        manifest_stream.close()
+        return self._get_file(manifest_file)
+
+    def _parse_manifest(self, manifest_file):
+        manifest_parser = ManifestParser()
+        manifest_parser.parse(open(manifest_file, 'r'))
+        return manifest_parser.get_manifest()
+
+    def __init__(self, methodName='runTest'):
+        super(CompiledManifestTestCase, self).__init__(methodName)
+        return
+
+    def test_compile(self):
+        for manifest_file in ['valid.xml',
+                              'repo-bundle.xml',
+                              'repo-revision.xml',
+                              'repo-sparse-checkout.xml',
+                              'extends.xml']:
+            manifest_file = self._copy_manifest(manifest_file)
+            compiled_file = self._get_file('compiled.bin')
+            CompiledManifest.compile(manifest_file, compiled_file)
+
+            manifest = self._parse_manifest(manifest_file)
+            with CompiledManifest(compiled_file) as compiled_manifest:
+                self.assertEqual(compiled_manifest.get_manifest(), manifest)
+                self.assertEqual(
+                    compiled_manifest.get_default_client_spec(),
+                    manifest.default_client_spec)
+                self.assertEqual(
+                    compiled_manifest.get_client_spec_names(),
+                    [client_spec.name
+                     for client_spec in manifest.client_spec_list])
+        return
+
+    def test_get_client_spec(self):
+        manifest_file = self._copy_manifest('extends.xml')
+        compiled_file = self._get_file('extends.bin')
+        CompiledManifest.compile(manifest_file, compiled_file)
+
+        with CompiledManifest(compiled_file) as compiled_manifest:
+            full = compiled_manifest.get_client_spec('Full')
+            self.assertEqual(full.extends, ['Base', 'Tools'])
+            self.assertEqual(
+                full,
+                self._parse_manifest(manifest_file).client_spec_list[2])
+
+            # The repos shared between the client specs are read once
+            base = compiled_manifest.get_client_spec('Base')
+            self.assertIs(full.repo_list[1], base.repo_list[1])
+
+            with self.assertRaisesRegexp(
+                    CompiledManifestError,
+                    r'^Error: Unable to find the Client Spec: ' +
+                    r'\'Unknown\'$'):
+                compiled_manifest.get_client_spec('Unknown')
+        return
+
+    def test_load_stale(self):
+        manifest_file = self._copy_manifest('include.xml')
+        included_file = self._copy_manifest('include-base.xml')
+        compiled_file = self._get_file('include.bin')
+
+        # A missing compiled manifest is compiled
+        with CompiledManifest.load(manifest_file,
+                                   compiled_file) as compiled_manifest:
+            self.assertEqual(compiled_manifest.get_included_files(),
+                             [included_file])
+            self.assertEqual(compiled_manifest.get_manifest(),
+                             self._parse_manifest(manifest_file))
+        compiled_inode = _os.stat(compiled_file).st_ino
+
+        # An up to date compiled manifest is reused
+        with CompiledManifest.load(manifest_file, compiled_file):
+            pass
+        self.assertEqual(_os.stat(compiled_file).st_ino, compiled_inode)
+
+        # Changes to the manifest or the included files are picked up
+        for file_name in [manifest_file, included_file]:
+            ShellHelper.append_text_to_file('\n', file_name, '')
+            with CompiledManifest.load(manifest_file,
+                                       compiled_file) as compiled_manifest:
+                self.assertEqual(compiled_manifest.get_manifest(),
+                                 self._parse_manifest(manifest_file))
+            self.assertNotEqual(_os.stat(compiled_file).st_ino,
+                                compiled_inode)
+            compiled_inode = _os.stat(compiled_file).st_ino
+        return
+
+    def test_invalid_compiled_file(self):
+        manifest_file = self._copy_manifest('valid.xml')
+        compiled_file = self._get_file('invalid.bin')
+
+        for contents in [b'', b'RBMF', b'<RepoBuddyManifest/>\n']:
+            with open(compiled_file, 'wb') as file_handle:
+                file_handle.write(contents)
+            with self.assertRaisesRegexp(CompiledManifestError, r'^Error: '):
+                CompiledManifest(compiled_file)
+
+            # The invalid compiled manifest is replaced when loading
+            with CompiledManifest.load(manifest_file,
+                                       compiled_file) as compiled_manifest:
+                self.assertEqual(compiled_manifest.get_manifest(),
+                                 self._parse_manifest(manifest_file))
+
+        with self.assertRaisesRegexp(
+                CompiledManifestError,
+                r'^Error: Duplicate Client Spec \'Spec1\' found$'):
+            CompiledManifest.compile(
+                self._copy_manifest('duplicate-clientspec.xml'),
+                compiled_file)
+        return
+
+
+class CompiledManifestTestSuite:  # pylint: disable=W0232
+    @classmethod
+    def get_test_suite(cls):
+        tests = [
+            'test_compile',
+            'test_get_client_spec',
+            'test_load_stale',
+            'test_invalid_compiled_file']
+        return _unittest.TestSuite(map(CompiledManifestTestCase, tests))
@@ -16,19 +16,46 @@
 #   limitations under the License.
 #
 
+import json as _json
 import os as _os
+import re as _re
 import shlex as _shlex
+import socket as _socket
 import stat as _stat
+import subprocess as _subprocess
 import sys as _sys
+import threading as _threading
 
 if _sys.version_info < (2, 7):
     import unittest2 as _unittest   # pylint: disable=F0401
 else:
     import unittest as _unittest    # pylint: disable=F0401
 
+if _sys.version_info >= (3, 0):
+    import http.server as _http_server      # pylint: disable=F0401
+else:
+    import BaseHTTPServer as _http_server   # pylint: disable=F0401
+
 from repobuddy.tests.common import TestCommon, TestCaseBase, \
     TestSuiteManager, ShellHelper
 from repobuddy.git_wrapper import GitWrapper, GitWrapperError
+from repobuddy.utils import Logger, RetryPolicy
+
+
+class _FailingRequestHandler(_http_server.BaseHTTPRequestHandler):
+
+    """Fails every request with a fixed status."""
+
+    status = 503
+    requests = []
+
+    def do_GET(self):   # pylint: disable=C0103
+        type(self).requests.append(self.path)
+        self.send_error(type(self).status)
+        return
+
+    def log_message(self, *args):   # pylint: disable=W0221
+        return
 
 
 class GitWrapperTestCase(TestCaseBase):
@@ -40,7 +67,11 @@ class GitWrapperTestCase(TestCaseBase):
                                   url,
                                   branch,
                                   dest,
-                                  remove_base_dir=False):
+                                  remove_base_dir=False,
+                                  bundle=None,
+                                  revision=None,
+                                  source_repo=None,
+                                  sparse_paths=None):
         clone_dir = _os.path.join(base_dir, dest)
         if not remove_base_dir:
             self._set_tear_down_cb(self._clone_tear_down_cb, clone_dir)
@@ -48,7 +79,8 @@ class GitWrapperTestCase(TestCaseBase):
             self._set_tear_down_cb(self._clone_tear_down_cb, base_dir)
 
         git = GitWrapper(base_dir)
-        git.clone(url, branch, dest)
+        git.clone(url, branch, dest, bundle=bundle, revision=revision,
+                  source_repo=source_repo, sparse_paths=sparse_paths)
         return
 
     def _clone_tear_down_cb(self, clone_dir):
@@ -77,6 +109,81 @@ class GitWrapperTestCase(TestCaseBase):
             ShellHelper.remove_dir(cls._repos_dir)
         return
 
+    def _start_http_server(self, status):
+        _FailingRequestHandler.status = status
+        _FailingRequestHandler.requests = []
+        server = _http_server.HTTPServer(('127.0.0.1', 0),
+                                         _FailingRequestHandler)
+        thread = _threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server, thread
+
+    def _clone_retry_tear_down_cb(self, server, thread, logger_streams):
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
+        Logger.msg_stream, Logger.error_stream = logger_streams
+        return
+
+    def _start_hung_server(self):
+        # Connections are queued without ever being answered
+        listener = _socket.socket(_socket.AF_INET, _socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(8)
+        listener.settimeout(10)
+        return listener
+
+    def _hung_server_tear_down_cb(self, listener, logger_streams,
+                                  clone_dir):
+        listener.close()
+        Logger.msg_stream, Logger.error_stream = logger_streams
+        GitWrapper.reset_cancel()
+        ShellHelper.remove_dir(clone_dir)
+        return
+
+    def _trace_tear_down_cb(self, clone_dir, trace_file, original_env):
+        for name, value in original_env.items():
+            if value is None:
+                _os.environ.pop(name, None)
+            else:
+                _os.environ[name] = value
+        if _os.path.exists(trace_file):
+            ShellHelper.remove_file(trace_file)
+        ShellHelper.remove_dir(clone_dir)
+        return
+
+    def _home_tear_down_cb(self, clone_dir, home_dir, original_home):
+        if original_home is None:
+            _os.environ.pop('HOME', None)
+        else:
+            _os.environ['HOME'] = original_home
+        ShellHelper.remove_dir(home_dir)
+        ShellHelper.remove_dir(clone_dir)
+        return
+
+    def _read_traced_commands(self, trace_file):
+        # Map the git subcommands to their configuration and optional locks
+        argvs = {}
+        optional_locks = {}
+        with open(trace_file, 'r') as file_handle:
+            for line in file_handle:
+                event = _json.loads(line)
+                if event['event'] == 'start':
+                    argvs[event['sid']] = event['argv']
+                elif event['event'] == 'def_param' and \
+                        event['param'] == 'GIT_OPTIONAL_LOCKS':
+                    optional_locks[event['sid']] = event['value']
+        commands = {}
+        for sid, argv in argvs.items():
+            config = [argv[index + 1] for index in range(len(argv) - 1)
+                      if argv[index] == '-c']
+            subcommand = [arg for arg in argv[1:]
+                          if not arg in config and arg != '-c' and
+                          not arg.startswith('--')][0]
+            commands[subcommand] = (config, optional_locks.get(sid))
+        return commands
+
     def __init__(self, methodName='runTest'):
         super(GitWrapperTestCase, self).__init__(methodName)
         return
@@ -111,6 +218,181 @@ class GitWrapperTestCase(TestCaseBase):
                 'test-clone')
         return
 
+    def test_is_transient_error(self):
+        for git_error_msg in [
+                'fatal: unable to access \'https://host/repo.git/\': ' +
+                'Could not resolve host: host',
+                'fatal: unable to access \'https://host/repo.git/\': ' +
+                'The requested URL returned error: 503',
+                'error: RPC failed; curl 18 transfer closed\n' +
+                'fatal: early EOF',
+                'ssh: connect to host host port 22: Connection refused\n' +
+                'fatal: Could not read from remote repository.']:
+            self.assertTrue(GitWrapper.is_transient_error(
+                GitWrapperError('Command failed', True, git_error_msg)))
+
+        for git_error_msg in [
+                'fatal: repository \'https://host/repo.git/\' not found',
+                'fatal: unable to access \'https://host/repo.git/\': ' +
+                'The requested URL returned error: 403',
+                'fatal: Remote branch no-branch not found in upstream origin']:
+            self.assertFalse(GitWrapper.is_transient_error(
+                GitWrapperError('Command failed', True, git_error_msg)))
+        self.assertFalse(GitWrapper.is_transient_error(
+            GitWrapperError('Command failed', False, 'Connection refused')))
+        self.assertFalse(GitWrapper.is_transient_error(
+            ValueError('Connection refused')))
+        return
+
+    def test_clone_retry(self):
+        stream = TestCommon.get_string_stream()
+        server, thread = self._start_http_server(503)
+        self._set_tear_down_cb(self._clone_retry_tear_down_cb,
+                               server,
+                               thread,
+                               (Logger.msg_stream, Logger.error_stream))
+        Logger.msg_stream = stream
+        Logger.error_stream = stream
+
+        base_url = 'http://127.0.0.1:%d' % server.server_address[1]
+        git = GitWrapper(type(self)._repos_dir,
+                         retry_policy=RetryPolicy(retries=2, backoff=0))
+
+        # Server errors are retried
+        with self.assertRaisesRegexp(
+                GitWrapperError,
+                r'^Command \'git clone -b .*\' failed$'):
+            git.clone(base_url + '/repo.git', 'master', 'test-clone-retry')
+        self.assertEqual(len(_FailingRequestHandler.requests), 3)
+        self.assertEqual(
+            len(_re.findall(r'failed, retry [12] of 2', stream.getvalue())),
+            2)
+        self.assertFalse(_os.path.exists(
+            _os.path.join(type(self)._repos_dir, 'test-clone-retry')))
+
+        # Missing repositories are not
+        _FailingRequestHandler.status = 404
+        _FailingRequestHandler.requests = []
+        with self.assertRaisesRegexp(GitWrapperError, r'^Command '):
+            git.clone(base_url + '/repo.git', 'master', 'test-clone-retry')
+        self.assertEqual(len(_FailingRequestHandler.requests), 1)
+        return
+
+    def test_clone_timeout(self):
+        stream = TestCommon.get_string_stream()
+        listener = self._start_hung_server()
+        self._set_tear_down_cb(
+            self._hung_server_tear_down_cb,
+            listener,
+            (Logger.msg_stream, Logger.error_stream),
+            _os.path.join(type(self)._repos_dir, 'test-clone-timeout'))
+        Logger.msg_stream = stream
+        Logger.error_stream = stream
+
+        git = GitWrapper(type(self)._repos_dir,
+                         retry_policy=RetryPolicy(retries=1, backoff=0),
+                         timeout=1)
+        with self.assertRaisesRegexp(
+                GitWrapperError,
+                r'^Command \'git clone -b .*\' timed out after 1 ' +
+                r'seconds$') as err:
+            git.clone('http://127.0.0.1:%d/repo.git' %
+                      listener.getsockname()[1],
+                      'master',
+                      'test-clone-timeout')
+        self.assertTrue(err.exception.timed_out)
+        self.assertTrue(GitWrapper.is_transient_error(err.exception))
+        # Timed out clones are retried, after removing the partial clone
+        self.assertEqual(
+            len(_re.findall(r'failed, retry 1 of 1', stream.getvalue())),
+            1)
+        self.assertFalse(_os.path.exists(
+            _os.path.join(type(self)._repos_dir, 'test-clone-timeout')))
+        return
+
+    def test_cancel_all(self):
+        listener = self._start_hung_server()
+        self._set_tear_down_cb(
+            self._hung_server_tear_down_cb,
+            listener,
+            (Logger.msg_stream, Logger.error_stream),
+            _os.path.join(type(self)._repos_dir, 'test-clone-cancel'))
+        Logger.msg_stream = TestCommon.get_string_stream()
+        Logger.error_stream = Logger.msg_stream
+
+        errors = []
+
+        def _clone():
+            try:
+                GitWrapper(type(self)._repos_dir).clone(
+                    'http://127.0.0.1:%d/repo.git' %
+                    listener.getsockname()[1],
+                    'master',
+                    'test-clone-cancel')
+            except GitWrapperError as err:
+                errors.append(err)
+            return
+
+        thread = _threading.Thread(target=_clone)
+        thread.daemon = True
+        thread.start()
+        # Wait for the clone to connect, then cancel it
+        connection = listener.accept()[0]
+        GitWrapper.cancel_all()
+        thread.join(10)
+        connection.close()
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(len(errors), 1)
+        self.assertRegexpMatches(str(errors[0]),
+                                 r'^Command \'git clone -b .*\' cancelled$')
+        self.assertFalse(errors[0].is_git_error)
+
+        # The commands started later are cancelled too, until reset
+        git = GitWrapper(type(self)._repos_dir)
+        with self.assertRaisesRegexp(GitWrapperError, r' cancelled$'):
+            git.clone(type(self)._origin_repo, 'master', 'test-clone-cancel')
+        GitWrapper.reset_cancel()
+        git.clone(type(self)._origin_repo, 'master', 'test-clone-cancel')
+        self.assertEqual(git.get_current_branch(), 'master')
+        return
+
+    def test_query_profile(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        trace_file = _os.path.join(type(self)._repos_dir, 'trace.json')
+        self._set_tear_down_cb(
+            self._trace_tear_down_cb,
+            base_dir,
+            trace_file,
+            dict((name, _os.environ.get(name))
+                 for name in ['GIT_TRACE2_EVENT', 'GIT_TRACE2_ENV_VARS']))
+        _os.environ['GIT_TRACE2_EVENT'] = trace_file
+        _os.environ['GIT_TRACE2_ENV_VARS'] = 'GIT_OPTIONAL_LOCKS'
+
+        git = GitWrapper(base_dir)
+        git.get_unstaged_files()
+        git.has_untracked_files()
+        git.has_uncommitted_staged_changes()
+        git.switch_branch('new-branch')
+
+        commands = self._read_traced_commands(trace_file)
+        for query in ['diff-files', 'ls-files', 'diff-index', 'config']:
+            config, optional_locks = commands[query]
+            self.assertIn('gc.auto=0', config)
+            self.assertEqual(optional_locks, '0')
+
+        # The commands modifying the repo take the optional locks
+        for command in ['fetch', 'checkout']:
+            config, optional_locks = commands[command]
+            self.assertIn('gc.autoDetach=false', config)
+            self.assertNotIn('gc.auto=0', config)
+            self.assertIsNone(optional_locks)
+        return
+
     def test_clone_no_write_permissions(self):
         base_dir = _os.path.join(
             type(self)._repos_dir,
@@ -159,6 +441,26 @@ class GitWrapperTestCase(TestCaseBase):
             git.update_index()
         return
 
+    def test_update_index_locked(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        # Make the index stale, so that the refresh needs to update it
+        _os.utime(_os.path.join(base_dir, 'README'), None)
+        ShellHelper.append_text_to_file('', '.git/index.lock', base_dir)
+
+        git = GitWrapper(base_dir)
+        git.update_index(optional=True)
+        with self.assertRaisesRegexp(
+                GitWrapperError,
+                r'^Command \'git update-index -q --ignore-submodules ' +
+                r'--refresh\' failed$'):
+            git.update_index()
+        return
+
     def test_untracked_no_files(self):
         self._raw_git_clone(
             type(self)._repos_dir,
@@ -169,6 +471,7 @@ class GitWrapperTestCase(TestCaseBase):
 
         git = GitWrapper(base_dir)
         self._assert_count_equal(git.get_untracked_files(), [])
+        self.assertFalse(git.has_untracked_files())
         return
 
     def test_untracked_with_files(self):
@@ -191,6 +494,7 @@ class GitWrapperTestCase(TestCaseBase):
         self._assert_count_equal(
             git.get_untracked_files(),
             ['untracked-test', 'untracked-test2'])
+        self.assertTrue(git.has_untracked_files())
         return
 
     def test_unstaged_no_files(self):
@@ -203,6 +507,17 @@ class GitWrapperTestCase(TestCaseBase):
 
         git = GitWrapper(base_dir)
         self._assert_count_equal(git.get_unstaged_files(), [])
+        self.assertFalse(git.has_unstaged_changes())
+
+        # A file with only its stat information changed, without writing
+        # the index
+        _os.utime(_os.path.join(base_dir, 'dummy'), (0, 0))
+        index_file = _os.path.join(base_dir, '.git', 'index')
+        with open(index_file, 'rb') as index:
+            index_data = index.read()
+        self.assertFalse(git.has_unstaged_changes())
+        with open(index_file, 'rb') as index:
+            self.assertEqual(index.read(), index_data)
         return
 
     def test_unstaged_with_files(self):
@@ -221,6 +536,8 @@ class GitWrapperTestCase(TestCaseBase):
         git = GitWrapper(base_dir)
         self._assert_count_equal(git.get_unstaged_files(),
                                  ['M\tREADME', 'D\tdummy'])
+        self.assertTrue(git.has_unstaged_changes())
+        self.assertFalse(git.has_uncommitted_staged_changes())
 
         return
 
@@ -234,6 +551,7 @@ class GitWrapperTestCase(TestCaseBase):
 
         git = GitWrapper(base_dir)
         self._assert_count_equal(git.get_uncommitted_staged_files(), [])
+        self.assertFalse(git.has_uncommitted_staged_changes())
         return
 
     def test_uncommitted_with_changes(self):
@@ -254,6 +572,161 @@ class GitWrapperTestCase(TestCaseBase):
         git = GitWrapper(base_dir)
         self._assert_count_equal(git.get_uncommitted_staged_files(),
                                  ['M\tREADME', 'D\tdummy'])
+        self.assertTrue(git.has_uncommitted_staged_changes())
+        self.assertFalse(git.has_unstaged_changes())
+        return
+
+    def test_get_status(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        git = GitWrapper(base_dir)
+        self.assertEqual(git.get_status(), ([], [], []))
+
+        ShellHelper.append_text_to_file('Modified...\n', 'dummy', base_dir)
+        ShellHelper.append_text_to_file('Untracked...\n', 'new file',
+                                        base_dir)
+        ShellHelper.make_dir(_os.path.join(base_dir, 'new-dir'))
+        ShellHelper.append_text_to_file('Untracked...\n',
+                                        _os.path.join('new-dir', 'file'),
+                                        base_dir)
+        ShellHelper.append_text_to_file('Staged...\n', 'staged', base_dir)
+        ShellHelper.exec_command(_shlex.split('git add staged'), base_dir)
+        ShellHelper.exec_command(_shlex.split('git rm -q README'), base_dir)
+
+        self.assertEqual(git.get_status(),
+                         (['new file', 'new-dir/file'],
+                          ['M\tdummy'],
+                          ['D\tREADME', 'A\tstaged']))
+        self.assertEqual(git.get_status(),
+                         (git.get_untracked_files(),
+                          git.get_unstaged_files(),
+                          git.get_uncommitted_staged_files()))
+        return
+
+    def test_optimize(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        git = GitWrapper(base_dir)
+        ShellHelper.append_text_to_file('Untracked...\n', 'untracked',
+                                        base_dir)
+        git.optimize()
+
+        config = ShellHelper.read_file_as_string(
+            _os.path.join(base_dir, '.git', 'config'))
+        self.assertIn('untrackedCache = true', config)
+        self.assertIn('manyFiles = true', config)
+        self.assertNotIn('fsmonitor', config)
+        self.assertTrue(_os.path.isfile(
+            _os.path.join(base_dir, '.git', 'objects', 'info',
+                          'commit-graph')))
+        # The index is written with the untracked cache
+        with open(_os.path.join(base_dir, '.git', 'index'), 'rb') as index:
+            self.assertIn(b'UNTR', index.read())
+
+        self.assertEqual(git.get_status(), (['untracked'], [], []))
+        self.assertIn(git.is_fsmonitor_supported(), [True, False])
+
+        # The refreshed index is only written back by refresh_status_cache
+        index_file = _os.path.join(base_dir, '.git', 'index')
+        _os.utime(_os.path.join(base_dir, 'dummy'), (0, 0))
+        with open(index_file, 'rb') as index:
+            index_data = index.read()
+        self.assertEqual(git.get_status(), (['untracked'], [], []))
+        with open(index_file, 'rb') as index:
+            self.assertEqual(index.read(), index_data)
+        git.refresh_status_cache()
+        with open(index_file, 'rb') as index:
+            self.assertNotEqual(index.read(), index_data)
+        return
+
+    def test_run_maintenance(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        home_dir = _os.path.join(type(self)._repos_dir, 'test-home')
+        self._set_tear_down_cb(self._home_tear_down_cb,
+                               base_dir,
+                               home_dir,
+                               _os.environ.get('HOME'))
+        ShellHelper.make_dir(home_dir)
+        _os.environ['HOME'] = home_dir
+
+        # Loose objects from a new commit
+        ShellHelper.append_text_to_file('Modified...\n', 'dummy', base_dir)
+        ShellHelper.exec_command(
+            _shlex.split('git commit -q -a -m "Modify dummy"'), base_dir)
+        git = GitWrapper(base_dir)
+        counts = git.get_object_counts()
+        self.assertGreater(counts['count'], 0)
+        size = git.get_object_store_size()
+        self.assertEqual(size, (counts['size'] + counts['size-pack'] +
+                                counts['size-garbage']) * 1024)
+
+        git.run_maintenance(['loose-objects', 'gc'])
+        counts = git.get_object_counts()
+        self.assertEqual(counts['count'], 0)
+        self.assertEqual(counts['packs'], 1)
+        self.assertLessEqual(git.get_object_store_size(), size)
+
+        git.run_maintenance(GitWrapper.MAINTENANCE_TASKS)
+        self.assertTrue(_os.path.isfile(
+            _os.path.join(base_dir, '.git', 'objects', 'info',
+                          'commit-graph')))
+
+        # Registering the repo updates the global config
+        git.register_maintenance()
+        self.assertIn(
+            'repo = ' + _os.path.realpath(base_dir),
+            ShellHelper.read_file_as_string(
+                _os.path.join(home_dir, '.gitconfig')))
+        return
+
+    def test_repo_stats(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        git = GitWrapper(base_dir)
+        ls_files = _subprocess.check_output(_shlex.split('git ls-files -z'),
+                                            cwd=base_dir)
+        file_names = [name for name in ls_files.decode('utf-8').split('\0')
+                      if name != '']
+        work_tree_size = sum(
+            [_os.path.getsize(_os.path.join(base_dir, name))
+             for name in file_names])
+        self.assertEqual(git.get_index_entry_count(), len(file_names))
+        self.assertEqual(git.get_work_tree_size(), work_tree_size)
+
+        # Nested repos are not included in the work-tree
+        ShellHelper.exec_command(
+            _shlex.split('git clone %s nested' % type(self)._origin_repo),
+            base_dir)
+        ShellHelper.append_text_to_file('Untracked...\n', 'untracked',
+                                        base_dir)
+        self.assertEqual(git.get_work_tree_size(),
+                         work_tree_size + len('Untracked...\n'))
+
+        ShellHelper.remove_file(_os.path.join(base_dir, '.git', 'index'))
+        self.assertEqual(git.get_index_entry_count(), 0)
+        ShellHelper.append_text_to_file('Invalid...\n',
+                                        _os.path.join('.git', 'index'),
+                                        base_dir)
+        with self.assertRaisesRegexp(GitWrapperError,
+                                     r'^Invalid index file: '):
+            git.get_index_entry_count()
         return
 
     def test_current_branch_valid_repo(self):
@@ -346,6 +819,229 @@ class GitWrapperTestCase(TestCaseBase):
         self.assertIsNone(git.get_current_tag())
         return
 
+    def test_clone_complete(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+
+        git = GitWrapper(base_dir)
+        self.assertTrue(git.is_clone_complete('master'))
+        self.assertFalse(git.is_clone_complete('new-branch'))
+
+        # Local changes do not make the clone incomplete
+        ShellHelper.remove_file(_os.path.join(base_dir, 'README'))
+        self.assertTrue(git.is_clone_complete('master'))
+
+        # An interrupted checkout never writes the index
+        ShellHelper.remove_file(_os.path.join(base_dir, '.git', 'index'))
+        self.assertFalse(git.is_clone_complete('master'))
+
+        ShellHelper.remove_dir(_os.path.join(base_dir, '.git'))
+        self.assertFalse(git.is_clone_complete('master'))
+        return
+
+    def test_clone_from_bundle(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'new-branch',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        bundle_file = _os.path.join(type(self)._repos_dir, 'test.bundle')
+
+        # Leave out the latest commit from the bundle
+        ShellHelper.exec_command(_shlex.split('git reset --hard HEAD^'),
+                                 base_dir)
+        git = GitWrapper(base_dir)
+        git.create_bundle(bundle_file)
+        self.assertTrue(_os.path.isfile(bundle_file))
+        self.assertFalse(_os.path.isfile(bundle_file + '.tmp'))
+        ShellHelper.remove_dir(base_dir)
+
+        self._git_wrapper_clone_helper(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'new-branch',
+            'test-clone',
+            bundle=bundle_file)
+        ShellHelper.remove_file(bundle_file)
+
+        git = GitWrapper(base_dir)
+        self.assertTrue(git.is_clone_complete('new-branch'))
+        self.assertEqual(
+            ShellHelper.read_file_as_string(
+                _os.path.join(base_dir, 'dummy')).split('\n')[-2],
+            'Just keep it coming...')
+        return
+
+    def test_clone_invalid_bundle(self):
+        with self.assertRaisesRegexp(
+                GitWrapperError,
+                r'^Command \'git clone --no-checkout .*\' failed$'):
+            self._git_wrapper_clone_helper(
+                type(self)._repos_dir,
+                type(self)._origin_repo,
+                'master',
+                'test-clone',
+                bundle=_os.path.join(type(self)._repos_dir, 'invalid.bundle'))
+        return
+
+    def test_head_revision(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+
+        git = GitWrapper(base_dir)
+        self.assertRegexpMatches(git.get_head_revision(), r'^[0-9a-f]{40}$')
+
+        ShellHelper.remove_dir(_os.path.join(base_dir, '.git'))
+        with self.assertRaisesRegexp(
+                GitWrapperError,
+                r'^Command \'git rev-parse --verify HEAD\^\{commit\}\' ' +
+                r'failed$'):
+            git.get_head_revision()
+        return
+
+    def test_clone_pinned_revision(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'new-branch',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        ShellHelper.exec_command(_shlex.split('git checkout -q HEAD^'),
+                                 base_dir)
+        revision = GitWrapper(base_dir).get_head_revision()
+        ShellHelper.remove_dir(base_dir)
+
+        # Allow fetching unadvertised commits from the test origin
+        ShellHelper.exec_command(
+            _shlex.split('git config uploadpack.allowAnySHA1InWant true'),
+            type(self)._origin_repo)
+        self._git_wrapper_clone_helper(
+            type(self)._repos_dir,
+            'file://' + type(self)._origin_repo,
+            'new-branch',
+            'test-clone',
+            revision=revision)
+
+        git = GitWrapper(base_dir)
+        self.assertEqual(git.get_head_revision(), revision)
+        self.assertEqual(git.get_current_branch(), 'new-branch')
+        self.assertTrue(_os.path.isfile(_os.path.join(base_dir,
+                                                      '.git', 'shallow')))
+        return
+
+    def _has_hardlinked_objects(self, repo_dir):
+        objects_dir = _os.path.join(repo_dir, '.git', 'objects')
+        for dir_path, _, file_names in _os.walk(objects_dir):
+            for file_name in file_names:
+                file_path = _os.path.join(dir_path, file_name)
+                if _os.stat(file_path).st_nlink > 1:
+                    return True
+        return False
+
+    def test_clone_from_source_repo(self):
+        source_dir = _os.path.join(type(self)._repos_dir, 'test-source')
+        ShellHelper.exec_command(
+            _shlex.split('git clone -b master %s %s' % (
+                type(self)._origin_repo, source_dir)),
+            type(self)._repos_dir)
+        ShellHelper.exec_command(_shlex.split('git reset --hard HEAD^'),
+                                 source_dir)
+
+        self._git_wrapper_clone_helper(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'new-branch',
+            'test-clone',
+            source_repo=source_dir)
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        ShellHelper.remove_dir(source_dir)
+
+        git = GitWrapper(base_dir)
+        self.assertTrue(git.is_clone_complete('new-branch'))
+        self.assertTrue(self._has_hardlinked_objects(base_dir))
+        self.assertEqual(
+            ShellHelper.read_file_as_string(
+                _os.path.join(base_dir, 'dummy')).split('\n')[-2],
+            'Just keep it coming...')
+        return
+
+    def test_clone_sparse_checkout(self):
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        ShellHelper.exec_command(
+            _shlex.split('git clone -b master %s %s' % (
+                type(self)._origin_repo, base_dir)),
+            type(self)._repos_dir)
+        ShellHelper.make_dir(_os.path.join(base_dir, 'docs'))
+        ShellHelper.make_dir(_os.path.join(base_dir, 'src'))
+        ShellHelper.append_text_to_file('Docs...\n', 'docs/index', base_dir)
+        ShellHelper.append_text_to_file('Code...\n', 'src/main', base_dir)
+        ShellHelper.exec_command(_shlex.split('git add docs src'), base_dir)
+        ShellHelper.exec_command(
+            _shlex.split('git commit -m "Add docs and src"'), base_dir)
+        ShellHelper.exec_command(
+            _shlex.split('git push origin master:sparse-branch'), base_dir)
+        ShellHelper.remove_dir(base_dir)
+
+        self._git_wrapper_clone_helper(
+            type(self)._repos_dir,
+            'file://' + type(self)._origin_repo,
+            'sparse-branch',
+            'test-clone',
+            sparse_paths=['docs'])
+
+        git = GitWrapper(base_dir)
+        self.assertTrue(git.is_clone_complete('sparse-branch'))
+        self.assertTrue(_os.path.isfile(_os.path.join(base_dir, 'README')))
+        self.assertTrue(_os.path.isfile(_os.path.join(base_dir,
+                                                      'docs', 'index')))
+        self.assertFalse(_os.path.exists(_os.path.join(base_dir, 'src')))
+        self._assert_count_equal(git.get_untracked_files(), [])
+        return
+
+    def test_update_remote_and_branch(self):
+        self._raw_git_clone(
+            type(self)._repos_dir,
+            type(self)._origin_repo,
+            'master',
+            'test-clone')
+        base_dir = _os.path.join(type(self)._repos_dir, 'test-clone')
+        git = GitWrapper(base_dir)
+
+        git.set_remote_url('file://' + type(self)._origin_repo)
+        self.assertIn(
+            'url = file://' + type(self)._origin_repo + '\n',
+            ShellHelper.read_file_as_string(
+                _os.path.join(base_dir, '.git', 'config')))
+        with self.assertRaisesRegexp(GitWrapperError,
+                                     r'^Command \'git fetch -q origin\' ' +
+                                     r'failed$'):
+            git.set_remote_url(_os.path.join(type(self)._repos_dir,
+                                             'nonexistent-origin'))
+        git.set_remote_url(type(self)._origin_repo)
+
+        git.switch_branch('new-branch')
+        self.assertEqual(git.get_current_branch(), 'new-branch')
+        with self.assertRaisesRegexp(GitWrapperError,
+                                     r'^Command \'git checkout -q ' +
+                                     r'no-branch\' failed$'):
+            git.switch_branch('no-branch')
+
+        self.assertFalse(git.has_unpushed_commits())
+        ShellHelper.append_text_to_file('Not pushed...\n', 'dummy', base_dir)
+        ShellHelper.exec_command(
+            _shlex.split('git commit -a -m "Local commit."'), base_dir)
+        self.assertTrue(git.has_unpushed_commits())
+        return
+
 
 class GitWrapperTestSuite:  # pylint: disable=W0232
     @classmethod
@@ -354,19 +1050,37 @@ class GitWrapperTestSuite:  # pylint: disable=W0232
             'test_clone_valid_repo',
             'test_clone_invalid_url',
             'test_clone_invalid_branch',
+            'test_is_transient_error',
+            'test_clone_retry',
+            'test_clone_timeout',
+            'test_cancel_all',
+            'test_query_profile',
             'test_clone_no_write_permissions',
             'test_update_index_valid_repo',
             'test_update_index_invalid_repo',
+            'test_update_index_locked',
             'test_untracked_no_files',
             'test_untracked_with_files',
             'test_unstaged_no_files',
             'test_unstaged_with_files',
             'test_uncommitted_no_changes',
             'test_uncommitted_with_changes',
+            'test_get_status',
+            'test_optimize',
+            'test_run_maintenance',
+            'test_repo_stats',
             'test_current_branch_valid_repo',
             'test_current_branch_invalid_repo',
             'test_current_branch_detached_head',
             'test_current_tag_lightweight_tag',
             'test_current_tag_annotated_tag',
-            'test_current_tag_no_tag']
+            'test_current_tag_no_tag',
+            'test_clone_complete',
+            'test_clone_from_bundle',
+            'test_clone_invalid_bundle',
+            'test_head_revision',
+            'test_clone_pinned_revision',
+            'test_clone_from_source_repo',
+            'test_clone_sparse_checkout',
+            'test_update_remote_and_branch']
         return _unittest.TestSuite(map(GitWrapperTestCase, tests))
@@ -0,0 +1,108 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import os as _os
+import sys as _sys
+
+if _sys.version_info < (2, 7):
+    import unittest2 as _unittest   # pylint: disable=F0401
+else:
+    import unittest as _unittest    # pylint: disable=F0401
+
+
+from repobuddy.journal import InitJournal, InitJournalError
+from repobuddy.tests.common import ShellHelper, TestCaseBase, TestSuiteManager
+
+
+class InitJournalTestCase(TestCaseBase):
+    @classmethod
+    def setUpClass(cls):
+        cls._test_base_dir = TestSuiteManager.get_base_dir()
+        cls._journal_base_dir = _os.path.join(cls._test_base_dir,
+                                              'test-journals')
+        ShellHelper.remove_dir(cls._journal_base_dir)
+        ShellHelper.make_dir(cls._journal_base_dir,
+                             create_parent_dirs=True,
+                             only_if_not_exists=True)
+        return
+
+    @classmethod
+    def tearDownClass(cls):
+        ShellHelper.remove_dir(cls._journal_base_dir)
+        return
+
+    def __init__(self, methodName='runTest'):
+        super(InitJournalTestCase, self).__init__(methodName)
+        return
+
+    def _get_journal_file(self, file_name):
+        return _os.path.join(type(self)._journal_base_dir, file_name)
+
+    def test_new_journal(self):
+        journal = InitJournal(self._get_journal_file('new.journal'))
+        self.assertFalse(journal.exists())
+        self.assertEqual(journal.get_repo_state('repo1'),
+                         InitJournal.STATE_PENDING)
+        with self.assertRaisesRegexp(InitJournalError,
+                                     r'^Error: No option \'client_spec\''):
+            journal.get_client_spec()
+        return
+
+    def test_write_and_read_back(self):
+        file_name = self._get_journal_file('read-back.journal')
+        journal = InitJournal(file_name)
+        journal.set_client_spec('spec1')
+        journal.set_manifest('manifest.xml')
+        journal.set_repo_state('repo1', InitJournal.STATE_CLONED)
+        journal.set_repo_state('dir/repo2', InitJournal.STATE_CLONING)
+        self.assertTrue(journal.exists())
+
+        journal = InitJournal(file_name)
+        self.assertEqual(journal.get_client_spec(), 'spec1')
+        self.assertEqual(journal.get_manifest(), 'manifest.xml')
+        self.assertEqual(journal.get_repo_state('repo1'),
+                         InitJournal.STATE_CLONED)
+        self.assertEqual(journal.get_repo_state('dir/repo2'),
+                         InitJournal.STATE_CLONING)
+        self.assertEqual(journal.get_repo_state('repo3'),
+                         InitJournal.STATE_PENDING)
+
+        journal.remove()
+        self.assertFalse(journal.exists())
+        journal.remove()
+        return
+
+    def test_read_malformed_journal(self):
+        file_name = self._get_journal_file('malformed.journal')
+        ShellHelper.append_text_to_file('[RepoBuddyInitJournal]\n',
+                                        file_name,
+                                        type(self)._journal_base_dir)
+        with self.assertRaisesRegexp(InitJournalError,
+                                     r'^Error: No option \'client_spec\''):
+            InitJournal(file_name)
+        return
+
+
+class InitJournalTestSuite:  # pylint: disable=W0232
+    @classmethod
+    def get_test_suite(cls):
+        tests = [
+            'test_new_journal',
+            'test_write_and_read_back',
+            'test_read_malformed_journal']
+        return _unittest.TestSuite(map(InitJournalTestCase, tests))
@@ -40,7 +40,12 @@ def run_tests():
             'git_wrapper.GitWrapperTestSuite',
             'manifest_parser.ManifestParserTestSuite',
             'client_info.ClientInfoTestSuite',
+            'client_state.ClientStateTestSuite',
+            'manifest_fetcher.ManifestFetcherTestSuite',
+            'compiled_manifest.CompiledManifestTestSuite',
+            'journal.InitJournalTestSuite',
             'utils.UtilsTestSuite',
+            'server.ServerTestSuite',
             'arg_parser.ArgParserTestSuite',
             'command_handler.CommandHandlerTestSuite']
 
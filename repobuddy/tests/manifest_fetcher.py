@@ -0,0 +1,220 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import json as _json
+import os as _os
+import subprocess as _subprocess
+import sys as _sys
+import threading as _threading
+
+if _sys.version_info < (2, 7):
+    import unittest2 as _unittest   # pylint: disable=F0401
+else:
+    import unittest as _unittest    # pylint: disable=F0401
+
+if _sys.version_info >= (3, 0):
+    import http.server as _http_server      # pylint: disable=F0401
+else:
+    import BaseHTTPServer as _http_server   # pylint: disable=F0401
+
+
+from repobuddy.git_wrapper import GitWrapper
+from repobuddy.manifest_fetcher import ManifestFetcher, ManifestFetcherError
+from repobuddy.tests.common import ShellHelper, TestCaseBase, TestCommon, \
+    TestSuiteManager
+
+
+class _ManifestRequestHandler(_http_server.BaseHTTPRequestHandler):
+
+    """Serves a single manifest, honoring ``If-None-Match``."""
+
+    manifest = b''
+    etag = None
+    statuses = []
+
+    def do_GET(self):   # pylint: disable=C0103
+        cls = type(self)
+        if self.path != '/manifest.xml':
+            cls.statuses.append(404)
+            self.send_error(404)
+            return
+        if self.headers.get('If-None-Match') == cls.etag:
+            cls.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        cls.statuses.append(200)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(cls.manifest)))
+        self.send_header('ETag', cls.etag)
+        self.end_headers()
+        self.wfile.write(cls.manifest)
+        return
+
+    def log_message(self, *args):   # pylint: disable=W0221
+        return
+
+
+class ManifestFetcherTestCase(TestCaseBase):
+    @classmethod
+    def setUpClass(cls):
+        cls._test_base_dir = TestSuiteManager.get_base_dir()
+        cls._fetcher_base_dir = _os.path.join(cls._test_base_dir,
+                                              'manifest-fetcher')
+        ShellHelper.remove_dir(cls._fetcher_base_dir)
+        ShellHelper.make_dir(cls._fetcher_base_dir,
+                             create_parent_dirs=True,
+                             only_if_not_exists=True)
+        return
+
+    @classmethod
+    def tearDownClass(cls):
+        ShellHelper.remove_dir(cls._fetcher_base_dir)
+        return
+
+    def _start_http_server(self):
+        _ManifestRequestHandler.manifest = b'<RepoBuddyManifest/>\n'
+        _ManifestRequestHandler.etag = '"v1"'
+        _ManifestRequestHandler.statuses = []
+        server = _http_server.HTTPServer(('127.0.0.1', 0),
+                                         _ManifestRequestHandler)
+        thread = _threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        def _stop_server():
+            server.shutdown()
+            server.server_close()
+            thread.join(5)
+            return
+
+        self._set_tear_down_cb(_stop_server)
+        return 'http://127.0.0.1:%d' % server.server_address[1]
+
+    def _get_cache_dir(self, name):
+        return _os.path.join(type(self)._fetcher_base_dir, name)
+
+    def __init__(self, methodName='runTest'):
+        super(ManifestFetcherTestCase, self).__init__(methodName)
+        return
+
+    def test_is_remote(self):
+        for manifest in ['http://host/manifest.xml',
+                         'https://host/manifest.xml',
+                         'git://host/repo.git#master:manifest.xml',
+                         'git+ssh://host/repo.git#master:manifest.xml',
+                         'git+file:///repo.git#master:manifest.xml']:
+            self.assertTrue(ManifestFetcher.is_remote(manifest))
+        for manifest in ['manifest.xml',
+                         '/path/to/manifest.xml',
+                         'http-manifest.xml']:
+            self.assertFalse(ManifestFetcher.is_remote(manifest))
+        return
+
+    def test_fetch_http(self):
+        base_url = self._start_http_server()
+        fetcher = ManifestFetcher(self._get_cache_dir('http'))
+
+        cache_file = fetcher.fetch(base_url + '/manifest.xml')
+        self.assertEqual(ShellHelper.read_file_as_string(cache_file),
+                         '<RepoBuddyManifest/>\n')
+        self.assertEqual(_ManifestRequestHandler.statuses, [200])
+
+        # Revalidating an unchanged manifest leaves the cache untouched
+        cache_inode = _os.stat(cache_file).st_ino
+        self.assertEqual(fetcher.fetch(base_url + '/manifest.xml'),
+                         cache_file)
+        self.assertEqual(_ManifestRequestHandler.statuses, [200, 304])
+        self.assertEqual(_os.stat(cache_file).st_ino, cache_inode)
+
+        # A modified manifest is downloaded again
+        _ManifestRequestHandler.manifest = \
+            b'<RepoBuddyManifest></RepoBuddyManifest>\n'
+        _ManifestRequestHandler.etag = '"v2"'
+        self.assertEqual(fetcher.fetch(base_url + '/manifest.xml'),
+                         cache_file)
+        self.assertEqual(_ManifestRequestHandler.statuses, [200, 304, 200])
+        self.assertEqual(ShellHelper.read_file_as_string(cache_file),
+                         '<RepoBuddyManifest></RepoBuddyManifest>\n')
+
+        with self.assertRaisesRegexp(
+                ManifestFetcherError,
+                r'^Error: Unable to fetch the manifest ' + base_url +
+                r'/missing.xml => '):
+            fetcher.fetch(base_url + '/missing.xml')
+        return
+
+    def test_fetch_git(self):
+        repos_dir = self._get_cache_dir('repos')
+        TestCommon.setup_test_repos(repos_dir)
+        origin_repo = _os.path.join(repos_dir, 'repo-origin')
+        manifest = 'git+file://' + origin_repo + '#master:dummy'
+        fetcher = ManifestFetcher(self._get_cache_dir('git'))
+
+        cache_file = fetcher.fetch(manifest)
+        expected = _subprocess.check_output(
+            ['git', 'show', 'master:dummy'],
+            cwd=origin_repo).decode('utf-8')
+        self.assertEqual(ShellHelper.read_file_as_string(cache_file),
+                         expected)
+
+        # The cached manifest is reused while the branch has not moved
+        cache_inode = _os.stat(cache_file).st_ino
+        self.assertEqual(fetcher.fetch(manifest), cache_file)
+        self.assertEqual(_os.stat(cache_file).st_ino, cache_inode)
+
+        # The branch moving after it was looked up, the cached manifest
+        # records the revision actually fetched
+        revision = _subprocess.check_output(
+            ['git', 'rev-parse', 'master'],
+            cwd=origin_repo).decode('utf-8').strip()
+        fetcher = ManifestFetcher(self._get_cache_dir('git-moved'))
+        get_remote_revision = GitWrapper.get_remote_revision
+        GitWrapper.get_remote_revision = \
+            lambda _self, _url, _branch: 'f' * 40
+        try:
+            cache_file = fetcher.fetch(manifest)
+        finally:
+            GitWrapper.get_remote_revision = get_remote_revision
+        with open(_os.path.splitext(cache_file)[0] + '.json', 'r') as \
+                file_handle:
+            self.assertEqual(_json.load(file_handle)['revision'], revision)
+        cache_inode = _os.stat(cache_file).st_ino
+        self.assertEqual(fetcher.fetch(manifest), cache_file)
+        self.assertEqual(_os.stat(cache_file).st_ino, cache_inode)
+
+        with self.assertRaisesRegexp(
+                ManifestFetcherError,
+                r'^Error: Branch \'no-branch\' not found in '):
+            fetcher.fetch('git+file://' + origin_repo + '#no-branch:dummy')
+        with self.assertRaisesRegexp(
+                ManifestFetcherError,
+                r'needs to be specified as <url>#<branch>:<path>$'):
+            fetcher.fetch('git+file://' + origin_repo + '#master')
+        return
+
+
+class ManifestFetcherTestSuite:  # pylint: disable=W0232
+    @classmethod
+    def get_test_suite(cls):
+        tests = [
+            'test_is_remote',
+            'test_fetch_http',
+            'test_fetch_git']
+        return _unittest.TestSuite(map(ManifestFetcherTestCase, tests))
@@ -23,9 +23,9 @@ if _sys.version_info < (2, 7):
 else:
     import unittest as _unittest    # pylint: disable=F0401
 
-from repobuddy.tests.common import TestCaseBase
+from repobuddy.tests.common import TestCaseBase, TestCommon
 from repobuddy.manifest_parser import ClientSpec, Manifest, Repo, \
-    ManifestParser, ManifestParserError
+    ManifestParser, ManifestParserError, ManifestWriter
 from repobuddy.utils import ResourceHelper
 
 
@@ -256,6 +256,103 @@ class ManifestParserTestCase(TestCaseBase):
             self._parse_manifest('repo-empty-dest.xml')
         return
 
+    def test_repo_bundle(self):
+        manifest = self._parse_manifest('repo-bundle.xml')
+        expected_manifest = Manifest(
+            'Spec1',
+            [
+                ClientSpec(
+                    'Spec1',
+                    [
+                        Repo('https://github.com/git/git.git',
+                             'master',
+                             'repos/git',
+                             bundle='bundles/git.bundle'),
+                        Repo('https://github.com/github/linguist.git',
+                             'master',
+                             'repos/linguist')])])
+
+        self.assertEqual(manifest, expected_manifest)
+        self.assertEqual(
+            str(manifest.client_spec_list[0].repo_list[0]),
+            '<Repo url:https://github.com/git/git.git branch:master ' +
+            'dest:repos/git bundle:bundles/git.bundle>')
+        return
+
+    def test_repo_empty_bundle(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec1\' has an empty Repo '
+                r'\'Bundle\'$'):
+            self._parse_manifest('repo-empty-bundle.xml')
+        return
+
+    def test_repo_revision(self):
+        manifest = self._parse_manifest('repo-revision.xml')
+        self.assertEqual(
+            manifest.client_spec_list[0].repo_list[0],
+            Repo('https://github.com/git/git.git',
+                 'master',
+                 'repos/git',
+                 revision='0123456789abcdef0123456789abcdef01234567'))
+        self.assertIsNone(manifest.client_spec_list[0].repo_list[1].revision)
+        return
+
+    def test_repo_empty_revision(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec1\' has an empty Repo '
+                r'\'Revision\'$'):
+            self._parse_manifest('repo-empty-revision.xml')
+        return
+
+    def test_repo_sparse_checkout(self):
+        manifest = self._parse_manifest('repo-sparse-checkout.xml')
+        repo = manifest.client_spec_list[0].repo_list[0]
+        self.assertEqual(
+            repo,
+            Repo('https://github.com/git/git.git',
+                 'master',
+                 'repos/git',
+                 sparse_paths=['Documentation', 't/perf']))
+        self.assertEqual(
+            str(repo),
+            '<Repo url:https://github.com/git/git.git branch:master ' +
+            'dest:repos/git sparse_paths:[\'Documentation\', \'t/perf\']>')
+        self.assertIsNone(
+            manifest.client_spec_list[0].repo_list[1].sparse_paths)
+        return
+
+    def test_repo_empty_sparse_checkout(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec1\' has an empty Repo '
+                r'\'SparseCheckout\'$'):
+            self._parse_manifest('repo-empty-sparse-checkout.xml')
+        return
+
+    def test_repo_path_outside_sparse_checkout(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Path is not allowed outside a SparseCheckout$'):
+            self._parse_manifest('repo-path-outside-sparse-checkout.xml')
+        return
+
+    def test_write_manifest(self):
+        for manifest_file in ['valid.xml',
+                              'repo-bundle.xml',
+                              'repo-revision.xml',
+                              'repo-sparse-checkout.xml']:
+            manifest = self._parse_manifest(manifest_file)
+            stream = TestCommon.get_string_stream()
+            ManifestWriter().write(manifest, stream)
+            stream.seek(0)
+
+            manifest_parser = ManifestParser()
+            manifest_parser.parse(stream)
+            self.assertEqual(manifest_parser.get_manifest(), manifest)
+        return
+
     def test_no_default_client_spec(self):
         with self.assertRaisesRegexp(
                 ManifestParserError,
@@ -285,6 +382,184 @@ class ManifestParserTestCase(TestCaseBase):
             self._parse_manifest('duplicate-clientspec.xml')
         return
 
+    def test_extends(self):
+        manifest = self._parse_manifest('extends.xml')
+
+        base_repos = [
+            Repo('https://github.com/git/git.git',
+                 'master',
+                 'repos/git'),
+            Repo('https://github.com/github/linguist.git',
+                 'master',
+                 'repos/linguist')]
+        tools_repos = [
+            Repo('https://github.com/github/gitignore.git',
+                 'master',
+                 'tools/gitignore')]
+        expected_manifest = Manifest(
+            'Full',
+            [
+                ClientSpec('Base', base_repos),
+                ClientSpec('Tools', tools_repos),
+                ClientSpec(
+                    'Full',
+                    [
+                        Repo('https://github.com/git/git.git',
+                             'maint',
+                             'repos/git'),
+                        base_repos[1],
+                        tools_repos[0],
+                        Repo('https://github.com/github/hub.git',
+                             'master',
+                             'repos/hub')],
+                    ['Base', 'Tools']),
+                ClientSpec('Mini', base_repos, ['Base'])])
+        self.assertEqual(manifest, expected_manifest)
+
+        # The inherited repos are shared with the parent client specs
+        (base, tools, full, mini) = manifest.client_spec_list
+        self.assertIs(full.repo_list[1], base.repo_list[1])
+        self.assertIs(full.repo_list[2], tools.repo_list[0])
+        self.assertIsNot(full.repo_list[0], base.repo_list[0])
+        for index in range(len(base.repo_list)):
+            self.assertIs(mini.repo_list[index], base.repo_list[index])
+
+        stream = TestCommon.get_string_stream()
+        ManifestWriter().write(manifest, stream)
+        self.assertEqual(stream.getvalue().count('<Repo>'), 5)
+        stream.seek(0)
+        manifest_parser = ManifestParser()
+        manifest_parser.parse(stream)
+        self.assertEqual(manifest_parser.get_manifest(), manifest)
+        return
+
+    def test_extends_errors(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec1\' extends itself through: ' +
+                r'Spec1 -> Spec2 -> Spec3 -> Spec1$'):
+            self._parse_manifest('extends-cycle.xml')
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec1\' extends an unknown ' +
+                r'Client Spec \'Spec2\'$'):
+            self._parse_manifest('extends-unknown.xml')
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec1\' has an empty \'extends\'$'):
+            self._parse_manifest('extends-empty.xml')
+        return
+
+    def test_include(self):
+        manifest = self._parse_manifest('include.xml')
+
+        base_repos = [
+            Repo('https://github.com/git/git.git',
+                 'master',
+                 'repos/git')]
+        expected_manifest = Manifest(
+            'Full',
+            [
+                ClientSpec('Base', base_repos),
+                ClientSpec(
+                    'Full',
+                    [
+                        base_repos[0],
+                        Repo('https://github.com/github/hub.git',
+                             'master',
+                             'repos/hub')],
+                    ['Base'])])
+        self.assertEqual(manifest, expected_manifest)
+
+        # The written manifest has the included client specs inlined
+        stream = TestCommon.get_string_stream()
+        ManifestWriter().write(manifest, stream)
+        self.assertNotIn('<Include', stream.getvalue())
+        stream.seek(0)
+        manifest_parser = ManifestParser()
+        manifest_parser.parse(stream)
+        self.assertEqual(manifest_parser.get_manifest(), manifest)
+        return
+
+    def test_include_errors(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Cyclic Include of \'.*include-cycle.xml\'$'):
+            self._parse_manifest('include-cycle.xml')
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Include is not allowed within a ClientSpec$'):
+            self._parse_manifest('include-in-clientspec.xml')
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Unable to open the included file: '):
+            manifest_parser = ManifestParser()
+            manifest_parser.parse(
+                ResourceHelper.open_data_file('repobuddy.tests.manifests',
+                                              'include.xml'),
+                '/nonexistent')
+        return
+
+    def test_multiple_errors(self):
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Found 6 errors in the manifest:\n') as err:
+            self._parse_manifest('multiple-errors.xml')
+        self.assertEqual(
+            err.exception.get_errors(),
+            ['Error: Duplicate Client Spec \'Spec1\' found',
+             'Error: Client Spec \'Spec1\' has a Repo with no \'Url\' info',
+             'Error: Client Spec \'Spec1\' has multiple Repos with the ' +
+             'Destination \'repos/linguist/\'',
+             'Error: Client Spec \'Spec2\' extends an unknown Client Spec ' +
+             '\'Spec3\'',
+             'Error: Client Spec \'Spec2\' has the Repo Destination ' +
+             '\'repos/linguist\' nested within the Repo Destination ' +
+             '\'repos\'',
+             'Error: Client Spec \'Spec1\' has an empty Repo \'Branch\''])
+        self.assertEqual(str(err.exception),
+                         '\n'.join(['Error: Found 6 errors in the manifest:'] +
+                                   err.exception.get_errors()))
+
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Client Spec \'Spec2\' has the Repo Destination ' +
+                r'\'repos/git/linguist\' nested within the Repo Destination ' +
+                r'\'repos/git\'$'):
+            self._parse_manifest('extends-nested-dest.xml')
+        return
+
+    def test_large_manifest(self):
+        repo_list = [Repo('https://github.com/git/git.git',
+                          'master',
+                          'repos/%d/%d' % (index // 100, index))
+                     for index in range(10000)]
+        manifest = Manifest('Spec1', [ClientSpec('Spec1', repo_list)])
+        stream = TestCommon.get_string_stream()
+        ManifestWriter().write(manifest, stream)
+        stream.seek(0)
+        manifest_parser = ManifestParser()
+        manifest_parser.parse(stream)
+        self.assertEqual(manifest_parser.get_manifest(), manifest)
+
+        # Errors at the end of a large manifest are reported together
+        repo_list.append(Repo('https://github.com/git/git.git',
+                              'master',
+                              'repos/99/9999'))
+        repo_list.append(Repo('https://github.com/git/git.git',
+                              'master',
+                              'repos/99/9999/nested'))
+        manifest = Manifest('Spec1', [ClientSpec('Spec1', repo_list)])
+        stream = TestCommon.get_string_stream()
+        ManifestWriter().write(manifest, stream)
+        stream.seek(0)
+        with self.assertRaisesRegexp(
+                ManifestParserError,
+                r'^Error: Found 2 errors in the manifest:\n') as err:
+            manifest_parser.parse(stream)
+        self.assertEqual(len(err.exception.get_errors()), 2)
+        return
+
 
 class ManifestParserTestSuite:  # pylint: disable=W0232
     @classmethod
@@ -306,8 +581,22 @@ class ManifestParserTestSuite:  # pylint: disable=W0232
             'test_repo_empty_branch',
             'test_repo_no_dest',
             'test_repo_empty_dest',
+            'test_repo_bundle',
+            'test_repo_empty_bundle',
+            'test_repo_revision',
+            'test_repo_empty_revision',
+            'test_repo_sparse_checkout',
+            'test_repo_empty_sparse_checkout',
+            'test_repo_path_outside_sparse_checkout',
+            'test_write_manifest',
             'test_empty_default_client_spec',
             'test_no_default_client_spec',
             'test_nonexistent_default_client_spec',
-            'test_duplicate_client_spec']
+            'test_duplicate_client_spec',
+            'test_extends',
+            'test_extends_errors',
+            'test_include',
+            'test_include_errors',
+            'test_multiple_errors',
+            'test_large_manifest']
         return _unittest.TestSuite(map(ManifestParserTestCase, tests))
@@ -0,0 +1,223 @@
+#
+#   Copyright (C) 2013 Ash (Tuxdude) <tuxdude.github@gmail.com>
+#
+#   This file is part of repobuddy.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+import argparse as _argparse
+import json as _json
+import os as _os
+import socket as _socket
+import sys as _sys
+import threading as _threading
+
+if _sys.version_info < (2, 7):
+    import unittest2 as _unittest   # pylint: disable=F0401
+else:
+    import unittest as _unittest    # pylint: disable=F0401
+
+
+from repobuddy.server import Server, ServerClient, ServerError
+from repobuddy.tests.common import ShellHelper, TestCaseBase, TestCommon, \
+    TestSuiteManager
+from repobuddy.utils import Logger, RepoBuddyBaseException
+
+
+class ServerTestCase(TestCaseBase):
+    @classmethod
+    def setUpClass(cls):
+        cls._test_base_dir = TestSuiteManager.get_base_dir()
+        cls._server_base_dir = _os.path.join(cls._test_base_dir, 'server')
+        ShellHelper.remove_dir(cls._server_base_dir)
+        ShellHelper.make_dir(cls._server_base_dir,
+                             create_parent_dirs=True,
+                             only_if_not_exists=True)
+        return
+
+    @classmethod
+    def tearDownClass(cls):
+        ShellHelper.remove_dir(cls._server_base_dir)
+        return
+
+    def _status_handler(self, args):
+        self._handled_args.append(args)
+        Logger.msg('status of repo1')
+        Logger.error('warning from repo2')
+        if args.short:
+            raise RepoBuddyBaseException('Error: status failed')
+        return
+
+    def _local_status_handler(self, args):
+        self._handled_args.append(('local', args))
+        return
+
+    def _start_server(self, socket_file):
+        server = Server(socket_file, {'status': self._status_handler})
+        server.start()
+        thread = _threading.Thread(target=server.serve)
+        thread.daemon = True
+        thread.start()
+
+        def _stop_server():
+            self._restore_logger()
+            server.stop()
+            thread.join(5)
+            return
+
+        self._set_tear_down_cb(_stop_server)
+        return (server, thread)
+
+    def _hook_into_logger(self):
+        self._str_stream = TestCommon.get_string_stream()
+        Logger.msg_stream = self._str_stream
+        Logger.error_stream = self._str_stream
+        return
+
+    def _restore_logger(self):
+        Logger.msg_stream = self._original_logger_state['msg_stream']
+        Logger.error_stream = self._original_logger_state['error_stream']
+        return
+
+    def __init__(self, methodName='runTest'):
+        super(ServerTestCase, self).__init__(methodName)
+        self._original_logger_state = {'msg_stream': Logger.msg_stream,
+                                       'error_stream': Logger.error_stream}
+        self._str_stream = None
+        self._handled_args = []
+        return
+
+    def test_call(self):
+        socket_file = _os.path.join(type(self)._server_base_dir, 'call.sock')
+        (server, thread) = self._start_server(socket_file)
+        self._hook_into_logger()
+
+        client = ServerClient(socket_file)
+        self.assertTrue(client.is_available())
+        client.call(_argparse.Namespace(command='status',
+                                        short=False,
+                                        func=None))
+        self.assertEqual(self._str_stream.getvalue(),
+                         'status of repo1\nwarning from repo2\n')
+        self.assertEqual(len(self._handled_args), 1)
+        self.assertEqual(vars(self._handled_args[0]),
+                         {'command': 'status', 'short': False})
+
+        with self.assertRaisesRegexp(ServerError,
+                                     r'^Error: status failed$') as err:
+            client.call(_argparse.Namespace(command='status', short=True))
+        self.assertFalse(err.exception.is_unavailable)
+
+        with self.assertRaisesRegexp(
+                ServerError,
+                r'^Error: Command \'init\' is not served$'):
+            client.call(_argparse.Namespace(command='init'))
+
+        server.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertFalse(_os.path.exists(socket_file))
+        self.assertFalse(client.is_available())
+        return
+
+    def _send_raw_request(self, socket_file, request):
+        connection = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        connection.connect(socket_file)
+        file_handle = connection.makefile('rwb')
+        file_handle.write((_json.dumps(request) + '\n').encode('utf-8'))
+        file_handle.flush()
+        messages = []
+        for line in file_handle:
+            messages.append(_json.loads(line.decode('utf-8')))
+        file_handle.close()
+        connection.close()
+        return messages
+
+    def test_malformed_request(self):
+        socket_file = _os.path.join(type(self)._server_base_dir,
+                                    'malformed.sock')
+        (_, thread) = self._start_server(socket_file)
+
+        for (request, error_regex) in [
+                ({'command': 'status', 'args': {}},
+                 r'^Error: Unable to handle the request => AttributeError: '),
+                ({'command': 'status', 'args': ['short']},
+                 r'^Error: Unable to handle the request => TypeError: '),
+                (['status'],
+                 r'^Error: Unable to handle the request => AttributeError: ')]:
+            messages = self._send_raw_request(socket_file, request)
+            self.assertEqual(messages[-1]['exit_status'], 1)
+            self.assertRegexpMatches(messages[-1]['error'], error_regex)
+            self.assertTrue(thread.is_alive())
+
+        # The server still serves the valid requests
+        self._hook_into_logger()
+        ServerClient(socket_file).call(
+            _argparse.Namespace(command='status', short=False))
+        self.assertEqual(self._str_stream.getvalue(),
+                         'status of repo1\nwarning from repo2\n')
+        self.assertEqual(vars(self._handled_args[-1]),
+                         {'command': 'status', 'short': False})
+        return
+
+    def test_handler_fallback(self):
+        socket_file = _os.path.join(type(self)._server_base_dir,
+                                    'fallback.sock')
+        args = _argparse.Namespace(command='status', short=False)
+        handler = ServerClient(socket_file).get_handler(
+            self._local_status_handler)
+
+        # No server running
+        handler(args)
+        self.assertEqual(self._handled_args, [('local', args)])
+
+        # Socket file left behind by a server which is no longer running
+        stale_socket = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+        stale_socket.bind(socket_file)
+        stale_socket.close()
+        self.assertTrue(_os.path.exists(socket_file))
+        handler(args)
+        self.assertEqual(len(self._handled_args), 2)
+        self.assertEqual(self._handled_args[1][0], 'local')
+
+        # The stale socket file is replaced by the new server
+        self._start_server(socket_file)
+        self._hook_into_logger()
+        handler(args)
+        self.assertEqual(len(self._handled_args), 3)
+        self.assertEqual(vars(self._handled_args[2]),
+                         {'command': 'status', 'short': False})
+        return
+
+    def test_server_already_running(self):
+        socket_file = _os.path.join(type(self)._server_base_dir,
+                                    'running.sock')
+        self._start_server(socket_file)
+        with self.assertRaisesRegexp(
+                ServerError,
+                r'^Error: A server is already running on '):
+            Server(socket_file, {}).start()
+        self.assertTrue(ServerClient(socket_file).is_available())
+        return
+
+
+class ServerTestSuite:  # pylint: disable=W0232
+    @classmethod
+    def get_test_suite(cls):
+        tests = [
+            'test_call',
+            'test_malformed_request',
+            'test_handler_fallback',
+            'test_server_already_running']
+        return _unittest.TestSuite(map(ServerTestCase, tests))
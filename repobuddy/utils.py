@@ -26,9 +26,19 @@
 import errno as _errno
 import os as _os
 import pkg_resources as _pkg_resources
+import random as _random
+import re as _re
+import shutil as _shutil
 import sys as _sys
+import threading as _threading
 import time as _time
 
+try:
+    import fcntl as _fcntl
+except ImportError:     # pragma: no cover
+    # fcntl is unavailable on Windows
+    _fcntl = None
+
 
 class RepoBuddyBaseException(Exception):
 
@@ -172,6 +182,399 @@ class FileLock(object):
         return
 
 
+class FlockFileLock(FileLock):
+
+    """A reader-writer lock using kernel-backed ``flock`` locks.
+
+    Provides the same interface as :class:`FileLock`, but waiting for the
+    lock blocks in the kernel instead of polling for the lock file. Since
+    the lock is held on the open file, it is released by the kernel when
+    the process holding it dies, so a stale lock file never blocks other
+    instances.
+
+    The lock can be acquired either in exclusive mode, or in shared mode
+    where any number of instances can hold the lock at the same time, as
+    long as no instance holds it in exclusive mode.
+
+    The lock file exists only while the lock is held. The last holder
+    removes it on release, and waiters which acquire the lock on a lock
+    file which has meanwhile been removed retry on the newly created lock
+    file.
+
+    """
+
+    @classmethod
+    def is_supported(cls):
+        """Determine if ``flock`` is supported on this platform.
+
+        :returns: ``True`` if supported, ``False`` otherwise.
+        :rtype: Boolean
+
+        """
+        return not _fcntl is None
+
+    def __init__(self, file_name, timeout=None, delay=.1, shared=False):
+        """Initializer.
+
+        :param file_name: Name of the lock file to be created. Filename can be
+            either an absolute or a relative file path.
+        :type file_name: str
+        :param timeout: Maxium time in seconds until :meth:`acquire()` blocks
+            in trying to acquire the lock. If ``None``, :meth:`acquire()`
+            blocks until the lock is available.
+            If ``timeout`` seconds have elapsed without
+            successfully acquiring the lock, :exc:`FileLockError` is raised.
+        :type timeout: float
+        :param delay: Time interval in seconds between 2 successive lock
+            attempts, used only when ``timeout`` is not ``None``.
+        :type delay: float
+        :param shared: If ``True``, the lock is acquired in shared mode,
+            otherwise in exclusive mode.
+        :type shared: Boolean
+
+        """
+        super(FlockFileLock, self).__init__(file_name, timeout, delay)
+        if shared:
+            self._operation = _fcntl.LOCK_SH
+        else:
+            self._operation = _fcntl.LOCK_EX
+        return
+
+    def _lock_fd(self, begin):
+        """Lock ``self._fd`` within the designated ``timeout``.
+
+        :param begin: Time at which :meth:`acquire()` was invoked.
+        :type begin: float
+        :returns: None
+        :raises: :exc:`FileLockError` if the designated ``timeout`` has
+            elapsed.
+
+        """
+        if self._timeout is None:
+            _fcntl.flock(self._fd, self._operation)
+            return
+
+        while True:
+            try:
+                _fcntl.flock(self._fd, self._operation | _fcntl.LOCK_NB)
+                return
+            except (IOError, OSError) as err:
+                if err.errno not in (_errno.EAGAIN, _errno.EACCES):
+                    raise
+            if (_time.time() - begin) >= self._timeout:
+                raise FileLockError('Timeout', is_time_out=True)
+            _time.sleep(self._delay)
+        return
+
+    def _try_exclusive(self):
+        """Try converting the held lock into an exclusive lock.
+
+        :returns: ``True`` if the lock is now held in exclusive mode,
+            ``False`` if other instances are holding the lock as well.
+        :rtype: Boolean
+
+        """
+        try:
+            _fcntl.flock(self._fd, _fcntl.LOCK_EX | _fcntl.LOCK_NB)
+        except (IOError, OSError) as err:
+            if err.errno not in (_errno.EAGAIN, _errno.EACCES):
+                raise
+            return False
+        return True
+
+    def _is_lock_file_current(self):
+        """Determine if ``self._fd`` still refers to the lock file.
+
+        :returns: ``True`` if the lock file on disk is the one which is
+            open, ``False`` if it was removed or replaced meanwhile.
+        :rtype: Boolean
+
+        """
+        try:
+            file_stat = _os.stat(self._lock_file)
+        except OSError as err:
+            if err.errno != _errno.ENOENT:
+                raise
+            return False
+        fd_stat = _os.fstat(self._fd)
+        return (file_stat.st_dev, file_stat.st_ino) == \
+            (fd_stat.st_dev, fd_stat.st_ino)
+
+    def acquire(self):
+        """Acquire the lock.
+
+        Acquires the lock within the designated ``timeout``, failing
+        which it raises :exc:`FileLockError` with ``is_time_out`` set to
+        ``True``.
+
+        :returns: None
+        :raises: :exc:`FileLockError` on errors. ``is_time_out`` is set to
+            ``True`` only if the designated ``timeout`` has elapsed.
+
+        """
+        begin = _time.time()
+        while True:
+            try:
+                self._fd = _os.open(self._lock_file,
+                                    _os.O_CREAT | _os.O_RDWR)
+            except OSError:
+                raise FileLockError(
+                    'Error: Unable to create the lock file: ' +
+                    self._lock_file)
+            try:
+                self._lock_fd(begin)
+                if self._is_lock_file_current():
+                    break
+            except FileLockError:
+                _os.close(self._fd)
+                raise
+            except (IOError, OSError) as err:
+                _os.close(self._fd)
+                raise FileLockError('Error: ' + str(err))
+            # The lock file was removed by the previous owner, retry
+            _os.close(self._fd)
+        self._is_locked = True
+        return
+
+    def release(self):
+        """Release the lock.
+
+        :returns: None
+        :raises: :exc:`FileLockError` on errors. If the lock file has already
+            been deleted, no exception is raised.
+
+        """
+        if self._is_locked:
+            try:
+                # If no one else holds the lock, remove the lock file while
+                # still holding the lock, so that the waiters notice it and
+                # retry on a new file
+                if self._try_exclusive() and self._is_lock_file_current():
+                    _os.unlink(self._lock_file)
+            except OSError as err:
+                # Lock file could be deleted, ignoring
+                if err.errno != _errno.ENOENT:
+                    raise FileLockError('Error: ' + str(err))
+            finally:
+                _os.close(self._fd)
+                self._is_locked = False
+        return
+
+
+class FileLockSet(object):
+
+    """Holds a set of :class:`FlockFileLock` locks together.
+
+    The locks are always acquired in the sorted order of the lock file
+    names, and released in the reverse order. Since every instance follows
+    the same order, instances holding overlapping sets of locks never
+    deadlock each other.
+
+    """
+
+    def __init__(self, file_names, timeout=None, shared=False):
+        """Initializer.
+
+        :param file_names: Names of the lock files. Duplicate names are
+            locked only once.
+        :type file_names: list of str
+        :param timeout: Maxium time in seconds to wait for each of the
+            locks. If ``None``, waits until each lock is available.
+        :type timeout: float
+        :param shared: If ``True``, the locks are acquired in shared mode,
+            otherwise in exclusive mode.
+        :type shared: Boolean
+
+        """
+        self._locks = [FlockFileLock(file_name, timeout, shared=shared)
+                       for file_name in sorted(set(file_names))]
+        self._acquired_count = 0
+        return
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.release()
+        return
+
+    def acquire(self):
+        """Acquire all the locks.
+
+        If acquiring any of the locks fails, the locks acquired so far are
+        released.
+
+        :returns: None
+        :raises: :exc:`FileLockError` on errors. ``is_time_out`` is set to
+            ``True`` only if the designated ``timeout`` has elapsed.
+
+        """
+        try:
+            for lock in self._locks[self._acquired_count:]:
+                lock.acquire()
+                self._acquired_count += 1
+        except FileLockError:
+            self.release()
+            raise
+        return
+
+    def release(self):
+        """Release all the acquired locks.
+
+        :returns: None
+        :raises: :exc:`FileLockError` on errors.
+
+        """
+        while self._acquired_count > 0:
+            self._acquired_count -= 1
+            self._locks[self._acquired_count].release()
+        return
+
+
+class AtomicFileError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`AtomicFile`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(AtomicFileError, self).__init__(error_str)
+        return
+
+
+class AtomicFile(object):
+
+    """Writes a file atomically.
+
+    The contents are written to a temporary file in the same directory,
+    which replaces the file only once all the contents have been written
+    successfully. Readers thus either see the old or the new contents, and
+    never a partially written file. The temporary file is removed if the
+    writing fails.
+
+    Used as a context manager, which returns the file object to write the
+    contents into::
+
+        with AtomicFile(file_name) as file_handle:
+            file_handle.write(contents)
+
+    """
+
+    @classmethod
+    def copy(cls, src_file_name, dest_file_name, sync=True):
+        """Copy a file atomically.
+
+        :param src_file_name: The name of the file to copy.
+        :type src_file_name: str
+        :param dest_file_name: The name of the file to copy into.
+        :type dest_file_name: str
+        :param sync: If ``True``, the copy is flushed to the disk before
+            replacing ``dest_file_name``.
+        :type sync: Boolean
+        :returns: None
+        :raises: :exc:`AtomicFileError` on errors.
+
+        """
+        try:
+            with open(src_file_name, 'rb') as src_file:
+                with cls(dest_file_name, sync, 'wb') as dest_file:
+                    _shutil.copyfileobj(src_file, dest_file)
+        except IOError as err:
+            raise AtomicFileError('Error: ' + str(err))
+        return
+
+    def __init__(self, file_name, sync=True, mode='w'):
+        """Initializer.
+
+        :param file_name: The name of the file to write.
+        :type file_name: str
+        :param sync: If ``True``, the contents and the rename are flushed to
+            the disk with ``fsync``, so that the file survives a crash. This
+            can be turned off for clients which are thrown away after use.
+        :type sync: Boolean
+        :param mode: Mode to open the temporary file with.
+        :type mode: str
+
+        """
+        self._file_name = file_name
+        self._sync = sync
+        self._mode = mode
+        # Unique per thread, so that concurrent writers do not clash
+        self._temp_file_name = '%s.%d.%d.tmp' % (
+            file_name,
+            _os.getpid(),
+            _threading.current_thread().ident)
+        self._file_handle = None
+        return
+
+    def __enter__(self):
+        try:
+            self._file_handle = open(self._temp_file_name, self._mode)
+        except IOError as err:
+            raise AtomicFileError('Error: ' + str(err))
+        return self._file_handle
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        if exception_type is None:
+            self._commit()
+        else:
+            self._discard()
+        return
+
+    def _commit(self):
+        """Replace the file with the temporary file.
+
+        :returns: None
+        :raises: :exc:`AtomicFileError` on errors.
+
+        """
+        try:
+            try:
+                self._file_handle.flush()
+                if self._sync:
+                    _os.fsync(self._file_handle.fileno())
+            finally:
+                self._file_handle.close()
+            if _os.name == 'nt' and _os.path.exists(self._file_name):
+                # rename does not replace existing files on Windows
+                _os.unlink(self._file_name)
+            _os.rename(self._temp_file_name, self._file_name)
+        except (IOError, OSError) as err:
+            self._discard()
+            raise AtomicFileError('Error: ' + str(err))
+
+        if self._sync and _os.name != 'nt':
+            # Flush the rename in the directory to the disk
+            try:
+                dir_fd = _os.open(_os.path.dirname(
+                    _os.path.abspath(self._file_name)), _os.O_RDONLY)
+                try:
+                    _os.fsync(dir_fd)
+                finally:
+                    _os.close(dir_fd)
+            except OSError as err:
+                raise AtomicFileError('Error: ' + str(err))
+        return
+
+    def _discard(self):
+        """Remove the temporary file.
+
+        :returns: None
+
+        """
+        self._file_handle.close()
+        try:
+            _os.unlink(self._temp_file_name)
+        except OSError:
+            pass
+        return
+
+
 class ResourceHelperError(RepoBuddyBaseException):
 
     """Exception raised by :class:`ResourceHelper`."""
@@ -230,6 +633,358 @@ class EqualityBase(object):
         return not self.__eq__(other)
 
 
+class ThreadPoolError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`ThreadPool`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(ThreadPoolError, self).__init__(error_str)
+        return
+
+
+class ThreadPool(object):
+
+    """Runs a method on a list of items using a pool of worker threads.
+
+    Once a method invocation raises an exception, no further items are
+    scheduled, the pending invocations are allowed to finish and the first
+    exception is re-raised in the calling thread.
+
+    """
+
+    DEFAULT_JOBS = 4
+
+    def _worker(self, method, items, results):
+        """Worker thread's routine.
+
+        :param method: The method to invoke on each item.
+        :type method: Reference to a method
+        :param items: The items to invoke the method on.
+        :type items: list
+        :param results: List to store the results into.
+        :type results: list
+        :returns: None
+
+        """
+        while True:
+            with self._lock:
+                if self._stop or self._next_index >= len(items):
+                    break
+                index = self._next_index
+                self._next_index += 1
+            try:
+                results[index] = method(items[index])
+            except BaseException:   # pylint: disable=W0703
+                with self._lock:
+                    if self._error is None:
+                        self._error = _sys.exc_info()
+                    self._stop = True
+        return
+
+    def __init__(self, jobs=DEFAULT_JOBS):
+        """Initializer.
+
+        :param jobs: Maximum number of items to process in parallel.
+        :type jobs: int
+        :raises: :exc:`ThreadPoolError` if ``jobs`` is less than ``1``.
+
+        """
+        if jobs < 1:
+            raise ThreadPoolError('Error: jobs should be at least 1')
+        self._jobs = jobs
+        self._lock = _threading.Lock()
+        self._next_index = 0
+        self._stop = False
+        self._error = None
+        return
+
+    def map(self, method, items):
+        """Invoke ``method`` on every element of ``items``.
+
+        :param method: The method to invoke, it is passed a single item as
+            the argument.
+        :type method: Reference to a method
+        :param items: The items to process.
+        :type items: list
+        :returns: The return values of ``method`` in the same order as
+            ``items``.
+        :rtype: list
+        :raises: The first exception raised by ``method``.
+
+        """
+        items = list(items)
+        results = [None] * len(items)
+        self._next_index = 0
+        self._stop = False
+        self._error = None
+
+        if self._jobs == 1 or len(items) <= 1:
+            for index, item in enumerate(items):
+                results[index] = method(item)
+            return results
+
+        threads = []
+        for _ in range(min(self._jobs, len(items))):
+            thread = _threading.Thread(target=self._worker,
+                                       args=(method, items, results))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        try:
+            for thread in threads:
+                # Join with a timeout so that the main thread still gets
+                # to handle KeyboardInterrupt
+                while thread.is_alive():
+                    thread.join(0.1)
+        except KeyboardInterrupt:
+            with self._lock:
+                self._stop = True
+            raise
+
+        if not self._error is None:
+            error = self._error[1]
+            self._error = None
+            raise error
+        return results
+
+
+class RetryPolicyError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`RetryPolicy`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(RetryPolicyError, self).__init__(error_str)
+        return
+
+
+class RetryPolicy(object):
+
+    """Retries a method which fails with transient errors.
+
+    The delay before a retry grows exponentially with every failed attempt,
+    starting at ``backoff`` seconds and capped at ``max_backoff`` seconds.
+    The delay is then randomized by up to ``jitter`` times its value either
+    way, so that the parallel jobs failing together against the same server
+    do not retry in lockstep.
+
+    """
+
+    DEFAULT_RETRIES = 2
+
+    def __init__(self, retries=DEFAULT_RETRIES, backoff=1.0,
+                 max_backoff=30.0, jitter=0.5):
+        """Initializer.
+
+        :param retries: Number of times to retry after the first attempt.
+        :type retries: int
+        :param backoff: Delay in seconds before the first retry.
+        :type backoff: float
+        :param max_backoff: Maximum delay in seconds before a retry.
+        :type max_backoff: float
+        :param jitter: Fraction of the delay to randomize it by, between
+            ``0`` and ``1``.
+        :type jitter: float
+        :raises: :exc:`RetryPolicyError` on invalid arguments.
+
+        """
+        if retries < 0:
+            raise RetryPolicyError('Error: retries cannot be negative')
+        if backoff < 0 or max_backoff < 0:
+            raise RetryPolicyError('Error: backoff cannot be negative')
+        if jitter < 0 or jitter > 1:
+            raise RetryPolicyError('Error: jitter should be between 0 and 1')
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._jitter = jitter
+        return
+
+    def get_delay(self, retry):
+        """Get the delay before a retry.
+
+        :param retry: The retry to get the delay for, starting at ``1``.
+        :type retry: int
+        :returns: The delay in seconds.
+        :rtype: float
+
+        """
+        delay = min(self._max_backoff, self._backoff * (2 ** (retry - 1)))
+        return delay * (1 + _random.uniform(-self._jitter, self._jitter))
+
+    def call(self, method, is_transient, description):
+        """Invoke ``method``, retrying it on transient errors.
+
+        :param method: The method to invoke without any arguments.
+        :type method: Reference to a method
+        :param is_transient: Invoked with the exception raised by
+            ``method``, returns ``True`` if the error is transient and
+            ``method`` can be retried.
+        :type is_transient: Reference to a method
+        :param description: Description of the operation, for the messages
+            logged on retries.
+        :type description: str
+        :returns: The return value of ``method``.
+        :raises: The exception raised by the last attempt of ``method``, or
+            the first exception which is not transient.
+
+        """
+        retry = 0
+        while True:
+            try:
+                return method()
+            except Exception as err:    # pylint: disable=W0703
+                if retry >= self._retries or not is_transient(err):
+                    raise
+                retry += 1
+                delay = self.get_delay(retry)
+                Logger.error('%s failed, retry %d of %d in %.1f seconds' %
+                             (description, retry, self._retries, delay))
+                _time.sleep(delay)
+        return
+
+
+class ConnectionLimiterError(RepoBuddyBaseException):
+
+    """Exception raised by :class:`ConnectionLimiter`."""
+
+    def __init__(self, error_str):
+        """Initializer.
+
+        :param error_str: The error string to store in the exception.
+        :type error_str: str
+
+        """
+        super(ConnectionLimiterError, self).__init__(error_str)
+        return
+
+
+class _ConnectionSlot(object):
+
+    """Holds a connection slot of :class:`ConnectionLimiter`."""
+
+    def __init__(self, semaphore):
+        """Initializer.
+
+        :param semaphore: The semaphore of the host, ``None`` if the
+            connections to the host are not limited.
+        :type semaphore: :class:`threading.Semaphore`
+
+        """
+        self._semaphore = semaphore
+        return
+
+    def __enter__(self):
+        if not self._semaphore is None:
+            self._semaphore.acquire()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        if not self._semaphore is None:
+            self._semaphore.release()
+        return
+
+
+class ConnectionLimiter(object):
+
+    """Limits the concurrent connections to each remote host.
+
+    Used to cap the number of parallel jobs talking to the same server, so
+    that a large parallel job count does not run into the connection limits
+    or the rate limiting of the server. Local paths and ``file://`` URLs
+    are not limited. Thread-safe.
+
+    Used as::
+
+        with limiter.limit(url):
+            # Connect to url
+
+    """
+
+    DEFAULT_MAX_PER_HOST = 4
+
+    _URL_REGEX = _re.compile(r'^([a-zA-Z][a-zA-Z0-9+.-]*)://([^/]*)')
+    _SCP_REGEX = _re.compile(r'^(?:[^@/]+@)?([^:/]+):')
+
+    @classmethod
+    def get_host(cls, url):
+        """Get the remote host of a URL.
+
+        :param url: A URL, scp-like location (``user@host:path``) or a local
+            path.
+        :type url: str
+        :returns: The host name in lower case, ``None`` for the local paths
+            and ``file://`` URLs.
+        :rtype: str
+
+        """
+        match_obj = cls._URL_REGEX.match(url)
+        if not match_obj is None:
+            if match_obj.group(1).lower() == 'file':
+                return None
+            # Strip the user info and the port
+            host = match_obj.group(2).rpartition('@')[2]
+            if host.startswith('['):
+                host = host[1:].partition(']')[0]
+            else:
+                host = host.partition(':')[0]
+            return host.lower() or None
+        match_obj = cls._SCP_REGEX.match(url)
+        # Single letters are drive names on Windows
+        if not match_obj is None and len(match_obj.group(1)) > 1:
+            return match_obj.group(1).lower()
+        return None
+
+    def __init__(self, max_per_host=DEFAULT_MAX_PER_HOST):
+        """Initializer.
+
+        :param max_per_host: Maximum number of concurrent connections to a
+            host, ``None`` or ``0`` for no limit.
+        :type max_per_host: int
+        :raises: :exc:`ConnectionLimiterError` if ``max_per_host`` is
+            negative.
+
+        """
+        if not max_per_host is None and max_per_host < 0:
+            raise ConnectionLimiterError(
+                'Error: max_per_host cannot be negative')
+        self._max_per_host = max_per_host or None
+        self._semaphores = {}
+        self._lock = _threading.Lock()
+        return
+
+    def limit(self, url):
+        """Get a slot for a connection to ``url``.
+
+        :param url: The URL to connect to.
+        :type url: str
+        :returns: Context manager which holds a connection slot of the host
+            of ``url`` until it exits, blocking until a slot is available.
+
+        """
+        host = type(self).get_host(url)
+        if self._max_per_host is None or host is None:
+            return _ConnectionSlot(None)
+        with self._lock:
+            if not host in self._semaphores:
+                self._semaphores[host] = _threading.Semaphore(
+                    self._max_per_host)
+            return _ConnectionSlot(self._semaphores[host])
+        return
+
+
 class LoggerError(Exception):
 
     """Exception raised by :class:`Logger`."""
@@ -262,6 +1017,10 @@ class Logger:   # pylint: disable=W0232
     -   MESSAGE
     -   ERROR
 
+    A thread can buffer its log entries between :meth:`begin_buffer()` and
+    :meth:`end_buffer()`, which writes them out together. The output of
+    threads logging at the same time is thus never interleaved.
+
     """
 
     disable_debug = True
@@ -269,9 +1028,83 @@ class Logger:   # pylint: disable=W0232
     msg_stream = _sys.stdout
     error_stream = _sys.stdout
 
+    _buffers = _threading.local()
+    _write_lock = _threading.Lock()
+
     def __new__(cls):
         raise LoggerError('This class should not be instantiated')
 
+    @classmethod
+    def _write(cls, stream, msg, append_new_line):
+        """Write a log entry, or buffer it if the thread is buffering.
+
+        :param stream: The stream to write the log entry to.
+        :type stream: File like object
+        :param msg: The message to log.
+        :type msg: str
+        :param append_new_line: Appends a new line after the log message when
+            set to ``True``.
+        :type append_new_line: Boolean
+        :returns: None
+
+        """
+        if append_new_line:
+            msg += '\n'
+        if getattr(cls._buffers, 'depth', 0) > 0:
+            cls._buffers.entries.append((stream, msg))
+        else:
+            with cls._write_lock:
+                stream.write(msg)
+        return
+
+    @classmethod
+    def begin_buffer(cls):
+        """Start buffering the log entries of the calling thread.
+
+        Calls can be nested, the buffered entries are written out only by
+        the outermost :meth:`end_buffer()`.
+
+        :returns: None
+
+        """
+        if getattr(cls._buffers, 'depth', 0) == 0:
+            cls._buffers.depth = 0
+            cls._buffers.entries = []
+        cls._buffers.depth += 1
+        return
+
+    @classmethod
+    def end_buffer(cls):
+        """Stop buffering and write out the buffered log entries.
+
+        Consecutive entries for the same stream are written using a single
+        write, and no other thread writes in between the entries.
+
+        :returns: None
+        :raises: :exc:`LoggerError` if the calling thread is not buffering.
+
+        """
+        if getattr(cls._buffers, 'depth', 0) == 0:
+            raise LoggerError('Error: Log entries are not being buffered')
+        cls._buffers.depth -= 1
+        if cls._buffers.depth > 0:
+            return
+
+        chunks = []
+        for stream, msg in cls._buffers.entries:
+            if len(chunks) != 0 and chunks[-1][0] is stream:
+                chunks[-1][1].append(msg)
+            else:
+                chunks.append((stream, [msg]))
+        cls._buffers.entries = []
+
+        with cls._write_lock:
+            for stream, msgs in chunks:
+                stream.write(''.join(msgs))
+            for stream, _msgs in chunks:
+                stream.flush()
+        return
+
     @classmethod
     def msg(cls, msg, append_new_line=True):
         """Add a log entry of level ``MESSAGE``.
@@ -285,10 +1118,7 @@ class Logger:   # pylint: disable=W0232
         :raises: :exc:`LoggerError` on errors.
 
         """
-        if append_new_line:
-            cls.msg_stream.write(msg + '\n')
-        else:
-            cls.msg_stream.write(msg)
+        cls._write(cls.msg_stream, msg, append_new_line)
         return
 
     @classmethod
@@ -305,10 +1135,7 @@ class Logger:   # pylint: disable=W0232
 
         """
         if not cls.disable_debug:
-            if append_new_line:
-                cls.debug_stream.write(msg + '\n')
-            else:
-                cls.debug_stream.write(msg)
+            cls._write(cls.debug_stream, msg, append_new_line)
         return
 
     @classmethod
@@ -324,8 +1151,5 @@ class Logger:   # pylint: disable=W0232
         :raises: :exc:`LoggerError` on errors.
 
         """
-        if append_new_line:
-            cls.error_stream.write(msg + '\n')
-        else:
-            cls.error_stream.write(msg)
+        cls._write(cls.error_stream, msg, append_new_line)
         return